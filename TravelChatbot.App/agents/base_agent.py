@@ -1,7 +1,15 @@
+from typing import Dict, Optional
+from .tool_engine import ToolExecutionEngine, ToolPolicy
+
+
 class ToolAgentBase:
-    def __init__(self, tools=None):
+    def __init__(self, tools=None, engine: Optional[ToolExecutionEngine] = None, policies: Optional[Dict[str, ToolPolicy]] = None):
         tools = tools or []
+        policies = policies or {}
         self._toolNames = {tool.name for tool in tools}
+        self.engine = engine or ToolExecutionEngine()
+        for tool in tools:
+            self.engine.register(tool, policies.get(tool.name))
 
     def contain_tool(self, tool_name: str) -> bool:
-        return tool_name in self._toolNames
\ No newline at end of file
+        return tool_name in self._toolNames
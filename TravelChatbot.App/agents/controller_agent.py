@@ -1,25 +1,85 @@
 from langgraph.graph import StateGraph, END, START, MessagesState
-from langchain_core.messages import AIMessage
-from config import OPENAI_ENDPOINT, OPENAI_API_KEY, OPENAI_DEPLOYMENT_NAME
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
+from config import (
+    OPENAI_ENDPOINT,
+    OPENAI_API_KEY,
+    OPENAI_DEPLOYMENT_NAME,
+    OPENAI_FAST_DEPLOYMENT_NAME,
+    TURN_DEADLINE_SECONDS,
+    TURN_FINAL_ANSWER_RESERVE_SECONDS,
+    TURN_MAX_STEPS,
+)
 from langchain_openai import ChatOpenAI
-from tools.tour_tools import get_tours, get_heritage_guide, register_tour, get_registered_tours
+from .model_router import FAST, LARGE, ModelRouter
+from .prompts import FINAL_ANSWER_PROMPT
+from .tool_engine import ToolExecutionEngine
 from .tours_search_agent import ToursSearchAgent
 from .tours_register_agent import ToursRegisterAgent
-import traceback
+from utilities import deadline
+from utilities.prefetch import get_prefetcher
+from utilities.recorder import record_turn
+from utilities.telemetry import REGISTRY, span
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+TURN_BUDGET_EXHAUSTED = REGISTRY.counter(
+    "travelbot_turn_budget_exhausted_total",
+    "Turns forced to a final answer (reason: steps, deadline), and whether the model gave it (answered=false: canned reply).",
+    ("reason", "answered"),
+)
+
+
+@dataclass
+class TurnBudget:
+    """llm_node steps taken and allowed in a turn, and when the turn must have answered."""
+    max_steps: int
+    final_at: float  # time.monotonic() deadline of the whole turn, final answer included
+    steps: int = 0
+
+    def exhausted(self) -> Optional[str]:
+        """Why the next llm_node step must be the final answer ("steps", "deadline"), or None."""
+        if self.steps >= self.max_steps - 1:
+            return "steps"
+        left = deadline.remaining()
+        if left is not None and left <= 0:
+            return "deadline"
+        return None
+
+
+_turn_budget: ContextVar[Optional[TurnBudget]] = ContextVar("travelbot_turn_budget", default=None)
+
  
 class ControllerAgent():
-    def __init__(self):
-        llm = ChatOpenAI(
+    def __init__(self, llm=None, fast_llm=None):
+        # llm (large tier) and fast_llm can be injected (e.g. scripted models for offline benchmarks)
+        if llm is None and fast_llm is None and OPENAI_FAST_DEPLOYMENT_NAME:
+            fast_llm = ChatOpenAI(
+                api_key=OPENAI_API_KEY,
+                base_url=OPENAI_ENDPOINT,
+                model=OPENAI_FAST_DEPLOYMENT_NAME
+            )
+        llm = llm or ChatOpenAI(
             api_key=OPENAI_API_KEY,
             base_url=OPENAI_ENDPOINT,
             model=OPENAI_DEPLOYMENT_NAME
         )
-        self.llmClient = llm.bind_tools([
-            get_tours,
-            get_heritage_guide,
-            register_tour,
-            get_registered_tours
-        ])
+        # Sub agents register their tools (and execution policies) on the shared engine
+        self.tool_engine = ToolExecutionEngine()
+        self.tours_search_agent = ToursSearchAgent(self.tool_engine)
+        self.tours_register_agent = ToursRegisterAgent(self.tool_engine)
+        tiers = {LARGE: llm}
+        if fast_llm is not None:
+            tiers[FAST] = fast_llm
+        self.router = ModelRouter(tiers, tools=self.tool_engine.tools)
+        self.max_steps = TURN_MAX_STEPS
+        self.turn_deadline = TURN_DEADLINE_SECONDS
+        self.final_answer_reserve = TURN_FINAL_ANSWER_RESERVE_SECONDS
  
         graph = StateGraph(MessagesState)
         graph.add_node("llm_node", self._llm_node)
@@ -30,40 +90,130 @@ class ControllerAgent():
         graph.add_conditional_edges("llm_node", self._should_continue)
         self.graph = graph.compile()
  
-        self.tours_search_agent = ToursSearchAgent()
-        self.tours_register_agent = ToursRegisterAgent()
- 
  
     def _handle_tool_calls(self, state: MessagesState) -> MessagesState:
         if not state["messages"] or not state["messages"][-1].tool_calls:
             return state
  
-        for tool_call in state["messages"][-1].tool_calls:
-            toolName = tool_call["name"]
-            if toolName in self.tours_search_agent._toolNames:
-                return self.tours_search_agent.invoke(state)
-            elif toolName in self.tours_register_agent._toolNames:
-                return self.tours_register_agent.invoke(state)
-            else:
-                return { "message": [AIMessage(content=f"It looks like the tool '{toolName}' isn’t available in my current set of capabilities.")] }
-        return state
+        tool_calls = state["messages"][-1].tool_calls
+        with span("handle_tool_call", kind="graph_node", tool_calls=len(tool_calls),
+                  tools=[c["name"] for c in tool_calls]):
+            return {"messages": self.tool_engine.execute(tool_calls)}
  
-    def invoke(self, initial_state: MessagesState) -> MessagesState:
+    @contextmanager
+    def _turn_budget(self) -> Iterator[Dict[str, Any]]:
+        """Deadline and step budget of one turn, plus the graph config that backs them up.
+
+        Tools and backends get the turn deadline minus the final answer reserve, so a forced
+        final answer still has time to run.
+        """
+        budget = TurnBudget(max_steps=self.max_steps, final_at=time.monotonic() + self.turn_deadline)
+        token = _turn_budget.set(budget)
         try:
-            # Handle function calling
-            state = self.graph.invoke(initial_state)
-        except Exception as e:
-            print(traceback.format_exc())
-            return {
-                "messages": [AIMessage(content=f"I encountered an issue: {str(e)}. Please try again or rephrase your request.")]
-            }
+            with deadline.deadline(self.turn_deadline - self.final_answer_reserve):
+                # Each step is an llm_node plus a handle_tool_call; the budget ends the loop before this does
+                yield {"recursion_limit": 2 * self.max_steps + 2}
+        finally:
+            _turn_budget.reset(token)
+
+    def invoke(self, initial_state: MessagesState) -> MessagesState:
+        with record_turn(initial_state["messages"]) as recording:
+            failed = False
+            try:
+                # Handle function calling; background prefetching pauses while the turn runs
+                with get_prefetcher().foreground(), self._turn_budget() as config, \
+                        span("turn", kind="turn", messages=len(initial_state["messages"])) as turn:
+                    state = self.graph.invoke(initial_state, config)
+                    turn.set_attribute("steps", len(state["messages"]) - len(initial_state["messages"]))
+            except Exception as e:
+                logger.exception("Turn failed")
+                failed = True
+                state = {
+                    "messages": [AIMessage(content=f"I encountered an issue: {str(e)}. Please try again or rephrase your request.")]
+                }
+            if recording is not None:
+                recording.finish(state, failed)
         return state
    
+    def stream(self, initial_state: MessagesState) -> Iterator[Dict[str, Any]]:
+        """Run a turn and yield events as they happen.
+
+        {"type": "token", "content": ...} for answer tokens produced by llm_node, then a single
+        {"type": "final", "state": ...} with the same final state `invoke` would return.
+        """
+        state = None
+        with record_turn(initial_state["messages"]) as recording:
+            failed = False
+            try:
+                with get_prefetcher().foreground(), self._turn_budget() as config, \
+                        span("turn", kind="turn", messages=len(initial_state["messages"]), streaming=True) as turn:
+                    for mode, chunk in self.graph.stream(initial_state, config, stream_mode=["messages", "values"]):
+                        if mode == "values":
+                            state = chunk
+                            continue
+                        message, metadata = chunk
+                        if metadata.get("langgraph_node") == "llm_node" and isinstance(message, AIMessageChunk) and message.content:
+                            yield {"type": "token", "content": message.content}
+                    turn.set_attribute("steps", len(state["messages"]) - len(initial_state["messages"]))
+            except Exception as e:
+                logger.exception("Turn failed")
+                failed = True
+                state = {
+                    "messages": [AIMessage(content=f"I encountered an issue: {str(e)}. Please try again or rephrase your request.")]
+                }
+            if recording is not None:
+                recording.finish(state, failed)
+        yield {"type": "final", "state": state}
+   
     def _llm_node(self, state: MessagesState) -> MessagesState:
-        response = self.llmClient.invoke(state["messages"])
+        budget = _turn_budget.get()
+        with span("llm_node", kind="graph_node", messages=len(state["messages"])) as s:
+            reason = budget.exhausted() if budget else None
+            if reason is None:
+                try:
+                    response, tier = self.router.invoke(state["messages"], timeout=deadline.timeout())
+                except Exception:
+                    # Out of time mid-call: answer with what has been gathered instead of failing the turn
+                    if budget is None or deadline.remaining() > 0:
+                        raise
+                    reason = "deadline"
+            if budget is not None:
+                budget.steps += 1
+            if reason is not None:
+                response, tier = self._final_answer(state["messages"], budget, reason)
+                s.set_attribute("forced_final", reason)
+            s.set_attribute("tier", tier)
+            usage = getattr(response, "usage_metadata", None) or {}
+            s.set_tokens(usage.get("input_tokens"), usage.get("output_tokens"))
+            s.set_attribute("tool_calls", len(response.tool_calls or []))
         return {"messages": [response]}
    
+    def _final_answer(self, messages: List[Any], budget: TurnBudget, reason: str) -> Tuple[AIMessage, str]:
+        """Answer from the tool results gathered so far, without tools; a canned reply if that fails too."""
+        try:
+            response, tier = self.router.invoke(
+                messages + [SystemMessage(content=FINAL_ANSWER_PROMPT)],
+                tools=False,
+                timeout=max(budget.final_at - time.monotonic(), 0.001),
+            )
+            if not response.tool_calls:
+                TURN_BUDGET_EXHAUSTED.inc(reason=reason, answered="true")
+                return response, tier
+        except Exception as e:
+            logger.warning("Final answer after %s budget failed: %s", reason, e)
+        TURN_BUDGET_EXHAUSTED.inc(reason=reason, answered="false")
+        return AIMessage(content=_partial_answer(messages)), "none"
+
     def _should_continue(self, state: MessagesState) -> str:
         if not state["messages"][-1].tool_calls:
             return END
-        return "handle_tool_call"
\ No newline at end of file
+        return "handle_tool_call"
+
+
+def _partial_answer(messages: List[Any]) -> str:
+    """Canned reply listing the tool results of the current turn."""
+    start = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+    results = [str(m.content)[:500] for m in messages[start:] if isinstance(m, ToolMessage)]
+    if not results:
+        return "I couldn't finish this request in time. Please try again or narrow it down."
+    return "I ran out of time before finishing. Here is what I found so far:\n" + "\n".join(results)
@@ -0,0 +1,186 @@
+"""Model tiers for ControllerAgent and latency-aware routing between them.
+
+- fast:  a small deployment (OPENAI_FAST_DEPLOYMENT_NAME); chooses tools and phrases short results
+- large: the main deployment (OPENAI_DEPLOYMENT_NAME); writes answers from heritage guides,
+         multi-place searches, group recommendations, long tool results and long questions
+
+Each llm_node step picks a preferred tier from the turn state (`preferred_tier`), then tries
+tiers in order. Routing uses the calls of the last MODEL_ROUTER_WINDOW_SECONDS. A tier whose error
+rate is above MODEL_ROUTER_MAX_ERROR_RATE is tried last. The preferred tier goes first while its
+mean latency stays within MODEL_ROUTER_LATENCY_BUDGET_SECONDS; beyond that, the working tier with
+the lowest mean latency goes first. A call that fails falls back to the next tier while the
+step has time left. A tier that gets no traffic forgets its window, so it is tried again after
+that much time.
+
+Each call runs in an `llm.<tier>` backend span, so per-tier latency lands in the span duration
+histogram. Token counts go to `travelbot_model_tokens_total{tier,type}`.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+
+from config import (
+    MODEL_ROUTER_LARGE_PROMPT_CHARS,
+    MODEL_ROUTER_LARGE_RESULT_CHARS,
+    MODEL_ROUTER_LARGE_TOOLS,
+    MODEL_ROUTER_LATENCY_BUDGET_SECONDS,
+    MODEL_ROUTER_MAX_ERROR_RATE,
+    MODEL_ROUTER_WINDOW_SECONDS,
+)
+from utilities import deadline
+from utilities.deadline import DeadlineExceeded
+from utilities.recorder import record_llm
+from utilities.telemetry import REGISTRY, span
+
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+LARGE = "large"
+
+MODEL_TOKENS = REGISTRY.counter(
+    "travelbot_model_tokens_total", "Chat model tokens by tier.", ("tier", "type")
+)
+MODEL_ROUTES = REGISTRY.counter(
+    "travelbot_model_routes_total", "llm_node steps by preferred and serving tier (served=none: every tier failed).",
+    ("preferred", "served"),
+)
+
+# Error rates computed from fewer calls than this are not trusted
+MIN_SAMPLES = 5
+
+
+class ModelTier:
+    """A chat model, the same model with the tools bound, and its recent calls: (time, latency, ok)."""
+
+    def __init__(self, name: str, llm: Any, tools: Sequence[Any] = (), window: float = MODEL_ROUTER_WINDOW_SECONDS):
+        self.name = name
+        self.plain = llm
+        self.llm = llm.bind_tools(list(tools)) if tools else llm
+        self.window = window
+        self._calls: Deque[Tuple[float, float, bool]] = deque()
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._calls.append((now, latency, ok))
+            self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def health(self) -> Dict[str, float]:
+        """Calls, error rate and mean latency of successful calls within the window."""
+        with self._lock:
+            self._trim(time.monotonic())
+            calls = list(self._calls)
+        ok = [latency for _, latency, success in calls if success]
+        return {
+            "calls": len(calls),
+            "error_rate": 1 - len(ok) / len(calls) if calls else 0.0,
+            "mean_latency": sum(ok) / len(ok) if ok else 0.0,
+        }
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        tiers: Dict[str, Any],
+        tools: Sequence[Any] = (),
+        latency_budget: float = MODEL_ROUTER_LATENCY_BUDGET_SECONDS,
+        max_error_rate: float = MODEL_ROUTER_MAX_ERROR_RATE,
+        large_tools: Sequence[str] = MODEL_ROUTER_LARGE_TOOLS,
+        large_result_chars: int = MODEL_ROUTER_LARGE_RESULT_CHARS,
+        large_prompt_chars: int = MODEL_ROUTER_LARGE_PROMPT_CHARS,
+    ):
+        if not tiers:
+            raise ValueError("at least one model tier is required")
+        self.tiers = {name: ModelTier(name, llm, tools) for name, llm in tiers.items()}
+        self.latency_budget = latency_budget
+        self.max_error_rate = max_error_rate
+        self.large_tools = set(large_tools)
+        self.large_result_chars = large_result_chars
+        self.large_prompt_chars = large_prompt_chars
+
+    def preferred_tier(self, messages: List[BaseMessage]) -> str:
+        """The tier this step needs, from the turn state."""
+        last = messages[-1] if messages else None
+        if isinstance(last, ToolMessage):
+            # Answering from tool results: the large tier for rich sources or long results
+            results = []
+            for message in reversed(messages):
+                if not isinstance(message, ToolMessage):
+                    break
+                results.append(message)
+            if any(m.name in self.large_tools for m in results) or \
+                    sum(len(str(m.content)) for m in results) > self.large_result_chars:
+                return LARGE
+            return FAST
+        if isinstance(last, HumanMessage) and len(str(last.content)) > self.large_prompt_chars:
+            return LARGE
+        # Choosing a tool, or a short direct reply
+        return FAST
+
+    def plan(self, messages: List[BaseMessage]) -> Tuple[str, List[ModelTier]]:
+        """(preferred tier, tiers in the order they will be tried)."""
+        preferred = self.preferred_tier(messages)
+        if preferred not in self.tiers:
+            preferred = LARGE if LARGE in self.tiers else next(iter(self.tiers))
+        health = {name: tier.health() for name, tier in self.tiers.items()}
+        failing = {name for name, h in health.items()
+                   if h["calls"] >= MIN_SAMPLES and h["error_rate"] > self.max_error_rate}
+        candidates = [name for name in self.tiers if name not in failing] or list(self.tiers)
+
+        # The preferred tier while it keeps to the latency budget, else the fastest working tier
+        if preferred in candidates and health[preferred]["mean_latency"] <= self.latency_budget:
+            first = preferred
+        else:
+            first = min(candidates, key=lambda name: (health[name]["mean_latency"], name != preferred))
+        rest = sorted((t for t in self.tiers.values() if t.name != first),
+                      key=lambda t: (t.name in failing, t.name != preferred))
+        return preferred, [self.tiers[first]] + rest
+
+    def invoke(self, messages: List[BaseMessage], tools: bool = True, timeout: Optional[float] = None) -> Tuple[Any, str]:
+        """(response, serving tier); raises the last error when every tier fails.
+
+        tools=False calls the models without tools, so the response is a final answer.
+        `timeout` bounds all the calls together (without it, the turn deadline does): a fallback
+        tier only gets the time the failed ones left, and there is no fallback once none is left.
+        """
+        preferred, order = self.plan(messages)
+        until = None if timeout is None else time.monotonic() + timeout
+        error: Optional[Exception] = None
+        for tier in order:
+            left = deadline.timeout() if until is None else until - time.monotonic()
+            if left is not None and left <= 0:
+                error = error or DeadlineExceeded(f"no time left to call the {tier.name} model")
+                break
+            options = {} if left is None else {"timeout": left}
+            started = time.perf_counter()
+            try:
+                with span(f"llm.{tier.name}", kind="backend", preferred=preferred, fallback=error is not None) as s:
+                    response = (tier.llm if tools else tier.plain).invoke(messages, **options)
+                    usage = getattr(response, "usage_metadata", None) or {}
+                    s.set_attribute("input_tokens", usage.get("input_tokens", 0))
+                    s.set_attribute("output_tokens", usage.get("output_tokens", 0))
+            except Exception as e:
+                latency = time.perf_counter() - started
+                tier.record(latency, ok=False)
+                record_llm(tier.name, messages, tools, started, latency, error=e)
+                logger.warning("Model tier %s failed: %s", tier.name, e)
+                error = e
+                continue
+            latency = time.perf_counter() - started
+            tier.record(latency, ok=True)
+            record_llm(tier.name, messages, tools, started, latency, response=response)
+            MODEL_TOKENS.inc(usage.get("input_tokens", 0), tier=tier.name, type="prompt")
+            MODEL_TOKENS.inc(usage.get("output_tokens", 0), tier=tier.name, type="completion")
+            MODEL_ROUTES.inc(preferred=preferred, served=tier.name)
+            return response, tier.name
+        MODEL_ROUTES.inc(preferred=preferred, served="none")
+        raise error
@@ -0,0 +1,204 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import ToolMessage
+from pydantic import ValidationError
+from config import (
+    TOOL_DEFAULT_TIMEOUT_SECONDS,
+    TOOL_BACKEND_MAX_CONCURRENCY,
+    TOOL_BREAKER_FAILURE_THRESHOLD,
+    TOOL_BREAKER_RESET_SECONDS,
+)
+from utilities import deadline
+from utilities.deadline import DeadlineExceeded
+from utilities.recorder import record_tool_results
+from utilities.resilience import Bulkhead, BulkheadFullError, CircuitBreaker
+from utilities.telemetry import redact, span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolPolicy:
+    """Execution policy for a registered tool.
+
+    backend: name of the dependency the tool mostly waits on; tools sharing a backend
+             share its bulkhead and circuit breaker.
+    timeout: deadline in seconds for one call, including time spent waiting for a bulkhead slot.
+    fallback: payload returned (with an "error" key added) when the call cannot be served.
+    by_arg: policies for calls that pass a (non-empty) value for the named argument, for tools
+            whose modes wait on different backends.
+    """
+    backend: str
+    timeout: float = TOOL_DEFAULT_TIMEOUT_SECONDS
+    fallback: Optional[Dict[str, Any]] = None
+    by_arg: Optional[Dict[str, "ToolPolicy"]] = None
+
+    def for_call(self, tool_call: Dict[str, Any]) -> "ToolPolicy":
+        args = tool_call.get("args") or {}
+        for name, policy in (self.by_arg or {}).items():
+            if args.get(name):
+                return policy
+        return self
+
+
+class ToolExecutionEngine:
+    """Runs tool calls directly on a shared worker pool.
+
+    Every call is guarded by the circuit breaker and bulkhead of its backend and bounded by
+    the tool deadline, or the turn deadline when that is sooner. Calls that cannot run
+    (unknown tool, open breaker, full bulkhead, timeout) or whose backend fails are answered
+    with a ToolMessage carrying an error payload so the LLM can recover instead of the whole
+    turn failing. Tools raise backend errors rather than returning them, so that they count as
+    breaker failures; ValueError and validation errors are the caller's mistake and do not.
+    """
+
+    def __init__(self, max_workers: int = 32):
+        self._tools: Dict[str, Any] = {}
+        self._policies: Dict[str, ToolPolicy] = {}
+        self._bulkheads: Dict[str, Bulkhead] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool-engine")
+
+    @property
+    def tools(self) -> List[Any]:
+        return list(self._tools.values())
+
+    def register(self, tool, policy: Optional[ToolPolicy] = None) -> None:
+        policy = policy or ToolPolicy(backend=tool.name)
+        with self._lock:
+            self._tools[tool.name] = tool
+            self._policies[tool.name] = policy
+            for backend in {policy.backend, *(p.backend for p in (policy.by_arg or {}).values())}:
+                if backend not in self._bulkheads:
+                    self._bulkheads[backend] = Bulkhead(backend, TOOL_BACKEND_MAX_CONCURRENCY)
+                    self._breakers[backend] = CircuitBreaker(
+                        backend,
+                        failure_threshold=TOOL_BREAKER_FAILURE_THRESHOLD,
+                        reset_timeout=TOOL_BREAKER_RESET_SECONDS,
+                    )
+
+    def breaker(self, backend: str) -> Optional[CircuitBreaker]:
+        return self._breakers.get(backend)
+
+    def policy(self, name: str) -> Optional[ToolPolicy]:
+        return self._policies.get(name)
+
+    def execute(self, tool_calls: List[Dict[str, Any]]) -> List[ToolMessage]:
+        """Execute tool calls concurrently and return one ToolMessage per call, in order."""
+        pending = []
+        for tool_call in tool_calls:
+            started = time.monotonic()
+            message = self._preflight(tool_call)
+            if message is not None:
+                pending.append((tool_call, started, None, message))
+                continue
+
+            policy = self._policy_for(tool_call)
+            timeout = deadline.timeout(policy.timeout)
+            if timeout <= 0:
+                self._breakers[policy.backend].release_trial()
+                pending.append((tool_call, started, None, self._fallback_message(
+                    tool_call, policy, "This request has used up its time budget; answer with the results so far.")))
+                continue
+            bulkhead = self._bulkheads[policy.backend]
+            try:
+                bulkhead.acquire(timeout=timeout)
+            except BulkheadFullError as e:
+                self._breakers[policy.backend].release_trial()
+                pending.append((tool_call, started, None, self._fallback_message(tool_call, policy, str(e))))
+                continue
+
+            ctx = contextvars.copy_context()
+            future = self._executor.submit(ctx.run, self._invoke, tool_call, bulkhead)
+            pending.append((tool_call, started, future, None))
+
+        messages = [self._collect(*entry) for entry in pending]
+        record_tool_results(tool_calls, messages)
+        return messages
+
+    def _policy_for(self, tool_call: Dict[str, Any]) -> ToolPolicy:
+        return self._policies[tool_call["name"]].for_call(tool_call)
+
+    def _preflight(self, tool_call: Dict[str, Any]) -> Optional[ToolMessage]:
+        toolName = tool_call["name"]
+        if toolName not in self._tools:
+            return ToolMessage(
+                content=f"It looks like the tool '{toolName}' isn’t available in my current set of capabilities.",
+                name=toolName,
+                tool_call_id=tool_call["id"],
+                status="error",
+            )
+
+        policy = self._policy_for(tool_call)
+        if not self._breakers[policy.backend].allow():
+            return self._fallback_message(tool_call, policy, f"{policy.backend} is temporarily unavailable, please try again shortly.")
+        return None
+
+    def _invoke(self, tool_call: Dict[str, Any], bulkhead: Bulkhead) -> ToolMessage:
+        policy = self._policy_for(tool_call)
+        try:
+            with span(f"tool.{tool_call['name']}", kind="tool", backend=policy.backend,
+                      call_id=tool_call["id"], args=redact(tool_call.get("args"))) as s:
+                message = self._tools[tool_call["name"]].invoke({**tool_call, "type": "tool_call"})
+                s.set_attribute("result_chars", len(str(message.content)))
+                return message
+        finally:
+            bulkhead.release()
+
+    def _collect(self, tool_call, started: float, future, message: Optional[ToolMessage]) -> ToolMessage:
+        if future is None:
+            return message
+
+        policy = self._policy_for(tool_call)
+        breaker = self._breakers[policy.backend]
+        policy_remaining = max(0.0, policy.timeout - (time.monotonic() - started))
+        remaining = deadline.timeout(policy_remaining)
+        try:
+            result = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            # The worker keeps its bulkhead slot until the call really returns.
+            if remaining < policy_remaining:
+                # Cut short by the turn deadline; the backend was within its own timeout
+                breaker.release_trial()
+                return self._fallback_message(tool_call, policy, f"'{tool_call['name']}' did not finish within the time left for this request.")
+            breaker.record_failure()
+            return self._fallback_message(tool_call, policy, f"'{tool_call['name']}' timed out after {policy.timeout:g}s.")
+        except DeadlineExceeded as e:
+            breaker.release_trial()
+            return self._fallback_message(tool_call, policy, str(e))
+        except (ValueError, ValidationError) as e:
+            # Bad arguments or business rule violations, the backend itself is healthy.
+            breaker.record_success()
+            return self._error_message(tool_call, str(e))
+        except Exception as e:
+            logger.warning("Tool %s failed: %s", tool_call["name"], e, exc_info=True)
+            breaker.record_failure()
+            return self._fallback_message(tool_call, policy, str(e))
+
+        breaker.record_success()
+        return result
+
+    def _fallback_message(self, tool_call, policy: ToolPolicy, reason: str) -> ToolMessage:
+        payload = dict(policy.fallback or {})
+        payload["error"] = reason
+        return ToolMessage(
+            content=json.dumps(payload, ensure_ascii=False),
+            name=tool_call["name"],
+            tool_call_id=tool_call["id"],
+            status="error",
+        )
+
+    def _error_message(self, tool_call, error: str) -> ToolMessage:
+        return ToolMessage(
+            content=f"Error: {error}\n Please fix your mistakes.",
+            name=tool_call["name"],
+            tool_call_id=tool_call["id"],
+            status="error",
+        )
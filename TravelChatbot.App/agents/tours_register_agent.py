@@ -1,20 +1,13 @@
-from langgraph.graph import StateGraph, END, START, MessagesState
-from langgraph.prebuilt import ToolNode
-from tools.tour_tools import register_tour, get_registered_tours
+from tools.tour_tools import register_tour, register_group_tour, get_registered_tours
 from .base_agent import ToolAgentBase
+from .tool_engine import ToolPolicy
 
 class ToursRegisterAgent(ToolAgentBase):
-    def __init__(self):
-        tools = [register_tour, get_registered_tours]
-        super().__init__(tools)
-        toolNodes = ToolNode(tools)
-
-        graph = StateGraph(MessagesState)
-        graph.add_node("tools", toolNodes)
-        graph.add_edge(START, "tools")
-        graph.add_edge("tools", END)
-        self.graph = graph.compile()
-
-    def invoke(self, initial_state: MessagesState) -> MessagesState:
-        state = self.graph.invoke(initial_state)
-        return state
+    def __init__(self, engine=None):
+        tools = [register_tour, register_group_tour, get_registered_tours]
+        policies = {
+            "register_tour": ToolPolicy(backend="dynamodb", timeout=10),
+            "register_group_tour": ToolPolicy(backend="dynamodb", timeout=30),
+            "get_registered_tours": ToolPolicy(backend="dynamodb", timeout=15),
+        }
+        super().__init__(tools, engine, policies)
@@ -1,20 +1,19 @@
-from langgraph.graph import StateGraph, END, START, MessagesState
-from langgraph.prebuilt import ToolNode
-from tools.tour_tools import get_tours, get_heritage_guide
+from tools.tour_tools import get_tours, get_heritage_guide, recommend_group_tours, search_places
 from .base_agent import ToolAgentBase
+from .tool_engine import ToolPolicy
 
 class ToursSearchAgent(ToolAgentBase):
-    def __init__(self):
-        tools = [get_tours, get_heritage_guide]
-        super().__init__(tools)
-        toolNodes = ToolNode(tools)    
-
-        graph = StateGraph(MessagesState)
-        graph.add_node("tools", toolNodes)
-        graph.add_edge(START, "tools")
-        graph.add_edge("tools", END)
-        self.graph = graph.compile()
-
-    def invoke(self, initial_state: MessagesState) -> MessagesState:
-        state = self.graph.invoke(initial_state)
-        return state
+    def __init__(self, engine=None):
+        tools = [get_tours, get_heritage_guide, search_places, recommend_group_tours]
+        policies = {
+            # search_query switches to semantic search: embeddings and the vector index, not DynamoDB
+            "get_tours": ToolPolicy(backend="dynamodb", timeout=15, fallback={"results": [], "next_token": None}, by_arg={
+                "search_query": ToolPolicy(backend="pinecone", timeout=15, fallback={"results": [], "next_token": None}),
+            }),
+            # May download, parse and embed a whole guide on first use
+            "get_heritage_guide": ToolPolicy(backend="pinecone", timeout=60, fallback={"results": [], "next_token": None}),
+            "search_places": ToolPolicy(backend="pinecone", timeout=60, fallback={"results": []}),
+            # The first call after a catalog change loads the tour vectors into memory
+            "recommend_group_tours": ToolPolicy(backend="pinecone", timeout=60, fallback={"results": []}),
+        }
+        super().__init__(tools, engine, policies)
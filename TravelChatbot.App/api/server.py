@@ -0,0 +1,329 @@
+"""Headless chat service on top of ControllerAgent.
+
+Endpoints:
+- POST   /sessions              create a session
+- GET    /sessions/{id}         session history
+- DELETE /sessions/{id}         drop a session
+- POST   /chat                  one turn, JSON reply
+- POST   /chat/stream           one turn, server-sent events ({"type": "token"|"done"|"error", ...})
+- WS     /ws/chat               same events as /chat/stream, several turns per connection
+- GET    /health, GET /metrics  liveness and Prometheus metrics
+
+Run with `python -m api.server` (honours CHAT_API_WORKERS) or `uvicorn api.server:app`.
+"""
+import asyncio
+import json
+import logging
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from langchain_core.messages import AIMessage, HumanMessage
+from pydantic import BaseModel, Field
+
+from agents.prompts import system_message
+from config import (
+    CHAT_API_HOST,
+    CHAT_API_PORT,
+    CHAT_API_WORKERS,
+    CHAT_API_MAX_CONCURRENT_TURNS,
+    CHAT_API_QUEUE_TIMEOUT_SECONDS,
+    CHAT_API_SESSION_TTL_SECONDS,
+    CHAT_API_SESSION_DB,
+    TELEMETRY_METRICS_PORT,
+    validate_config,
+)
+from utilities import prefetch, recorder
+from utilities.telemetry import REGISTRY, render_prometheus, start_metrics_server
+from .sessions import History, InMemorySessionStore, SqliteSessionStore
+
+logger = logging.getLogger(__name__)
+
+TURNS_REJECTED = REGISTRY.counter(
+    "travelbot_chat_turns_rejected_total", "Chat turns rejected by the API concurrency limit.", ("reason",)
+)
+
+
+class ChatRequest(BaseModel):
+    message: str = Field(min_length=1, description="The user's message.")
+    session_id: Optional[str] = Field(default=None, description="Existing session id; omit to start a new session.")
+
+
+class ChatResponse(BaseModel):
+    session_id: str
+    reply: str
+
+
+class ServiceBusyError(Exception):
+    """No turn slot became available within the queue timeout."""
+
+
+class SessionNotFoundError(Exception):
+    """The session id is unknown or has expired."""
+
+
+class ChatService:
+    """Per-session conversation state and turn admission on top of ControllerAgent."""
+
+    def __init__(self, agent, store, max_concurrent_turns: int, queue_timeout: float):
+        self.agent = agent
+        self.store = store
+        self.queue_timeout = queue_timeout
+        self._turn_slots = asyncio.Semaphore(max_concurrent_turns)
+        # A session's lock lives only while turns hold or wait for it; ended sessions leave nothing behind
+        self._session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._workers = set()
+
+    def open_session(self, session_id: Optional[str]) -> str:
+        if session_id is None:
+            return self.store.create()
+        if self.store.load(session_id) is None:
+            raise SessionNotFoundError(session_id)
+        return session_id
+
+    async def _admit(self, session_id: str) -> Callable[[], None]:
+        """Wait for a global turn slot and the session lock; returns the release callback."""
+        try:
+            await asyncio.wait_for(self._turn_slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            TURNS_REJECTED.inc(reason="capacity")
+            raise ServiceBusyError()
+
+        lock = self._session_locks.setdefault(session_id, asyncio.Lock())
+        try:
+            # One turn at a time per session so histories are never interleaved
+            await asyncio.wait_for(lock.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._turn_slots.release()
+            TURNS_REJECTED.inc(reason="session_busy")
+            raise ServiceBusyError()
+
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                lock.release()
+                self._turn_slots.release()
+        return release
+
+    def _build_state(self, history: History, message: str) -> Dict[str, Any]:
+        messages = [system_message]
+        for entry in history:
+            cls = HumanMessage if entry["role"] == "human" else AIMessage
+            messages.append(cls(content=entry["content"]))
+        messages.append(HumanMessage(content=message))
+        return {"messages": messages}
+
+    def _record(self, session_id: str, message: str, reply: str) -> None:
+        # An append, not load and save: another worker may be recording a turn of this session
+        self.store.append(session_id, [{"role": "human", "content": message}, {"role": "ai", "content": reply}])
+
+    async def chat(self, session_id: str, message: str) -> str:
+        """Run one turn. The turn slot is held until the worker finishes, even if the request is cancelled."""
+        release = await self._admit(session_id)
+
+        def run() -> str:
+            state = self._build_state(self.store.load(session_id) or [], message)
+            final_state = self.agent.invoke(state)
+            reply = str(final_state["messages"][-1].content)
+            self._record(session_id, message, reply)
+            return reply
+
+        try:
+            # to_thread copies the context, so a recorded turn knows its session
+            with recorder.session(session_id):
+                worker = asyncio.ensure_future(asyncio.to_thread(run))
+        except BaseException:
+            release()
+            raise
+        self._workers.add(worker)
+        worker.add_done_callback(self._workers.discard)
+        worker.add_done_callback(lambda _: release())
+        return await asyncio.shield(worker)
+
+    async def chat_stream(self, session_id: str, message: str) -> AsyncIterator[Dict[str, Any]]:
+        """Admit the turn, start it in a worker thread and return its event iterator.
+
+        The turn slot is held until the worker finishes, even if the client goes away.
+        """
+        release = await self._admit(session_id)
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce() -> None:
+            try:
+                state = self._build_state(self.store.load(session_id) or [], message)
+                for event in self.agent.stream(state):
+                    if event["type"] == "final":
+                        reply = str(event["state"]["messages"][-1].content)
+                        self._record(session_id, message, reply)
+                        event = {"type": "done", "content": reply}
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, {"type": "error", "content": str(e)})
+            finally:
+                loop.call_soon_threadsafe(release)
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        with recorder.session(session_id):
+            worker = asyncio.ensure_future(asyncio.to_thread(produce))
+        self._workers.add(worker)
+        worker.add_done_callback(self._workers.discard)
+
+        async def events() -> AsyncIterator[Dict[str, Any]]:
+            while True:
+                event = await queue.get()
+                if event is done:
+                    return
+                yield event
+
+        return events()
+
+
+def _build_store():
+    if CHAT_API_SESSION_DB:
+        return SqliteSessionStore(CHAT_API_SESSION_DB, ttl_seconds=CHAT_API_SESSION_TTL_SECONDS)
+    return InMemorySessionStore(ttl_seconds=CHAT_API_SESSION_TTL_SECONDS)
+
+
+def create_app(agent=None, store=None) -> FastAPI:
+    """Build the ASGI app. `agent` defaults to a ControllerAgent created at startup."""
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if TELEMETRY_METRICS_PORT:
+            if CHAT_API_WORKERS > 1:
+                # Every worker would bind the same port; each serves its own metrics on /metrics
+                logger.info("Not serving TELEMETRY_METRICS_PORT with %d workers; use /metrics", CHAT_API_WORKERS)
+            else:
+                try:
+                    start_metrics_server(TELEMETRY_METRICS_PORT)
+                except OSError as e:
+                    logger.warning("Could not start metrics server: %s", e)
+        chat_agent = agent
+        if chat_agent is None:
+            from agents.controller_agent import ControllerAgent
+            from tools import tour_catalog
+            validate_config()
+            chat_agent = ControllerAgent()
+            # Load the tour catalog before the first turn instead of during it
+            try:
+                await asyncio.to_thread(tour_catalog.catalog().snapshot)
+            except Exception as e:
+                logger.warning("Tour catalog warm-up failed, loading on first use: %s", e)
+        app.state.chat = ChatService(
+            chat_agent,
+            store or _build_store(),
+            max_concurrent_turns=CHAT_API_MAX_CONCURRENT_TURNS,
+            queue_timeout=CHAT_API_QUEUE_TIMEOUT_SECONDS,
+        )
+        yield
+        prefetch.reset()
+
+    app = FastAPI(title="Travel Chatbot API", lifespan=lifespan)
+
+    def service() -> ChatService:
+        return app.state.chat
+
+    def open_session(session_id: Optional[str]) -> str:
+        try:
+            return service().open_session(session_id)
+        except SessionNotFoundError:
+            raise HTTPException(status_code=404, detail="Session not found or expired.")
+
+    def busy() -> HTTPException:
+        return HTTPException(status_code=503, detail="The assistant is busy, please retry shortly.", headers={"Retry-After": "1"})
+
+    @app.get("/health")
+    async def health() -> Dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> str:
+        return render_prometheus()
+
+    @app.post("/sessions")
+    async def create_session() -> Dict[str, str]:
+        return {"session_id": service().store.create()}
+
+    @app.get("/sessions/{session_id}")
+    async def get_session(session_id: str) -> Dict[str, Any]:
+        history = service().store.load(session_id)
+        if history is None:
+            raise HTTPException(status_code=404, detail="Session not found or expired.")
+        return {"session_id": session_id, "messages": history}
+
+    @app.delete("/sessions/{session_id}")
+    async def delete_session(session_id: str) -> Dict[str, str]:
+        service().store.delete(session_id)
+        return {"session_id": session_id}
+
+    @app.post("/chat", response_model=ChatResponse)
+    async def chat(request: ChatRequest) -> ChatResponse:
+        session_id = open_session(request.session_id)
+        try:
+            reply = await service().chat(session_id, request.message)
+        except ServiceBusyError:
+            raise busy()
+        return ChatResponse(session_id=session_id, reply=reply)
+
+    @app.post("/chat/stream")
+    async def chat_stream(request: ChatRequest) -> StreamingResponse:
+        session_id = open_session(request.session_id)
+        try:
+            events = await service().chat_stream(session_id, request.message)
+        except ServiceBusyError:
+            raise busy()
+
+        async def sse() -> AsyncIterator[str]:
+            yield f"data: {json.dumps({'type': 'session', 'session_id': session_id})}\n\n"
+            async for event in events:
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    @app.websocket("/ws/chat")
+    async def chat_ws(websocket: WebSocket) -> None:
+        await websocket.accept()
+        try:
+            while True:
+                payload = await websocket.receive_json()
+                message = (payload.get("message") or "").strip()
+                if not message:
+                    await websocket.send_json({"type": "error", "content": "message is required"})
+                    continue
+                try:
+                    session_id = service().open_session(payload.get("session_id"))
+                except SessionNotFoundError:
+                    await websocket.send_json({"type": "error", "content": "Session not found or expired."})
+                    continue
+                try:
+                    events = await service().chat_stream(session_id, message)
+                except ServiceBusyError:
+                    await websocket.send_json({"type": "error", "content": "The assistant is busy, please retry shortly."})
+                    continue
+                await websocket.send_json({"type": "session", "session_id": session_id})
+                async for event in events:
+                    await websocket.send_json(event)
+        except WebSocketDisconnect:
+            pass
+
+    return app
+
+
+app = create_app()
+
+
+def main() -> None:
+    if CHAT_API_WORKERS > 1 and not CHAT_API_SESSION_DB:
+        raise ValueError("CHAT_API_SESSION_DB must be set when CHAT_API_WORKERS > 1 so workers share sessions")
+    uvicorn.run("api.server:app", host=CHAT_API_HOST, port=CHAT_API_PORT, workers=CHAT_API_WORKERS)
+
+
+if __name__ == "__main__":
+    main()
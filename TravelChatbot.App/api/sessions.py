@@ -0,0 +1,125 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+# A session history is the visible conversation: [{"role": "human"|"ai", "content": str}, ...]
+History = List[Dict[str, str]]
+
+
+class InMemorySessionStore:
+    """Process-local session histories with idle expiry."""
+
+    def __init__(self, ttl_seconds: int = 3600, max_sessions: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: Dict[str, Tuple[float, History]] = {}
+        self._lock = threading.Lock()
+
+    def create(self) -> str:
+        session_id = uuid.uuid4().hex
+        self.save(session_id, [])
+        return session_id
+
+    def load(self, session_id: str) -> Optional[History]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or time.time() - entry[0] > self.ttl_seconds:
+                self._sessions.pop(session_id, None)
+                return None
+            return list(entry[1])
+
+    def save(self, session_id: str, history: History) -> None:
+        with self._lock:
+            self._sessions[session_id] = (time.time(), list(history))
+            if len(self._sessions) > self.max_sessions:
+                self._evict()
+
+    def append(self, session_id: str, entries: History) -> None:
+        """Add entries to the end of the history (an expired or unknown session starts empty)."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            history = entry[1] if entry is not None and time.time() - entry[0] <= self.ttl_seconds else []
+            self._sessions[session_id] = (time.time(), history + list(entries))
+            if len(self._sessions) > self.max_sessions:
+                self._evict()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict(self) -> None:
+        now = time.time()
+        for key in [k for k, (ts, _) in self._sessions.items() if now - ts > self.ttl_seconds]:
+            del self._sessions[key]
+        # Still full: drop the least recently used sessions
+        overflow = len(self._sessions) - self.max_sessions
+        if overflow > 0:
+            for key, _ in sorted(self._sessions.items(), key=lambda kv: kv[1][0])[:overflow]:
+                del self._sessions[key]
+
+
+class SqliteSessionStore:
+    """Session histories in a SQLite file so several worker processes share them.
+
+    Turns of one session may run in different workers at once; `append` adds a turn's messages
+    inside one write transaction, so neither turn's messages are lost.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int = 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, updated REAL NOT NULL, history TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10)
+        return conn
+
+    def create(self) -> str:
+        session_id = uuid.uuid4().hex
+        self.save(session_id, [])
+        return session_id
+
+    def load(self, session_id: str) -> Optional[History]:
+        row = self._connect().execute(
+            "SELECT updated, history FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None or time.time() - row[0] > self.ttl_seconds:
+            return None
+        return json.loads(row[1])
+
+    def save(self, session_id: str, history: History) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, updated, history) VALUES (?, ?, ?)",
+                (session_id, time.time(), json.dumps(history, ensure_ascii=False)),
+            )
+            conn.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - self.ttl_seconds,))
+
+    def append(self, session_id: str, entries: History) -> None:
+        """Add entries to the end of the history (an expired or unknown session starts empty)."""
+        conn = self._connect()
+        with conn:
+            # Take the write lock before reading: appends from other processes wait for this one
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT updated, history FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            history = json.loads(row[1]) if row is not None and time.time() - row[0] <= self.ttl_seconds else []
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, updated, history) VALUES (?, ?, ?)",
+                (session_id, time.time(), json.dumps(history + list(entries), ensure_ascii=False)),
+            )
+
+    def delete(self, session_id: str) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
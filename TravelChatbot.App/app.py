@@ -1,54 +1,51 @@
-from datetime import datetime
-from agents.controller_agent import ControllerAgent
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from config import validate_config
+from config import CHAT_API_URL
 from dotenv import load_dotenv
 import json
+import requests
 import streamlit as st
  
 # --- Load environment ---
 load_dotenv()
-validate_config()
- 
-# --- Azure OpenAI client ---
-controller_agent = ControllerAgent()
-
-system_message = SystemMessage(content="""You are a travel assistant that can help users with:
-1. Searching for tours and their details
-2. Searching heritage guide information about specific places or cultural sites
-3. Checking their registered tours
-4. Registering for tours
- 
-For heritage guide searches:
-- Use the get_heritage_guide function when searching for cultural or historical information
-- Always include both 'place' and 'search_query' parameters when possible
-- If the user only gives a place (e.g. 'Get me tour heritage in Hue'), infer a relevant search_query automatically, such as 'heritage sites', 'tourist information', or 'places to visit'
- 
-For tour searches:
-- Use the get_tours function to find available tours
-- Results will show tour details including dates and prices
-                               
-For the tours information:
-- Convert time to UTC + 7 for the times in the tour data (yyyy-mm-dd hh:mm format)
-                               
-Based on the user's request, use the appropriate function and parameters.
-""")
-
-state = {
-    "messages": [system_message]
-}
 
 # --- Page config ---
 st.set_page_config(page_title="Travel Chatbot", page_icon="✈️")
 st.title("Travel Chatbot 🌍")
+
+
+def stream_reply(prompt: str):
+    """Send the prompt to the chat API and yield the reply as it streams back."""
+    payload = {"message": prompt, "session_id": st.session_state.session_id}
+    with requests.post(f"{CHAT_API_URL}/chat/stream", json=payload, stream=True, timeout=(5, 300)) as response:
+        if response.status_code == 404:
+            # Session expired on the server, start a new one
+            st.session_state.session_id = None
+            yield from stream_reply(prompt)
+            return
+        if response.status_code == 503:
+            yield "I'm handling a lot of requests right now, please try again in a moment."
+            return
+        response.raise_for_status()
+
+        streamed = False
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data: "):
+                continue
+            event = json.loads(line[len("data: "):])
+            if event["type"] == "session":
+                st.session_state.session_id = event["session_id"]
+            elif event["type"] == "token":
+                streamed = True
+                yield event["content"]
+            elif event["type"] == "done" and not streamed:
+                yield event["content"]
+            elif event["type"] == "error":
+                yield f"I encountered an issue: {event['content']}. Please try again or rephrase your request."
  
 def main():
     # Initialize chat history and pagination state
     if "messages" not in st.session_state:
         st.session_state.messages = []
-        st.session_state.tour_next_token = None
-        st.session_state.heritage_next_token = None
-        st.session_state.last_place = None
+        st.session_state.session_id = None
         st.session_state.messages.append({
             "role": "ai",
             "content": "Hello! I'm your travel assistant. I can help you with:\n"
@@ -69,21 +66,16 @@ def main():
     if prompt := st.chat_input("What can I help you with?"):
         with st.chat_message("human"):
             st.write(prompt)
-            state["messages"].append(HumanMessage(content=prompt))
             st.session_state.messages.append({"role": "human", "content": prompt})
  
-        # Show assistant response
+        # Show assistant response (the conversation state lives in the chat API session)
         with st.chat_message("ai"):
-            with st.spinner("Thinking..."):
-                # Determine which function to use based on user input
-                final_state = controller_agent.invoke(
-                    initial_state=state
-                )
-                content = final_state["messages"][-1].content
+            try:
+                content = st.write_stream(stream_reply(prompt))
+            except requests.RequestException as e:
+                content = f"I couldn't reach the travel assistant service ({e}). Please try again later."
                 st.write(content)
-                st.session_state.messages.append({"role": "ai", "content": content})
-                state["messages"].append(AIMessage(content=content))
+            st.session_state.messages.append({"role": "ai", "content": content})
 
 if __name__ == "__main__":
     main()
-        
\ No newline at end of file
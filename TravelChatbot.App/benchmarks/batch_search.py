@@ -0,0 +1,92 @@
+"""Multi-place search: one search_places call vs get_tours + get_heritage_guide per place.
+
+Runs against the offline stand-ins with simulated embeddings and vector index latency. The
+heritage guide of every tour is ingested first, so both paths are measured on warm guides.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.batch_search --places 3 --rounds 20 --embedding-latency-ms 60 --vector-latency-ms 30
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.environment import PLACES, offline_environment
+from benchmarks.run_benchmark import HERITAGE_TOPICS
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Multi-place batch search benchmark.")
+    parser.add_argument("--places", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=5)
+    parser.add_argument("--embedding-latency-ms", type=float, default=60.0)
+    parser.add_argument("--vector-latency-ms", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    timings: Dict[str, List[float]] = {"per_place": [], "search_places": []}
+    calls: Dict[str, Counter] = {"per_place": Counter(), "search_places": Counter()}
+    with offline_environment(catalog_size=200, seed=args.seed, registrations=0) as env:
+        from tools.tour_catalog import list_tours
+        from tools.tour_tools import _ensure_heritage_ingested, get_heritage_guide, get_tours, search_places
+        from utilities.prefetch import get_prefetcher
+        from utilities.telemetry import add_span_listener, remove_span_listener
+
+        # Measure the searches alone; tools invoked outside a turn would otherwise prefetch concurrently
+        get_prefetcher().enabled = False
+        for place in PLACES:
+            for tour in list_tours(place):
+                _ensure_heritage_ingested(tour.to_dict())
+        env.embeddings.latency = args.embedding_latency_ms / 1000
+        env.tour_index.latency = env.heritage_index.latency = args.vector_latency_ms / 1000
+
+        mode = {"name": None}
+
+        def count(span) -> None:
+            if span.kind == "backend" and mode["name"]:
+                calls[mode["name"]][span.name] += 1
+
+        add_span_listener(count)
+        try:
+            for _ in range(args.rounds):
+                topic = rng.choice(HERITAGE_TOPICS)
+                places = rng.sample(PLACES, args.places)
+
+                mode["name"] = "per_place"
+                started = time.perf_counter()
+                for place in places:
+                    get_tours.invoke({"place": place, "search_query": f"{topic} tours in {place}", "page_size": args.page_size})
+                    get_heritage_guide.invoke({"place": place, "search_query": topic, "page_size": args.page_size})
+                timings["per_place"].append(time.perf_counter() - started)
+
+                mode["name"] = "search_places"
+                started = time.perf_counter()
+                search_places.invoke({
+                    "searches": [{"place": p, "search_query": topic} for p in places],
+                    "page_size": args.page_size,
+                })
+                timings["search_places"].append(time.perf_counter() - started)
+                mode["name"] = None
+        finally:
+            remove_span_listener(count)
+
+    report = {}
+    print(f"{args.places} places x {args.rounds} rounds, embeddings {args.embedding_latency_ms:g} ms, "
+          f"vector index {args.vector_latency_ms:g} ms")
+    for name, values in timings.items():
+        lat = np.asarray(values) * 1000
+        per_round = {k: v / args.rounds for k, v in sorted(calls[name].items())}
+        report[name] = {"p50_ms": float(np.percentile(lat, 50)), "mean_ms": float(lat.mean()), "calls_per_round": per_round}
+        print(f"{name:<14} p50={report[name]['p50_ms']:.0f}ms mean={report[name]['mean_ms']:.0f}ms  "
+              + " ".join(f"{k}={v:g}" for k, v in per_round.items()))
+    print(f"speedup {report['per_place']['p50_ms'] / report['search_places']['p50_ms']:.1f}x")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Recall and memory of the embedding store encodings against full precision.
+
+Embeds the synthetic catalog's tour texts and a set of preference queries with the offline
+embeddings stand-in, builds a store in each encoding, and searches it for every query:
+- without re-scoring (the ranking straight from the codes)
+- with re-scoring of the best --rescore x k candidates from the full vectors
+
+Recall@k is the share of the returned k tours that score at least as high as the k-th best
+tour under exact float32 search (tours tied with it count as hits). Memory is the bytes a search
+scans, next to the full float32 vectors and the same vectors as float64 Python lists.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.embedding_store --catalog-size 20000 --queries 200 --k 10
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.environment import offline_environment
+from benchmarks.run_benchmark import HERITAGE_TOPICS
+
+# A Python float is a 24-byte object plus an 8-byte pointer in its list
+PYTHON_LIST_BYTES_PER_FLOAT = 32
+
+
+def recall(store, queries: np.ndarray, truth: np.ndarray, k: int, rescore: int) -> Dict[str, float]:
+    """Mean tie-aware recall@k and mean search time over the queries."""
+    hits: List[float] = []
+    started = time.perf_counter()
+    results = [store.search(q, k, rescore=rescore) for q in queries]
+    elapsed = time.perf_counter() - started
+    for q, found, exact in zip(queries, results, truth):
+        kth = np.sort(exact)[-k]
+        rows = [store.row(id_) for id_, _ in found]
+        hits.append(float(np.mean(exact[rows] >= kth - 1e-6)))
+    return {"recall": float(np.mean(hits)), "search_ms": elapsed / len(queries) * 1000}
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Embedding store encodings benchmark.")
+    parser.add_argument("--catalog-size", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, default=10, help="candidates re-scored, as a multiple of k")
+    parser.add_argument("--pq-subspaces", type=int, default=96)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    report: Dict[str, Any] = {}
+    with offline_environment(catalog_size=args.catalog_size, seed=args.seed, registrations=0) as env:
+        from tools.tour_search import embed_texts, tour_search_text
+        from utilities.embedding_store import EmbeddingStore, normalize
+
+        ids = [t["tourId"] for t in env.tours]
+        vectors = np.asarray(embed_texts([tour_search_text(t) for t in env.tours], purpose="benchmark"), dtype=np.float32)
+        texts = [" and ".join(rng.sample(HERITAGE_TOPICS, 2)) + f" in {rng.choice(env.places)}" for _ in range(args.queries)]
+        queries = normalize(np.asarray(embed_texts(texts, purpose="benchmark"), dtype=np.float32))
+        truth = normalize(vectors) @ queries.T  # (tours, queries)
+        truth = truth.T
+
+        n, dimension = vectors.shape
+        report["python_lists_bytes"] = n * dimension * PYTHON_LIST_BYTES_PER_FLOAT
+        with tempfile.TemporaryDirectory(prefix="travelbot-embedding-store-", dir=env.scratch_dir) as scratch:
+            for encoding in ("float32", "float16", "int8", "pq"):
+                started = time.perf_counter()
+                built = EmbeddingStore.build(ids, vectors, encoding=encoding, pq_subspaces=args.pq_subspaces, seed=args.seed)
+                build_s = time.perf_counter() - started
+                path = os.path.join(scratch, encoding)
+                built.save(path)
+                store = EmbeddingStore.open(path)
+                report[encoding] = {
+                    "build_s": build_s,
+                    "bytes": store.nbytes(),
+                    "no_rescore": recall(store, queries, truth, args.k, rescore=1),
+                    "rescore": recall(store, queries, truth, args.k, rescore=args.rescore),
+                }
+
+    print(f"{n} tours x {dimension} dimensions, {args.queries} queries, recall@{args.k}, "
+          f"re-scoring {args.rescore} x k candidates")
+    print(f"float64 Python lists  {report['python_lists_bytes'] / 2**20:8.1f} MiB")
+    for encoding in ("float32", "float16", "int8", "pq"):
+        row = report[encoding]
+        print(f"{encoding:<8} scanned {row['bytes']['scan'] / 2**20:7.1f} MiB (full vectors {row['bytes']['full'] / 2**20:.1f} MiB"
+              f" on disk)  build {row['build_s']:.1f}s  recall {row['no_rescore']['recall']:.3f} -> "
+              f"{row['rescore']['recall']:.3f} re-scored  search {row['rescore']['search_ms']:.2f}ms")
+    return report
+
+
+if __name__ == "__main__":
+    main()
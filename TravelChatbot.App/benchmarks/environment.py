@@ -0,0 +1,342 @@
+"""Fully offline environment for benchmarks.
+
+`offline_environment()` points config at dummy credentials, starts moto for DynamoDB and S3,
+swaps Pinecone and the embeddings client for the local fakes, creates the `Tours` and
+`UserTours` tables and the heritage guide bucket, and seeds a synthetic catalog. moto's DynamoDB
+writes are serialized so conditional writes are atomic across threads, as in DynamoDB.
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+from unittest import mock
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+OFFLINE_ENV = {
+    "OPENAI_API_KEY": "offline",
+    "OPENAI_ENDPOINT": "http://127.0.0.1:9/offline",
+    "OPENAI_DEPLOYMENT_NAME": "scripted-chat",
+    "OPENAI_TEXT_EMBEDED_API_KEY": "offline",
+    "OPENAI_TEXT_EMBEDED_DEPLOYMENT_NAME": "fake-embeddings",
+    "PINECONE_API_KEY": "offline",
+    "PINECONE_ENVIRONMENT": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_SECURITY_TOKEN": "testing",
+    "AWS_SESSION_TOKEN": "testing",
+    "AWS_REGION": "us-east-1",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "HERITAGE_GUIDE_S3_BUCKET": "heritage-guides-offline",
+}
+
+PLACES = ["Ha Noi", "Hue", "Hoi An", "Da Nang", "Ha Long", "Sa Pa", "Nha Trang", "Da Lat", "Can Tho", "Phu Quoc"]
+CATEGORIES = ["culture", "food", "nature", "adventure", "history", "relax"]
+SITES = {
+    "Ha Noi": ["Hoan Kiem Lake", "Temple of Literature", "Old Quarter", "One Pillar Pagoda", "Long Bien Bridge"],
+    "Hue": ["Imperial City", "Thien Mu Pagoda", "Tomb of Tu Duc", "Dong Ba Market", "Perfume River"],
+    "Hoi An": ["Japanese Covered Bridge", "Tan Ky House", "An Bang Beach", "Hoi An Night Market", "Thu Bon River"],
+}
+REGISTERED_PHONE = "0258963147"
+
+
+@dataclass
+class OfflineEnvironment:
+    catalog_size: int
+    tours: List[Dict] = field(default_factory=list)
+    phones: List[str] = field(default_factory=list)
+    embeddings: Any = None
+    tour_index: Any = None
+    heritage_index: Any = None
+    scratch_dir: str = ""  # temporary directory removed when the environment closes
+
+    @property
+    def places(self) -> List[str]:
+        return PLACES
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """Build a minimal text-only PDF (Helvetica, one text object per page)."""
+    objects: List[bytes] = []
+    page_ids = []
+    font_id = 3
+    next_id = 4
+    for lines in pages:
+        stream = "BT /F1 10 Tf 40 760 Td 12 TL " + " ".join(f"({_pdf_escape(l)}) Tj T*" for l in lines) + " ET"
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        objects.append((content_id, f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream".encode("latin-1")))
+        objects.append((page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode("latin-1")))
+        page_ids.append(page_id)
+
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    objects = [
+        (1, b"<< /Type /Catalog /Pages 2 0 R >>"),
+        (2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode("latin-1")),
+        (font_id, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"),
+    ] + objects
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id, body in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += f"{obj_id} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for obj_id in range(1, len(objects) + 1):
+        out += f"{offsets[obj_id]:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+def heritage_guide_text(place: str, rng: random.Random, paragraphs: int = 24) -> List[str]:
+    """Generate guide lines for a place (wrapped at ~90 characters)."""
+    sites = SITES.get(place, [f"{place} Citadel", f"{place} Museum", f"{place} Market", f"{place} Pagoda"])
+    topics = ["history", "architecture", "street food", "festivals", "opening hours", "ticket prices", "local crafts"]
+    text = []
+    if place == "Ha Noi":
+        text.append(
+            "HOAN KIEM LAKE A SHOWCASE OF SUMMER CUISINE IN HANOI. In summer the streets around Hoan Kiem Lake fill "
+            "with stalls selling bun cha, green rice cakes, iced lotus tea and grilled corn."
+        )
+    for i in range(paragraphs):
+        site = sites[i % len(sites)]
+        topic = topics[rng.randrange(len(topics))]
+        text.append(
+            f"{site} in {place} is known for its {topic}. Visitors who come in the early morning can enjoy the "
+            f"{topic} of {site} before the crowds arrive. Local guides explain how {site} shaped the {topic} of "
+            f"{place} over several centuries, and recommend combining the visit with nearby markets."
+        )
+
+    lines = []
+    for paragraph in text:
+        words, line = paragraph.split(), ""
+        for word in words:
+            if len(line) + len(word) + 1 > 90:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}".strip()
+        lines.append(line)
+        lines.append("")
+    return lines
+
+
+def generate_catalog(catalog_size: int, rng: random.Random) -> List[Dict]:
+    base = 1767225600  # 2026-01-01T00:00:00Z
+    tours = []
+    for i in range(catalog_size):
+        place = PLACES[i % len(PLACES)]
+        start = base + rng.randrange(0, 365) * 86400 + rng.choice([7, 8, 9, 13]) * 3600
+        slug = place.lower().replace(" ", "-")
+        tours.append({
+            "place": place,
+            "tourId": f"{slug}-{i:06d}",
+            "title": f"{rng.choice(CATEGORIES).title()} tour of {place} #{i}",
+            "startDate": start,
+            "endDate": start + rng.choice([1, 2, 3, 5]) * 86400,
+            "price": rng.randrange(300, 3000) * 1000,
+            "status": "open",
+            "category": rng.choice(CATEGORIES),
+            "heritageGuide": f"heritage/{slug}.pdf",
+        })
+    return tours
+
+
+def _create_tables(dynamodb) -> None:
+    dynamodb.create_table(
+        TableName="Tours",
+        KeySchema=[{"AttributeName": "place", "KeyType": "HASH"}, {"AttributeName": "tourId", "KeyType": "RANGE"}],
+        AttributeDefinitions=[
+            {"AttributeName": "place", "AttributeType": "S"},
+            {"AttributeName": "tourId", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[{
+            "IndexName": "tourId-index",
+            "KeySchema": [{"AttributeName": "tourId", "KeyType": "HASH"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }],
+        BillingMode="PAY_PER_REQUEST",
+        # The catalog snapshot follows this stream (tools/tour_catalog.py)
+        StreamSpecification={"StreamEnabled": True, "StreamViewType": "NEW_IMAGE"},
+    )
+    dynamodb.create_table(
+        TableName="UserTours",
+        KeySchema=[{"AttributeName": "tourId", "KeyType": "HASH"}, {"AttributeName": "phoneNumber", "KeyType": "RANGE"}],
+        AttributeDefinitions=[
+            {"AttributeName": "tourId", "AttributeType": "S"},
+            {"AttributeName": "phoneNumber", "AttributeType": "S"},
+            {"AttributeName": "createAt", "AttributeType": "N"},
+        ],
+        GlobalSecondaryIndexes=[{
+            "IndexName": "phoneNumber-createAt-index",
+            "KeySchema": [
+                {"AttributeName": "phoneNumber", "KeyType": "HASH"},
+                {"AttributeName": "createAt", "KeyType": "RANGE"},
+            ],
+            "Projection": {"ProjectionType": "ALL"},
+        }],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+def _batch_write(dynamodb, table: str, items: List[Dict]) -> None:
+    for start in range(0, len(items), 25):
+        requests = [{"PutRequest": {"Item": item}} for item in items[start:start + 25]]
+        dynamodb.batch_write_item(RequestItems={table: requests})
+
+
+# moto checks a write's condition and applies it without a lock, so two threads can both pass
+# attribute_not_exists; DynamoDB evaluates a conditional write atomically
+_DYNAMODB_WRITES = ("put_item", "update_item", "delete_item", "batch_write_item", "transact_write_items")
+_dynamodb_write_lock = threading.RLock()
+
+
+def _serialize_dynamodb_writes() -> List[Any]:
+    """Started patches that run the moto DynamoDB backend's writes one at a time."""
+    from moto.dynamodb.models import DynamoDBBackend
+
+    def serialized(write):
+        def run(self, *args, **kwargs):
+            with _dynamodb_write_lock:
+                return write(self, *args, **kwargs)
+        return run
+
+    patches = [mock.patch.object(DynamoDBBackend, name, serialized(getattr(DynamoDBBackend, name))) for name in _DYNAMODB_WRITES]
+    for patch in patches:
+        patch.start()
+    return patches
+
+
+@contextmanager
+def offline_environment(
+    catalog_size: int = 500,
+    seed: int = 7,
+    embedding_latency: Optional[float] = None,
+    vector_latency: Optional[float] = None,
+    aws_latency: Optional[float] = None,
+    registrations: int = 20,
+) -> Iterator[OfflineEnvironment]:
+    """Start the offline stand-ins and seed them. Latencies are in seconds per call."""
+    for key, value in OFFLINE_ENV.items():
+        os.environ[key] = value
+
+    import boto3
+    from moto import mock_aws
+    from benchmarks.fakes import FakeEmbeddingsClient, FakePinecone
+
+    rng = random.Random(seed)
+    env = OfflineEnvironment(catalog_size=catalog_size)
+    from tools import registrations as registration_cache, tour_catalog
+    from utilities import aws_clients, chunk_store, prefetch, resilience, s3_download, s3_utils, single_flight
+
+    aws = mock_aws()
+    aws.start()
+    write_patches = _serialize_dynamodb_writes()
+    aws_clients._clients.clear()
+    tour_catalog.reset()
+    registration_cache.reset()
+    prefetch.reset()
+    s3_utils._presigned.clear()
+    # Fresh chunk text store per environment, like the fresh vector indexes
+    scratch = tempfile.TemporaryDirectory(prefix="travelbot-offline-")
+    env.scratch_dir = scratch.name
+    chunk_store._store = chunk_store.ChunkStore(os.path.join(scratch.name, "chunks.sqlite3"))
+    s3_download._manager = s3_download.S3DownloadManager(cache_dir=os.path.join(scratch.name, "s3_cache"))
+    single_flight.reset(lock_dir=os.path.join(scratch.name, "single_flight"))
+    resilience.reset()
+    FakePinecone._indexes = {}
+    FakePinecone.latency = vector_latency
+    try:
+        with mock.patch("pinecone.Pinecone", FakePinecone):
+            import tools.tour_search as tour_search
+        # Re-bind module globals in case tour_search was imported by an earlier environment
+        pc = FakePinecone()
+        for name in (tour_search.TOURS_INDEX, tour_search.TOUR_HERITAGE_INDEX):
+            pc.create_index(name)
+        tour_search.pc = pc
+        tour_search.tour_index = pc.Index(tour_search.TOURS_INDEX)
+        tour_search.tour_heritage_index = pc.Index(tour_search.TOUR_HERITAGE_INDEX)
+        tour_search.openai_client = FakeEmbeddingsClient(latency=embedding_latency)
+        # The recommender's tour vectors came from the previous environment's index
+        from tools import group_recommender
+        group_recommender.reset(store_dir=os.path.join(scratch.name, "embedding_store"))
+        tour_search._query_embeddings.clear()
+
+        env.embeddings = tour_search.openai_client
+        env.tour_index = tour_search.tour_index
+        env.heritage_index = tour_search.tour_heritage_index
+
+        from models.tour import Tour
+
+        region = OFFLINE_ENV["AWS_REGION"]
+        dynamodb = boto3.client("dynamodb", region_name=region)
+        _create_tables(dynamodb)
+        s3 = boto3.client("s3", region_name=region)
+        s3.create_bucket(Bucket=OFFLINE_ENV["HERITAGE_GUIDE_S3_BUCKET"])
+
+        env.tours = generate_catalog(catalog_size, rng)
+        _batch_write(dynamodb, "Tours", [Tour(**t).to_dynamodb() for t in env.tours])
+
+        for place in PLACES:
+            lines = heritage_guide_text(place, rng)
+            pages = [lines[i:i + 55] for i in range(0, len(lines), 55)]
+            s3.put_object(
+                Bucket=OFFLINE_ENV["HERITAGE_GUIDE_S3_BUCKET"],
+                Key=f"heritage/{place.lower().replace(' ', '-')}.pdf",
+                Body=build_pdf(pages),
+                ContentType="application/pdf",
+            )
+
+        # Populate the tours vector index with the catalog sync job
+        from tools.tour_sync import sync_tours_index
+        sync_tours_index()
+
+        env.phones = [REGISTERED_PHONE] + [f"09{rng.randrange(10**8):08d}" for _ in range(49)]
+        user_tours = {}
+        for i in range(registrations if env.tours else 0):
+            tour = env.tours[rng.randrange(len(env.tours))]
+            phone = REGISTERED_PHONE if i < 3 else rng.choice(env.phones)
+            user_tours[(tour["tourId"], phone)] = {
+                "tourId": {"S": tour["tourId"]},
+                "phoneNumber": {"S": phone},
+                "createAt": {"N": str(1760000000 + i * 60)},
+                "startDate": {"N": str(tour["startDate"])},
+            }
+        _batch_write(dynamodb, "UserTours", list(user_tours.values()))
+
+        if aws_latency:
+            # Simulated network round-trip for every DynamoDB/S3 API call (clients made from now on)
+            boto3.setup_default_session()
+            boto3.DEFAULT_SESSION.events.register("before-call", lambda **kwargs: time.sleep(aws_latency))
+            aws_clients._clients.clear()
+
+        yield env
+    finally:
+        # Queued prefetch work must not run against the stopped stand-ins
+        prefetch.reset()
+        tour_catalog.reset()
+        registration_cache.reset()
+        chunk_store._store = None
+        s3_download._manager = None
+        single_flight.reset()
+        resilience.reset()
+        scratch.cleanup()
+        for patch in write_patches:
+            patch.stop()
+        aws.stop()
+        boto3.DEFAULT_SESSION = None
@@ -0,0 +1,448 @@
+"""Offline stand-ins for the LLM, the embeddings deployment and Pinecone.
+
+- ScriptedChatModel: a LangChain chat model that turns the scenario prompts into the same
+  tool calls the real model issues, then answers from the tool results.
+- FakeEmbeddingsClient: deterministic hashed bag-of-words embeddings exposing the
+  `openai_client.embeddings.create` surface used by tools/tour_search.py.
+- FakePinecone / LocalVectorIndex: an in-memory brute-force cosine index with the subset of
+  the Pinecone Index API the tools use (query, fetch, upsert, delete, list).
+- LocalObjectStore: S3 GetObject/PutObject backed by local files, with ranges, conditional
+  requests and streamed bodies (moto builds every response in memory).
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+Latency = Union[float, Callable[[], float]]
+
+
+def _sleep(latency: Optional[Latency], timeout: Optional[float] = None) -> None:
+    """Simulate a remote call; like a client, give up with TimeoutError after `timeout` seconds."""
+    if latency is None:
+        return
+    seconds = latency() if callable(latency) else latency
+    if timeout is not None and seconds > timeout:
+        time.sleep(timeout)
+        raise TimeoutError(f"request timed out after {timeout:.3f}s")
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that maps user requests to tool calls with fixed rules.
+
+    Rules are tried in order against the latest human message; the first match produces a
+    tool call. Once the latest message is a tool result, the model answers with a short
+    summary of that result. `latency` simulates model response time per call, and
+    `error_rate` the fraction of calls that fail. With `repeat_tools` the model never
+    answers while it has tools: it repeats its tool call after every result (a model stuck
+    in a loop). Without tools bound, it always answers from the results so far.
+    """
+
+    latency: float = 0.0
+    error_rate: float = 0.0
+    repeat_tools: bool = False
+    tools_bound: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"tools_bound": True})
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        _sleep(self.latency, kwargs.get("timeout"))
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError("scripted model unavailable")
+        last = messages[-1]
+        answer = not self.tools_bound or (isinstance(last, ToolMessage) and not self.repeat_tools)
+        if answer:
+            results = [m for m in messages[self._last_human_index(messages) + 1:] if isinstance(m, ToolMessage)]
+            content = "Here is what I found:\n" + "\n".join(str(m.content)[:300] for m in results)
+            message = AIMessage(content=content)
+        else:
+            human = messages[self._last_human_index(messages)]
+            tool_call = self.plan(str(human.content))
+            if tool_call is None:
+                message = AIMessage(content="I can help you search tours, heritage guides and registrations.")
+            else:
+                message = AIMessage(content="", tool_calls=[{**tool_call, "id": f"call_{uuid.uuid4().hex[:12]}"}])
+
+        prompt_tokens = sum(_estimate_tokens(str(m.content)) for m in messages)
+        completion_tokens = _estimate_tokens(str(message.content) + json.dumps(message.tool_calls))
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @staticmethod
+    def _last_human_index(messages: List[BaseMessage]) -> int:
+        for i in range(len(messages) - 1, -1, -1):
+            if isinstance(messages[i], HumanMessage):
+                return i
+        return 0
+
+    @staticmethod
+    def plan(text: str) -> Optional[Dict[str, Any]]:
+        m = re.search(r"registered tours for phone number (\d+)", text, re.IGNORECASE)
+        if m:
+            return {"name": "get_registered_tours", "args": {"phoneNumber": m.group(1)}}
+
+        m = re.search(r"register (?:for )?tour ([\w-]+) (?:for|with) phone numbers ([\d ,and]+)", text, re.IGNORECASE)
+        if m:
+            phones = re.findall(r"\d+", m.group(2))
+            return {"name": "register_group_tour", "args": {"tourId": m.group(1), "phoneNumbers": phones}}
+
+        m = re.search(r"register (?:for )?tour ([\w-]+) (?:for|with) phone number (\d+)", text, re.IGNORECASE)
+        if m:
+            return {"name": "register_tour", "args": {"tourId": m.group(1), "phoneNumber": m.group(2)}}
+
+        m = re.search(r"(?:itinerary|trip) (?:to|for|covering) (.+?)(?: about (.+?))?[?.!]*$", text, re.IGNORECASE)
+        if m:
+            places = [p.strip() for p in re.split(r",|\band\b", m.group(1)) if p.strip()]
+            searches = [{"place": p, "search_query": m.group(2)} for p in places]
+            return {"name": "search_places", "args": {"searches": searches}}
+
+        m = re.search(r"recommend tours for (?:our|my) group(?: in ([\w ]+?))?: (.+)$", text, re.IGNORECASE)
+        if m:
+            members = []
+            for part in m.group(2).split(";"):
+                member = re.match(r"\s*(\w+) likes (.+?)(?: under (\d+)(?: VND)?)?[?.!]*\s*$", part, re.IGNORECASE)
+                if member:
+                    entry = {"name": member.group(1), "preferences": member.group(2)}
+                    if member.group(3):
+                        entry["max_price"] = int(member.group(3))
+                    members.append(entry)
+            args = {"members": members}
+            if m.group(1):
+                args["place"] = m.group(1).strip()
+            return {"name": "recommend_group_tours", "args": args}
+
+        m = re.search(r"heritage guide in (.+?) about (.+)$", text, re.IGNORECASE)
+        if m:
+            return {"name": "get_heritage_guide", "args": {"place": m.group(1).strip(), "search_query": m.group(2).strip()}}
+
+        m = re.search(r"heritage (?:guide |sites )?in ([\w ]+?)[?.!]*$", text, re.IGNORECASE)
+        if m:
+            return {"name": "get_heritage_guide", "args": {"place": m.group(1).strip()}}
+
+        m = re.search(r"tours in ([\w ]+?) under (\d+)", text, re.IGNORECASE)
+        if m:
+            return {"name": "get_tours", "args": {"place": m.group(1).strip(), "max_price": int(m.group(2)), "sort_by": "price"}}
+
+        m = re.search(r"tours in ([\w ]+?)[?.!]*$", text, re.IGNORECASE)
+        if m:
+            return {"name": "get_tours", "args": {"place": m.group(1).strip()}}
+        return None
+
+
+class FakeEmbeddingsClient:
+    """Deterministic embeddings: hashed unigrams and bigrams, L2-normalised.
+
+    Texts sharing words get similar vectors, so semantic search behaves plausibly.
+    """
+
+    def __init__(self, dimension: int = 1536, latency: Optional[Latency] = None):
+        self.dimension = dimension
+        self.latency = latency
+        self.calls = 0
+        self.embeddings = SimpleNamespace(create=self.create)
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        words = re.findall(r"\w+", text.lower())
+        for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            h = zlib.crc32(token.encode("utf-8"))
+            vector[h % self.dimension] += 1.0 if (h >> 16) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector
+
+    def create(self, input: Union[str, Sequence[str]], model: Optional[str] = None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        _sleep(self.latency, kwargs.get("timeout"))
+        texts = [input] if isinstance(input, str) else list(input)
+        data = [SimpleNamespace(index=i, embedding=self.embed(t).tolist()) for i, t in enumerate(texts)]
+        tokens = sum(_estimate_tokens(t) for t in texts)
+        return SimpleNamespace(data=data, usage=SimpleNamespace(prompt_tokens=tokens, total_tokens=tokens), model=model)
+
+
+class FetchResponse(dict):
+    """dict with a `.vectors` attribute, like the Pinecone SDK response."""
+
+    @property
+    def vectors(self) -> Dict[str, Any]:
+        return self["vectors"]
+
+
+def _match_filter(metadata: Dict[str, Any], filter_dict: Optional[Dict[str, Any]]) -> bool:
+    if not filter_dict:
+        return True
+    for key, condition in filter_dict.items():
+        if key == "$and":
+            if not all(_match_filter(metadata, f) for f in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(_match_filter(metadata, f) for f in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, expected in condition.items():
+            if op == "$eq" and value != expected:
+                return False
+            if op == "$ne" and value == expected:
+                return False
+            if op == "$in" and value not in expected:
+                return False
+            if op == "$nin" and value in expected:
+                return False
+            if op in ("$lt", "$lte", "$gt", "$gte"):
+                if value is None:
+                    return False
+                if op == "$lt" and not value < expected:
+                    return False
+                if op == "$lte" and not value <= expected:
+                    return False
+                if op == "$gt" and not value > expected:
+                    return False
+                if op == "$gte" and not value >= expected:
+                    return False
+    return True
+
+
+class LocalVectorIndex:
+    """Brute-force cosine index with the Pinecone Index methods used by the tools."""
+
+    def __init__(self, name: str, dimension: int = 1536, latency: Optional[Latency] = None,
+                 bytes_per_second: Optional[float] = None):
+        self.name = name
+        self.dimension = dimension
+        self.latency = latency
+        # Simulated transfer time for query responses, proportional to their JSON size
+        self.bytes_per_second = bytes_per_second
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: Optional[str] = None, **kwargs) -> Dict[str, int]:
+        _sleep(self.latency)
+        with self._lock:
+            for v in vectors:
+                values = np.asarray(v["values"], dtype=np.float32)
+                norm = np.linalg.norm(values)
+                self._vectors[v["id"]] = values / norm if norm else values
+                self._metadata[v["id"]] = dict(v.get("metadata") or {})
+            self._matrix = None
+        return {"upserted_count": len(vectors)}
+
+    def fetch(self, ids: List[str], namespace: Optional[str] = None, **kwargs) -> FetchResponse:
+        _sleep(self.latency, kwargs.get("timeout"))
+        with self._lock:
+            found = {
+                i: {"id": i, "values": self._vectors[i].tolist(), "metadata": dict(self._metadata[i])}
+                for i in ids if i in self._vectors
+            }
+        return FetchResponse(vectors=found, namespace=namespace or "")
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False, **kwargs) -> Dict[str, Any]:
+        _sleep(self.latency)
+        with self._lock:
+            if delete_all:
+                self._vectors.clear()
+                self._metadata.clear()
+            for i in ids or []:
+                self._vectors.pop(i, None)
+                self._metadata.pop(i, None)
+            self._matrix = None
+        return {}
+
+    def list(self, prefix: Optional[str] = None, limit: int = 100, **kwargs):
+        """Yield pages like the serverless `Index.list` generator: `.vectors` of items with an `.id`."""
+        with self._lock:
+            ids = sorted(i for i in self._vectors if not prefix or i.startswith(prefix))
+        for start in range(0, len(ids), limit):
+            more = start + limit < len(ids)
+            yield SimpleNamespace(
+                vectors=[SimpleNamespace(id=i) for i in ids[start:start + limit]],
+                pagination=SimpleNamespace(next=ids[start + limit]) if more else None,
+            )
+
+    def query(
+        self,
+        vector: Optional[List[float]] = None,
+        id: Optional[str] = None,
+        top_k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = False,
+        include_values: bool = False,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        _sleep(self.latency, kwargs.get("timeout"))
+        with self._lock:
+            if self._matrix is None:
+                self._matrix_ids = list(self._vectors)
+                self._matrix = (
+                    np.vstack([self._vectors[i] for i in self._matrix_ids])
+                    if self._matrix_ids else np.zeros((0, self.dimension), dtype=np.float32)
+                )
+            matrix, ids = self._matrix, self._matrix_ids
+            metadata = self._metadata
+            query = self._vectors.get(id) if id is not None else np.asarray(vector, dtype=np.float32)
+
+        if query is None or not len(ids):
+            return {"matches": [], "namespace": ""}
+
+        scores = matrix @ query
+        if filter:
+            mask = np.fromiter((_match_filter(metadata.get(i, {}), filter) for i in ids), dtype=bool, count=len(ids))
+            scores = np.where(mask, scores, -np.inf)
+        k = min(top_k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        matches = []
+        for row in top:
+            if not np.isfinite(scores[row]):
+                continue
+            match = {"id": ids[row], "score": float(scores[row])}
+            if include_metadata:
+                match["metadata"] = dict(metadata.get(ids[row], {}))
+            if include_values:
+                match["values"] = matrix[row].tolist()
+            matches.append(match)
+        response = {"matches": matches, "namespace": ""}
+        if self.bytes_per_second:
+            time.sleep(len(json.dumps(response).encode("utf-8")) / self.bytes_per_second)
+        return response
+
+    def describe_index_stats(self, **kwargs) -> Dict[str, Any]:
+        return {"dimension": self.dimension, "total_vector_count": len(self._vectors)}
+
+
+class FakePinecone:
+    """Stand-in for `pinecone.Pinecone`; indexes live for the life of the process."""
+
+    _indexes: Dict[str, LocalVectorIndex] = {}
+    latency: Optional[Latency] = None
+
+    def __init__(self, api_key: Optional[str] = None, **kwargs):
+        self.api_key = api_key
+
+    def list_indexes(self):
+        return [SimpleNamespace(name=name) for name in self._indexes]
+
+    def create_index(self, name: str, dimension: int = 1536, **kwargs) -> None:
+        if name not in self._indexes:
+            self._indexes[name] = LocalVectorIndex(name, dimension, latency=FakePinecone.latency)
+
+    def Index(self, name: str) -> LocalVectorIndex:
+        if name not in self._indexes:
+            self.create_index(name)
+        return self._indexes[name]
+
+
+class _StreamedBody:
+    """A byte range of a local file, read like a botocore StreamingBody at a simulated bandwidth."""
+
+    def __init__(self, path: str, start: int, length: int, bytes_per_second: Optional[float]):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = length
+        self._bytes_per_second = bytes_per_second
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        if not self._remaining:
+            return b""
+        n = self._remaining if amt is None or amt < 0 else min(amt, self._remaining)
+        data = self._file.read(n)
+        self._remaining -= len(data)
+        if self._bytes_per_second and data:
+            time.sleep(len(data) / self._bytes_per_second)
+        if not self._remaining:
+            self._file.close()
+        return data
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class LocalObjectStore:
+    """S3 client stand-in for get_object/put_object; each response pays latency once and streams its body."""
+
+    def __init__(self, root: str, latency: Optional[Latency] = None, bytes_per_second: Optional[float] = None):
+        self.root = root
+        self.latency = latency
+        self.bytes_per_second = bytes_per_second  # per connection, like S3
+        self._etags: Dict[str, str] = {}
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root, hashlib.sha256(f"{bucket}/{key}".encode("utf-8")).hexdigest())
+
+    @staticmethod
+    def _error(code: str, status: int, operation: str = "GetObject"):
+        from botocore.exceptions import ClientError
+        return ClientError({"Error": {"Code": code, "Message": code}, "ResponseMetadata": {"HTTPStatusCode": status}}, operation)
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> Dict[str, Any]:
+        with open(self._path(Bucket, Key), "wb") as f:
+            f.write(Body)
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        self._etags[self._path(Bucket, Key)] = etag
+        return {"ETag": etag}
+
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None, IfMatch: Optional[str] = None,
+                   IfNoneMatch: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        _sleep(self.latency)
+        path = self._path(Bucket, Key)
+        if path not in self._etags:
+            raise self._error("NoSuchKey", 404)
+        etag = self._etags[path]
+        if IfMatch is not None and IfMatch != etag:
+            raise self._error("PreconditionFailed", 412)
+        if IfNoneMatch is not None and IfNoneMatch == etag:
+            raise self._error("304", 304)
+        size = os.path.getsize(path)
+        response: Dict[str, Any] = {"ETag": etag}
+        start, end = 0, size - 1
+        if Range:
+            m = re.match(r"bytes=(\d+)-(\d*)", Range)
+            start = int(m.group(1))
+            if start >= size:
+                raise self._error("InvalidRange", 416)
+            end = min(int(m.group(2)) if m.group(2) else size - 1, size - 1)
+            response["ContentRange"] = f"bytes {start}-{end}/{size}"
+        response["ContentLength"] = end - start + 1
+        response["Body"] = _StreamedBody(path, start, end - start + 1, self.bytes_per_second)
+        return response
@@ -0,0 +1,116 @@
+"""Latency of group recommendations over the whole catalog.
+
+Runs these steps against the offline stand-ins:
+1. Load the tour vectors into the recommender matrix.
+2. Rank the catalog for random groups with each aggregation strategy.
+3. Change a fraction of the Tours table, refresh the catalog, and time the incremental rebuild.
+
+As a reference it also times the per-member approach: one search_tours call per member,
+with results merged in Python.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.group_recommender --catalog-size 10000 --members 4 --requests 200
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.environment import offline_environment
+from benchmarks.run_benchmark import HERITAGE_TOPICS
+
+
+def _ms(values: List[float]) -> Dict[str, float]:
+    lat = np.asarray(values) * 1000
+    return {"p50_ms": float(np.percentile(lat, 50)), "p95_ms": float(np.percentile(lat, 95))}
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Group recommender benchmark.")
+    parser.add_argument("--catalog-size", type=int, default=10000)
+    parser.add_argument("--members", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--churn", type=float, default=0.01, help="fraction of tours changed before the rebuild")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    report: Dict[str, Any] = {}
+    with offline_environment(catalog_size=args.catalog_size, seed=args.seed, registrations=0) as env:
+        from models.tour import Tour
+        from tools.group_recommender import STRATEGIES, recommend_for_group, tour_embeddings
+        from tools.tour_catalog import catalog
+        from tools.tour_search import search_tours
+        from utilities.aws_clients import get_client
+        from utilities.telemetry import add_span_listener, remove_span_listener
+
+        built: Counter = Counter()
+
+        def count(span) -> None:
+            if span.name == "recommender.build":
+                built.update({k: span.attributes.get(k, 0) for k in ("reused", "from_index", "embedded")})
+
+        def group() -> List[Dict[str, Any]]:
+            members = []
+            for i in range(args.members):
+                member = {"name": f"m{i}", "preferences": " and ".join(rng.sample(HERITAGE_TOPICS, 2))}
+                if rng.random() < 0.5:
+                    member["max_price"] = rng.randrange(10, 30) * 100000
+                members.append(member)
+            return members
+
+        add_span_listener(count)
+        try:
+            table = catalog().snapshot().table
+            started = time.perf_counter()
+            tour_embeddings(table)
+            report["cold_build_ms"] = (time.perf_counter() - started) * 1000
+            report["cold_build"] = dict(built)
+
+            for strategy in STRATEGIES:
+                timings = []
+                for _ in range(args.requests):
+                    members, place = group(), rng.choice([None, rng.choice(env.places)])
+                    started = time.perf_counter()
+                    recommend_for_group(members, strategy=strategy, place=place)
+                    timings.append(time.perf_counter() - started)
+                report[strategy] = _ms(timings)
+
+            timings = []
+            for _ in range(max(1, args.requests // 10)):
+                members = group()
+                started = time.perf_counter()
+                merged: Dict[str, float] = {}
+                for member in members:
+                    for hit in search_tours(member["preferences"], type="tour_info", page_size=50)["results"]:
+                        merged[hit["tourId"]] = merged.get(hit["tourId"], 0.0) + 1.0
+                sorted(merged, key=merged.get, reverse=True)[:5]
+                timings.append(time.perf_counter() - started)
+            report["per_member_search"] = _ms(timings)
+
+            n = max(1, int(len(env.tours) * args.churn))
+            dynamodb = get_client("dynamodb")
+            for tour in rng.sample(env.tours, n):
+                dynamodb.put_item(TableName="Tours", Item=Tour(**{**tour, "title": tour["title"] + " (new)"}).to_dynamodb())
+            built.clear()
+            table = catalog().refresh().table
+            started = time.perf_counter()
+            tour_embeddings(table)
+            report["rebuild_ms"] = (time.perf_counter() - started) * 1000
+            report["rebuild"] = dict(built)
+        finally:
+            remove_span_listener(count)
+
+    print(f"{args.catalog_size} tours, {args.members} members per group, {args.requests} requests per strategy")
+    print(f"cold build   {report['cold_build_ms']:8.0f} ms  {report['cold_build']}")
+    for name in list(STRATEGIES) + ["per_member_search"]:
+        print(f"{name:<18} p50={report[name]['p50_ms']:.2f}ms p95={report[name]['p95_ms']:.2f}ms")
+    print(f"rebuild after {n} changed tours {report['rebuild_ms']:.0f} ms  {report['rebuild']}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
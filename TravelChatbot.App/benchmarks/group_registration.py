@@ -0,0 +1,60 @@
+"""Latency of register_group_tour versus registering members one by one with register_tour.
+
+moto snapshots the whole table for every transaction, so with large groups the stand-in itself
+dominates the group timings; the DynamoDB call counts are the portable comparison.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.group_registration --sizes 4 12 50 150 --aws-latency-ms 10
+"""
+import argparse
+import time
+from collections import Counter
+
+from benchmarks.environment import offline_environment
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Group registration vs per-member loop.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 12, 50, 150])
+    parser.add_argument("--aws-latency-ms", type=float, default=10.0, help="simulated DynamoDB round-trip")
+    args = parser.parse_args(argv)
+
+    with offline_environment(catalog_size=len(args.sizes) * 2 + 2, aws_latency=args.aws_latency_ms / 1000 or None) as env:
+        from tools.tour_tools import register_group_tour, register_tour
+        from utilities.telemetry import add_span_listener, remove_span_listener
+
+        calls: Counter = Counter()
+
+        def count(span) -> None:
+            if span.name.startswith("dynamodb."):
+                calls["dynamodb"] += 1
+
+        add_span_listener(count)
+        print(f"{'group':>6} {'loop ms':>10} {'loop calls':>11} {'group ms':>10} {'group calls':>12} {'speedup':>8}")
+        try:
+            for i, size in enumerate(args.sizes):
+                loop_tour, group_tour = env.tours[2 * i], env.tours[2 * i + 1]
+                # Warm the tour snapshot so both paths measure registration writes only
+                register_tour.invoke({"tourId": loop_tour["tourId"], "phoneNumber": "warmup"})
+                register_group_tour.invoke({"tourId": group_tour["tourId"], "phoneNumbers": ["warmup"]})
+                phones = [f"098{size:03d}{n:04d}" for n in range(size)]
+
+                calls.clear()
+                started = time.perf_counter()
+                for phone in phones:
+                    register_tour.invoke({"tourId": loop_tour["tourId"], "phoneNumber": phone})
+                loop_ms, loop_calls = 1000 * (time.perf_counter() - started), calls["dynamodb"]
+
+                calls.clear()
+                started = time.perf_counter()
+                result = register_group_tour.invoke({"tourId": group_tour["tourId"], "phoneNumbers": phones})
+                group_ms, group_calls = 1000 * (time.perf_counter() - started), calls["dynamodb"]
+                assert len(result["registered"]) == size, result
+
+                print(f"{size:>6} {loop_ms:>10.1f} {loop_calls:>11} {group_ms:>10.1f} {group_calls:>12} {loop_ms / group_ms:>7.1f}x")
+        finally:
+            remove_span_listener(count)
+
+
+if __name__ == "__main__":
+    main()
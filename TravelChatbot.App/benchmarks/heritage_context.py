@@ -0,0 +1,66 @@
+"""Context tokens saved by heritage post-processing, per get_heritage_guide call.
+
+Ingests the offline heritage guides, then runs heritage questions through get_heritage_guide.
+For each call it compares the tokens of the raw search hits with the tokens of the passages
+actually returned (merged, deduplicated, reranked, budgeted).
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.heritage_context --calls 200 --page-size 10
+"""
+import argparse
+import random
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.environment import PLACES, offline_environment
+from benchmarks.run_benchmark import HERITAGE_TOPICS
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Heritage context post-processing benchmark.")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    rows: List[Dict[str, Any]] = []
+    with offline_environment(catalog_size=200, seed=args.seed, registrations=0):
+        from tools.tour_tools import get_heritage_guide
+        from utilities.telemetry import add_span_listener, remove_span_listener, span
+
+        def collect(finished) -> None:
+            if "context_tokens_in" in finished.attributes:
+                rows.append({k[len("context_"):]: v for k, v in finished.attributes.items() if k.startswith("context_")})
+
+        for place in PLACES:
+            get_heritage_guide.invoke({"place": place})
+
+        add_span_listener(collect)
+        try:
+            for _ in range(args.calls):
+                # The tool engine normally opens this span; the tool records its context stats on it
+                with span("tool.get_heritage_guide", kind="tool"):
+                    get_heritage_guide.invoke({
+                        "place": rng.choice(PLACES),
+                        "search_query": rng.choice(HERITAGE_TOPICS),
+                        "page_size": args.page_size,
+                    })
+        finally:
+            remove_span_listener(collect)
+
+    report = {
+        key: float(np.mean([r[key] for r in rows]))
+        for key in ("chunks_in", "passages_out", "tokens_in", "tokens_out", "tokens_saved")
+    }
+    report["calls"] = len(rows)
+    print(f"{len(rows)} calls, page_size={args.page_size}")
+    print(f"mean per call: {report['chunks_in']:.1f} chunks -> {report['passages_out']:.1f} passages, "
+          f"{report['tokens_in']:.0f} -> {report['tokens_out']:.0f} tokens "
+          f"(saved {report['tokens_saved']:.0f}, {100 * report['tokens_saved'] / max(report['tokens_in'], 1):.0f}%)")
+    return report
+
+
+if __name__ == "__main__":
+    main()
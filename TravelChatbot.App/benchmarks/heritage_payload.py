@@ -0,0 +1,99 @@
+"""Heritage query payload and latency: raw_text in vector metadata vs the local chunk store.
+
+Ingests every place's heritage guide through get_heritage_guide (text goes to the chunk
+store, vectors keep filter fields only). It then builds a copy of the index the way it used
+to be written, with each chunk's raw_text in its metadata. The same queries run against
+both layouts:
+- legacy: query with include_metadata; the text arrives with the matches
+- slim:   query with include_metadata, then one batched chunk store read for the text
+
+Query responses pay a simulated transfer time proportional to their JSON size.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.heritage_payload --queries 300 --bandwidth-mbps 20
+"""
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.environment import PLACES, offline_environment
+from benchmarks.run_benchmark import HERITAGE_TOPICS
+
+
+def _summary(latencies: List[float], sizes: List[int]) -> Dict[str, float]:
+    lat = np.asarray(latencies) * 1000
+    return {
+        "bytes_mean": float(np.mean(sizes)),
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "mean_ms": float(lat.mean()),
+    }
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Heritage query payload benchmark.")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--bandwidth-mbps", type=float, default=20.0, help="simulated vector index bandwidth")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    with offline_environment(catalog_size=200, seed=args.seed, registrations=0) as env:
+        from benchmarks.fakes import LocalVectorIndex
+        from tools.tour_tools import get_heritage_guide
+        from utilities.chunk_store import get_chunk_store
+
+        for place in PLACES:
+            get_heritage_guide.invoke({"place": place})
+
+        store = get_chunk_store()
+        slim = env.heritage_index
+        ids = [item.id for page in slim.list() for item in page.vectors]
+        texts = store.get_many(ids)
+        legacy = LocalVectorIndex("legacy-heritage", dimension=slim.dimension)
+        fetched = slim.fetch(ids=ids).vectors
+        legacy.upsert(vectors=[
+            {"id": i, "values": v["values"], "metadata": {**v["metadata"], "raw_text": texts[i]}}
+            for i, v in fetched.items()
+        ])
+        bandwidth = args.bandwidth_mbps * 1e6 / 8
+        slim.bytes_per_second = legacy.bytes_per_second = bandwidth
+
+        queries = [
+            (place, env.embeddings.embed(f"{rng.choice(HERITAGE_TOPICS)} in {place}").tolist())
+            for place in (rng.choice(PLACES) for _ in range(args.queries))
+        ]
+
+        results: Dict[str, Dict[str, List]] = {"legacy": {"lat": [], "bytes": []}, "slim": {"lat": [], "bytes": []}}
+        for place, vector in queries:
+            query = dict(vector=vector, filter={"place": {"$eq": place}}, top_k=args.top_k, include_metadata=True)
+
+            started = time.perf_counter()
+            resp = legacy.query(**query)
+            chunks = [m["metadata"]["raw_text"] for m in resp["matches"]]
+            results["legacy"]["lat"].append(time.perf_counter() - started)
+            results["legacy"]["bytes"].append(len(json.dumps(resp).encode("utf-8")))
+
+            started = time.perf_counter()
+            resp = slim.query(**query)
+            hydrated = store.get_many(m["id"] for m in resp["matches"])
+            slim_chunks = [hydrated[m["id"]] for m in resp["matches"]]
+            results["slim"]["lat"].append(time.perf_counter() - started)
+            results["slim"]["bytes"].append(len(json.dumps(resp).encode("utf-8")))
+            assert sorted(slim_chunks) == sorted(chunks)  # tied scores may come back in either order
+
+    report = {name: _summary(r["lat"], r["bytes"]) for name, r in results.items()}
+    print(f"{args.queries} queries, top_k={args.top_k}, {len(ids)} chunks, {args.bandwidth_mbps:g} Mbit/s")
+    print(f"{'layout':<10}{'bytes/query':>14}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for name, row in report.items():
+        print(f"{name:<10}{row['bytes_mean']:>14.0f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['mean_ms']:>10.2f}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
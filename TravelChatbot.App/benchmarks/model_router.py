@@ -0,0 +1,68 @@
+"""Turn latency with one model deployment vs a fast and a large tier.
+
+Runs the synthetic workload of run_benchmark against the offline stand-ins in four setups:
+- single:    every llm_node step on the large model
+- tiered:    tool selection and short summaries on the fast model, rich answers on the large one
+- fast_down: tiered, but every fast model call fails (each step falls back to the large model)
+- fast_slow: tiered, with the fast model slower than the router's latency budget
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.model_router --turns 80 --concurrency 8 --large-latency-ms 900 --fast-latency-ms 250
+"""
+import argparse
+import random
+from typing import Any, Dict
+
+from benchmarks.environment import offline_environment
+from benchmarks.run_benchmark import run_turns, synthetic_prompts
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Model tier routing benchmark.")
+    parser.add_argument("--turns", type=int, default=80)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--large-latency-ms", type=float, default=900.0)
+    parser.add_argument("--fast-latency-ms", type=float, default=250.0)
+    parser.add_argument("--latency-budget-ms", type=float, default=600.0, help="router latency budget for fast_slow")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    report: Dict[str, Any] = {}
+    with offline_environment(catalog_size=500, seed=args.seed) as env:
+        from agents.controller_agent import ControllerAgent
+        from agents.model_router import MODEL_ROUTES
+        from benchmarks.fakes import ScriptedChatModel
+        from utilities.prefetch import get_prefetcher
+
+        get_prefetcher().enabled = False
+        prompts = synthetic_prompts(env, args.turns, random.Random(args.seed))
+        large = args.large_latency_ms / 1000
+        fast = args.fast_latency_ms / 1000
+        setups = {
+            "single": (ScriptedChatModel(latency=large), None),
+            "tiered": (ScriptedChatModel(latency=large), ScriptedChatModel(latency=fast)),
+            "fast_down": (ScriptedChatModel(latency=large), ScriptedChatModel(latency=fast, error_rate=1.0)),
+            "fast_slow": (ScriptedChatModel(latency=large), ScriptedChatModel(latency=2 * args.latency_budget_ms / 1000)),
+        }
+        routes = [(p, s) for p in ("fast", "large") for s in ("fast", "large", "none")]
+        for name, (llm, fast_llm) in setups.items():
+            agent = ControllerAgent(llm=llm, fast_llm=fast_llm)
+            if name == "fast_slow":
+                agent.router.latency_budget = args.latency_budget_ms / 1000
+            before = {r: MODEL_ROUTES.value(preferred=r[0], served=r[1]) for r in routes}
+            result = run_turns(agent, prompts, args.concurrency)
+            result["routes"] = {f"{p}->{s}": int(MODEL_ROUTES.value(preferred=p, served=s) - before[(p, s)])
+                                for p, s in routes if MODEL_ROUTES.value(preferred=p, served=s) - before[(p, s)]}
+            report[name] = result
+
+    print(f"{args.turns} synthetic turns, concurrency {args.concurrency}, large model {args.large_latency_ms:g} ms, "
+          f"fast model {args.fast_latency_ms:g} ms")
+    for name, row in report.items():
+        lat = row["latency_ms"]
+        print(f"{name:<10} errors={row['errors']:<3} p50={lat['p50']:.0f}ms p95={lat['p95']:.0f}ms "
+              f"mean={lat['mean']:.0f}ms  steps (preferred->served) {row['routes']}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Heritage follow-up latency with and without speculative prefetch.
+
+Each session lists the tours of a place, pauses for the user to read, then asks a common heritage
+question about the same place. Every place's guide starts cold: not downloaded, chunked or
+embedded. The run is repeated in a fresh environment with prefetching disabled.
+
+It also checks that no prefetch step started while a turn was running.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.prefetch --think-ms 1500 --concurrency 2 --embedding-latency-ms 60 --vector-latency-ms 30 --aws-latency-ms 20
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.environment import PLACES, offline_environment
+
+
+def run(args, prefetch: bool) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    with offline_environment(
+        catalog_size=400,
+        seed=args.seed,
+        registrations=0,
+        embedding_latency=args.embedding_latency_ms / 1000 or None,
+        vector_latency=args.vector_latency_ms / 1000 or None,
+        aws_latency=args.aws_latency_ms / 1000 or None,
+    ):
+        from langchain_core.messages import HumanMessage
+        from agents.controller_agent import ControllerAgent
+        from agents.prompts import system_message
+        from benchmarks.fakes import ScriptedChatModel
+        from utilities.prefetch import PREFETCH_TASKS, get_prefetcher
+        from utilities.telemetry import add_span_listener, remove_span_listener
+
+        prefetcher = get_prefetcher()
+        prefetcher.enabled = prefetch
+        agent = ControllerAgent(llm=ScriptedChatModel())
+        latencies: Dict[str, List[float]] = {"listing": [], "heritage": []}
+        turns: List[tuple] = []
+        steps: List[float] = []
+        lock = threading.Lock()
+
+        def record(span) -> None:
+            with lock:
+                if span.kind == "turn":
+                    turns.append((span.start, span.start + span.duration))
+                elif span.name == "prefetch":
+                    steps.append(span.start)
+
+        def turn(kind: str, prompt: str) -> None:
+            started = time.perf_counter()
+            agent.invoke({"messages": [system_message, HumanMessage(content=prompt)]})
+            with lock:
+                latencies[kind].append(time.perf_counter() - started)
+
+        def session(place: str) -> None:
+            turn("listing", f"Can you help me find tours in {place}?")
+            time.sleep(args.think_ms / 1000)
+            turn("heritage", f"I want to know heritage guide in {place} about {rng.choice(['heritage sites', 'places to visit'])}")
+
+        before = {r: PREFETCH_TASKS.value(result=r) for r in ("queued", "done", "cancelled", "dropped")}
+        add_span_listener(record)
+        try:
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                list(pool.map(session, PLACES))
+            prefetcher.join(timeout=30)
+        finally:
+            remove_span_listener(record)
+
+        overlapping = sum(1 for s in steps if any(start < s < end for start, end in turns))
+        report = {name: {"p50_ms": float(np.percentile(np.asarray(v) * 1000, 50)),
+                         "mean_ms": float(np.mean(v) * 1000)} for name, v in latencies.items()}
+        report["tasks"] = {r: PREFETCH_TASKS.value(result=r) - before[r] for r in before}
+        report["steps_during_turns"] = overlapping
+        return report
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Speculative prefetch benchmark.")
+    parser.add_argument("--think-ms", type=float, default=1500.0, help="pause between the listing and the follow-up")
+    parser.add_argument("--concurrency", type=int, default=2, help="sessions running at once")
+    parser.add_argument("--embedding-latency-ms", type=float, default=60.0)
+    parser.add_argument("--vector-latency-ms", type=float, default=30.0)
+    parser.add_argument("--aws-latency-ms", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    report = {"off": run(args, prefetch=False), "on": run(args, prefetch=True)}
+    print(f"{len(PLACES)} sessions, {args.concurrency} at a time, think time {args.think_ms:g} ms")
+    for name, row in report.items():
+        print(f"prefetch {name:<4} listing p50={row['listing']['p50_ms']:.0f}ms  "
+              f"heritage p50={row['heritage']['p50_ms']:.0f}ms mean={row['heritage']['mean_ms']:.0f}ms  "
+              f"tasks={row['tasks']} steps started during a turn={row['steps_during_turns']}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
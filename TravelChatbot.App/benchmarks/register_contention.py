@@ -0,0 +1,86 @@
+"""Contention check for register_tour against the local DynamoDB stand-in.
+
+Fires parallel registrations of the same (tourId, phoneNumber) and verifies that exactly one
+succeeds, then fires parallel retries sharing one idempotency key and verifies they all return
+the same registration. Also reports DynamoDB calls per registration.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.register_contention --parallel 32
+"""
+import argparse
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from benchmarks.environment import offline_environment
+
+
+def _fire(parallel: int, call) -> List[Any]:
+    barrier = threading.Barrier(parallel)
+
+    def run(_):
+        barrier.wait()
+        try:
+            return call()
+        except ValueError as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        return list(pool.map(run, range(parallel)))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Parallel register_tour contention check.")
+    parser.add_argument("--parallel", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    failures = 0
+    with offline_environment(catalog_size=50) as env:
+        from tools.tour_tools import register_tour
+        from utilities.telemetry import add_span_listener, remove_span_listener
+
+        calls: Counter = Counter()
+
+        def count(span) -> None:
+            if span.name.startswith("dynamodb."):
+                calls[span.name] += 1
+
+        add_span_listener(count)
+        try:
+            for round_no in range(args.rounds):
+                tour = env.tours[round_no]
+                phone = f"0900000{round_no:03d}"
+
+                results = _fire(args.parallel, lambda: register_tour.invoke({"tourId": tour["tourId"], "phoneNumber": phone}))
+                successes = [r for r in results if isinstance(r, dict) and "error" not in r]
+                duplicates = [r for r in results if isinstance(r, ValueError) and str(r) == "tour is registered"]
+                ok = len(successes) == 1 and len(duplicates) == args.parallel - 1
+                failures += not ok
+                print(f"round {round_no}: {len(successes)} registered, {len(duplicates)} duplicates rejected "
+                      f"-> {'OK' if ok else 'FAIL'}")
+
+                key = f"retry-{round_no}"
+                phone = f"0911111{round_no:03d}"
+                results = _fire(args.parallel, lambda: register_tour.invoke(
+                    {"tourId": tour["tourId"], "phoneNumber": phone, "idempotencyKey": key}))
+                created = {r["createAt"] for r in results if isinstance(r, dict) and "error" not in r}
+                ok = all(isinstance(r, dict) for r in results) and len(created) == 1
+                failures += not ok
+                print(f"round {round_no}: {args.parallel} retries with one idempotency key -> "
+                      f"{len(created)} distinct registration(s) -> {'OK' if ok else 'FAIL'}")
+        finally:
+            remove_span_listener(count)
+
+        registrations = args.rounds * args.parallel * 2
+        print("\nDynamoDB calls per registration attempt:")
+        for name, n in sorted(calls.items()):
+            print(f"  {name:<22} {n / registrations:.3f}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
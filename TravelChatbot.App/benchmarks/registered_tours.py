@@ -0,0 +1,119 @@
+"""Repeated registered-tours checks with and without the per-phone registration cache.
+
+Runs against the offline stand-ins with a simulated DynamoDB/S3 round-trip. --phones users with
+--registrations bookings each, plus one user with --long-history bookings, check their bookings
+--checks times in a session. Each session also registers one more tour and checks straight after.
+Long histories are read page by page (--page-size) to the end.
+
+The run is repeated with the cache off (a TTL of 0: every check queries and hydrates again).
+For each it reports check latency, backend calls per check, and checks that missed the booking
+just made (stale reads).
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.registered_tours --phones 20 --registrations 6 --long-history 400 --aws-latency-ms 20
+"""
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.environment import offline_environment
+
+
+def run(args, cached: bool) -> Dict[str, Any]:
+    with offline_environment(catalog_size=500, seed=args.seed, registrations=0,
+                             aws_latency=args.aws_latency_ms / 1000 or None) as env:
+        from tools.registrations import get_registration_cache
+        from tools.tour_tools import get_registered_tours, register_tour
+        from utilities.aws_clients import get_client
+        from utilities.telemetry import add_span_listener, remove_span_listener
+
+        rng = random.Random(args.seed)
+        dynamodb = get_client("dynamodb")
+        phones = [f"0912{i:06d}" for i in range(args.phones + 1)]
+        history = {p: args.registrations for p in phones[:-1]}
+        history[phones[-1]] = args.long_history
+        booked = {p: set() for p in phones}
+        for phone, count in history.items():
+            for i, tour in enumerate(rng.sample(env.tours, count)):
+                dynamodb.put_item(TableName="UserTours", Item={
+                    "tourId": {"S": tour["tourId"]}, "phoneNumber": {"S": phone},
+                    "createAt": {"N": str(1750000000 + i)}, "startDate": {"N": str(tour["startDate"])},
+                })
+                booked[phone].add(tour["tourId"])
+        if not cached:
+            get_registration_cache().ttl = 0
+
+        calls: Counter = Counter()
+        lock = threading.Lock()
+
+        def count(span) -> None:
+            if span.kind == "backend":
+                with lock:
+                    calls[span.name] += 1
+
+        def check(phone: str) -> List[str]:
+            tour_ids, token = [], None
+            while True:
+                page = get_registered_tours.invoke(
+                    {"phoneNumber": phone, "pagination_token": token, "page_size": args.page_size})
+                tour_ids += [r["tourId"] for r in page["results"]]
+                token = page["next_token"]
+                if not token:
+                    return tour_ids
+
+        latencies: List[float] = []
+        stale = 0
+        add_span_listener(count)
+        try:
+            for phone in phones:
+                for n in range(args.checks):
+                    if n == args.checks // 2:
+                        tour = rng.choice([t for t in env.tours if t["tourId"] not in booked[phone]])
+                        register_tour.invoke({"tourId": tour["tourId"], "phoneNumber": phone})
+                        booked[phone].add(tour["tourId"])
+                    started = time.perf_counter()
+                    seen = check(phone)
+                    latencies.append(time.perf_counter() - started)
+                    stale += set(seen) != booked[phone]
+        finally:
+            remove_span_listener(count)
+
+    checks = len(latencies)
+    lat = np.asarray(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "max_ms": float(lat.max()),
+        "stale_reads": stale,
+        "calls_per_check": {name: round(n / checks, 2) for name, n in sorted(calls.items())
+                            if name in ("dynamodb.query", "s3.presign")},
+    }
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Registered tours cache benchmark.")
+    parser.add_argument("--phones", type=int, default=20)
+    parser.add_argument("--registrations", type=int, default=6, help="bookings per typical user")
+    parser.add_argument("--long-history", type=int, default=400, help="bookings of the one long-history user")
+    parser.add_argument("--checks", type=int, default=6, help="booking checks per user in a session")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--aws-latency-ms", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    report = {"off": run(args, cached=False), "on": run(args, cached=True)}
+    print(f"{args.phones} users x {args.registrations} bookings + 1 user x {args.long_history}, "
+          f"{args.checks} checks each, page size {args.page_size}, AWS round-trip {args.aws_latency_ms:g} ms")
+    for name, row in report.items():
+        print(f"cache {name:<3} p50={row['p50_ms']:.0f}ms p95={row['p95_ms']:.0f}ms max={row['max_ms']:.0f}ms "
+              f"stale reads={row['stale_reads']}  calls per check {row['calls_per_check']}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Record sessions into a trace file and replay them as a deterministic benchmark.
+
+A trace comes from production (TRACE_RECORD_PATH, see utilities/recorder.py) or from `record`,
+which runs synthetic sessions through ChatService against the offline stand-ins with recording on.
+
+`replay` runs every recorded session again, its turns in order, sessions --concurrency at a time.
+The chat model is replaced by one that returns the recorded responses in order. Tools depend on
+--mode:
+- responses: tools return their recorded results at once; only orchestration time is left
+             (graph, tool engine, routing), so regressions there stand out
+- latencies: as responses, but each model call and tool call takes its recorded time (failed
+             model attempts included), reproducing the timing shape of the recorded turns
+- tools:     model calls take their recorded time; the real tools run against the offline
+             stand-ins with the median recorded latency of each backend (embeddings, Pinecone,
+             DynamoDB/S3) injected. Use with traces from `record`, whose tours and phone numbers
+             exist offline (same --catalog-size and --seed)
+
+A turn diverges when the agent sends a model request the trace does not have at that step
+(a different message count) or calls a tool the trace has no result for. It reports recorded and
+replayed turn latency.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.replay record --trace /tmp/sessions.jsonl.gz --sessions 20 --turns-per-session 3
+    python -m benchmarks.replay replay --trace /tmp/sessions.jsonl.gz --mode latencies --concurrency 8
+"""
+import argparse
+import asyncio
+import contextvars
+import os
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from benchmarks.environment import OFFLINE_ENV, offline_environment
+from benchmarks.fakes import ScriptedChatModel, _sleep
+from benchmarks.run_benchmark import synthetic_prompts
+
+MODES = ("responses", "latencies", "tools")
+# Backend span name prefixes behind each offline stand-in latency
+BACKEND_FAMILIES = {
+    "embedding_latency": ("openai.embeddings",),
+    "vector_latency": ("pinecone.",),
+    "aws_latency": ("dynamodb.", "s3.get_object", "s3.head_object"),
+}
+
+
+class TurnReplay:
+    """The recorded model responses and tool results of one turn."""
+
+    def __init__(self, record: Dict[str, Any], timed: bool):
+        self.timed = timed
+        # (request message count, response, seconds including failed attempts before it)
+        self.steps: Deque[Tuple[int, Dict[str, Any], float]] = deque()
+        waited = 0.0
+        for event in record["events"]:
+            if event["type"] == "llm":
+                waited += event["ms"] / 1000
+                if "response" in event:
+                    self.steps.append((event["prefix"] + len(event["new"]), event["response"], waited))
+                    waited = 0.0
+        self.tools = {e["call_id"]: e for e in record["events"] if e["type"] == "tool" and "result" in e}
+        self.diverged: List[str] = []
+        self._lock = threading.Lock()
+
+    def next_step(self, request_length: int) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            if not self.steps:
+                self.diverged.append("extra model call")
+                return None
+            length, response, seconds = self.steps.popleft()
+            if length != request_length:
+                self.diverged.append(f"model request of {request_length} messages, recorded {length}")
+            return response, seconds
+
+    def tool(self, call_id: str) -> Optional[Dict[str, Any]]:
+        event = self.tools.get(call_id)
+        if event is None:
+            with self._lock:
+                self.diverged.append(f"no recorded result for tool call {call_id}")
+        return event
+
+
+_replaying: contextvars.ContextVar[Optional[TurnReplay]] = contextvars.ContextVar("replaying", default=None)
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that answers with the recorded responses of the turn being replayed."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        from utilities.recorder import decode_message
+
+        step = _replaying.get().next_step(len(messages))
+        if step is None:
+            message = AIMessage(content="The recorded turn ended here.")
+        else:
+            response, seconds = step
+            _sleep(seconds if _replaying.get().timed else None, kwargs.get("timeout"))
+            message = decode_message(response)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class ReplayTool:
+    """Stands in for a registered tool and returns the recorded result of each call."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def invoke(self, tool_call: Dict[str, Any]) -> ToolMessage:
+        replay = _replaying.get()
+        event = replay.tool(tool_call["id"])
+        if event is None:
+            return ToolMessage(content="Error: no recorded result", name=self.name,
+                               tool_call_id=tool_call["id"], status="error")
+        if replay.timed:
+            time.sleep(event["ms"] / 1000)
+        return ToolMessage(content=event["result"], name=self.name, tool_call_id=tool_call["id"],
+                           status=event.get("status", "success"))
+
+
+def backend_latencies(turns: List[Dict[str, Any]]) -> Dict[str, Optional[float]]:
+    """Median recorded latency (seconds) per offline stand-in; None when the trace has no calls."""
+    samples: Dict[str, List[float]] = defaultdict(list)
+    for record in turns:
+        for event in record["events"]:
+            if event["type"] != "backend" or event["status"] != "ok":
+                continue
+            for family, prefixes in BACKEND_FAMILIES.items():
+                if event["name"].startswith(prefixes):
+                    samples[family].append(event["ms"] / 1000)
+    return {family: statistics.median(samples[family]) if samples[family] else None for family in BACKEND_FAMILIES}
+
+
+def sessions_of(turns: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Recorded turns grouped by session, in turn order; turns without a session stand alone."""
+    sessions: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+    for i, record in enumerate(turns):
+        sessions[record["session"] or i].append(record)
+    return [sorted(s, key=lambda r: (r["turn"], r["started"])) for s in sessions.values()]
+
+
+def replay(args) -> Dict[str, Any]:
+    # The trace is read before the environment starts; config must already see the offline settings
+    os.environ.update(OFFLINE_ENV)
+    from utilities.recorder import decode_message, read_trace
+
+    turns = list(read_trace(args.trace))
+    if not turns:
+        raise ValueError(f"{args.trace} has no recorded turns")
+    sessions = sessions_of(turns)
+    latencies = backend_latencies(turns) if args.mode == "tools" else {}
+    with offline_environment(catalog_size=args.catalog_size, seed=args.seed, **latencies):
+        from agents.controller_agent import ControllerAgent
+
+        agent = ControllerAgent(llm=ReplayChatModel())
+        if args.mode != "tools":
+            engine = agent.tool_engine
+            for tool in engine.tools:
+                engine.register(ReplayTool(tool.name), engine.policy(tool.name))
+
+        replayed: List[Tuple[float, float]] = []
+        diverged: List[List[str]] = []
+        lock = threading.Lock()
+
+        def run(session: List[Dict[str, Any]]) -> None:
+            for record in session:
+                turn = TurnReplay(record, timed=args.mode != "responses")
+                state = {"messages": [decode_message(m) for m in record["input"]]}
+                token = _replaying.set(turn)
+                try:
+                    started = time.perf_counter()
+                    agent.invoke(state)
+                    elapsed = time.perf_counter() - started
+                finally:
+                    _replaying.reset(token)
+                if turn.steps:
+                    turn.diverged.append(f"{len(turn.steps)} recorded model calls not made")
+                with lock:
+                    replayed.append((record["ms"], elapsed * 1000))
+                    if turn.diverged:
+                        diverged.append(turn.diverged)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(run, sessions))
+        wall = time.perf_counter() - started
+
+    recorded, actual = (np.asarray(column) for column in zip(*replayed))
+    percentiles = lambda lat: {f"p{q}": float(np.percentile(lat, q)) for q in (50, 95, 99)}
+    return {
+        "turns": len(replayed),
+        "sessions": len(sessions),
+        "diverged": len(diverged),
+        "divergences": diverged[:5],
+        "wall_seconds": wall,
+        "backend_latency_ms": {k: v * 1000 for k, v in latencies.items() if v is not None},
+        "recorded_ms": percentiles(recorded),
+        "replayed_ms": percentiles(actual),
+        "llm_calls": sum(1 for r in turns for e in r["events"] if e["type"] == "llm"),
+        "tool_calls": sum(1 for r in turns for e in r["events"] if e["type"] == "tool"),
+        "backend_calls": sum(1 for r in turns for e in r["events"] if e["type"] == "backend"),
+    }
+
+
+def record(args) -> Dict[str, Any]:
+    """Run synthetic sessions through ChatService with every turn recorded to args.trace."""
+    if os.path.exists(args.trace):
+        os.remove(args.trace)
+    rng = random.Random(args.seed)
+    with offline_environment(catalog_size=args.catalog_size, seed=args.seed,
+                             embedding_latency=args.embedding_latency_ms / 1000 or None,
+                             vector_latency=args.vector_latency_ms / 1000 or None,
+                             aws_latency=args.aws_latency_ms / 1000 or None) as env:
+        from agents.controller_agent import ControllerAgent
+        from api.server import ChatService
+        from api.sessions import InMemorySessionStore
+        from utilities import recorder
+
+        agent = ControllerAgent(llm=ScriptedChatModel(latency=args.llm_latency_ms / 1000))
+        service = ChatService(agent, InMemorySessionStore(), max_concurrent_turns=args.concurrency, queue_timeout=600)
+        prompts = synthetic_prompts(env, args.sessions * args.turns_per_session, rng)
+
+        async def session(messages: List[str]) -> None:
+            session_id = service.store.create()
+            for message in messages:
+                await service.chat(session_id, message)
+
+        async def sessions() -> None:
+            n = args.turns_per_session
+            await asyncio.gather(*(session(prompts[i:i + n]) for i in range(0, len(prompts), n)))
+
+        recorder.reset(args.trace, sample_rate=1.0)
+        started = time.perf_counter()
+        try:
+            asyncio.run(sessions())
+        finally:
+            recorder.reset()
+        wall = time.perf_counter() - started
+    return {"turns": len(prompts), "sessions": args.sessions, "wall_seconds": wall, "bytes": os.path.getsize(args.trace)}
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Record and replay sessions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rec = commands.add_parser("record", help="record synthetic sessions against the offline stand-ins")
+    rec.add_argument("--sessions", type=int, default=20)
+    rec.add_argument("--turns-per-session", type=int, default=3)
+    rec.add_argument("--concurrency", type=int, default=8)
+    rec.add_argument("--llm-latency-ms", type=float, default=300.0)
+    rec.add_argument("--embedding-latency-ms", type=float, default=40.0)
+    rec.add_argument("--vector-latency-ms", type=float, default=20.0)
+    rec.add_argument("--aws-latency-ms", type=float, default=5.0)
+    rep = commands.add_parser("replay", help="replay a trace")
+    rep.add_argument("--mode", choices=MODES, default="latencies")
+    rep.add_argument("--concurrency", type=int, default=8)
+    for command in (rec, rep):
+        command.add_argument("--trace", required=True, help="trace file (.jsonl or .jsonl.gz)")
+        command.add_argument("--catalog-size", type=int, default=500)
+        command.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        report = record(args)
+        print(f"recorded {report['turns']} turns in {report['sessions']} sessions to {args.trace} "
+              f"({report['bytes'] / 1024:.0f} KiB, {report['bytes'] / report['turns'] / 1024:.1f} KiB per turn) "
+              f"in {report['wall_seconds']:.1f}s")
+        return report
+
+    report = replay(args)
+    print(f"replayed {report['turns']} turns of {report['sessions']} sessions from {args.trace}, mode {args.mode}: "
+          f"{report['llm_calls']} model calls, {report['tool_calls']} tool calls, "
+          f"{report['backend_calls']} backend calls recorded")
+    if report["backend_latency_ms"]:
+        print("injected backend latency " + ", ".join(f"{k}={v:.0f}ms" for k, v in report["backend_latency_ms"].items()))
+    for name in ("recorded", "replayed"):
+        lat = report[f"{name}_ms"]
+        print(f"{name:<9} p50={lat['p50']:.0f}ms p95={lat['p95']:.0f}ms p99={lat['p99']:.0f}ms")
+    print(f"diverged turns={report['diverged']} wall={report['wall_seconds']:.1f}s")
+    for reasons in report["divergences"]:
+        print(f"  {'; '.join(reasons)}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
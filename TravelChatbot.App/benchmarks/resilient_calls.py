@@ -0,0 +1,174 @@
+"""Embedding call latency with and without the resilient call layer, against a local fake server.
+
+Starts an HTTP server on localhost that answers the OpenAI `/embeddings` endpoint. Its latency is
+heavy-tailed: most requests take --fast-ms, --slow-share of them take --slow-ms, and
+--stall-share take --stall-ms. A --error-share of requests get a 503. The real OpenAI client
+(SDK retries off, as in tools/tour_search.py) calls it from --concurrency threads, in these cases:
+- direct:    each call goes straight to the client, with the SDK's default timeout
+- resilient: each call goes through a ResilientCaller (adaptive timeout, retries, hedging)
+- outage:    resilient, with every request failing; shows the retry budget capping extra load
+
+For each case it reports call latency percentiles, failed calls, and server requests per call.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.resilient_calls --calls 2000 --concurrency 8
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+import numpy as np
+
+
+class FakeEmbeddingServer(ThreadingHTTPServer):
+    """Local `/v1/embeddings` endpoint with injected latency and errors."""
+
+    daemon_threads = True
+
+    def __init__(self, args, seed: int):
+        super().__init__(("127.0.0.1", 0), _EmbeddingHandler)
+        self.args = args
+        self.error_share = args.error_share
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """(latency seconds, fail) for the next request."""
+        with self._lock:
+            self.requests += 1
+            r, fail = self._rng.random(), self._rng.random() < self.error_share
+        a = self.args
+        if r < a.stall_share:
+            return a.stall_ms / 1000, fail
+        if r < a.stall_share + a.slow_share:
+            return a.slow_ms / 1000, fail
+        return a.fast_ms / 1000 * (1 + r), fail
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class _EmbeddingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        latency, fail = self.server.draw()
+        time.sleep(latency)
+        if fail:
+            self._send(503, {"error": {"message": "service unavailable", "type": "server_error"}})
+            return
+        inputs = body.get("input") or [""]
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        self._send(200, {
+            "object": "list",
+            "model": body.get("model", "fake"),
+            "data": [{"object": "embedding", "index": i, "embedding": [0.1] * 8} for i in range(len(inputs))],
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+        })
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on this request (timeout or a hedge won)
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_case(args, resilient: bool, error_share: float) -> Dict[str, Any]:
+    from openai import APIConnectionError, OpenAI
+    from utilities.resilience import ResilientCaller, RetryBudget
+
+    server = FakeEmbeddingServer(args, seed=args.seed)
+    server.error_share = error_share
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = OpenAI(api_key="offline", base_url=server.url, max_retries=0)
+    pool = ThreadPoolExecutor(max_workers=4 * args.concurrency, thread_name_prefix="resilient")
+    caller = ResilientCaller("openai.embeddings.bench", RetryBudget(), pool, hedge=True, transient=(APIConnectionError,))
+    caller.enabled = resilient
+
+    def embed(i: int):
+        started = time.perf_counter()
+        try:
+            caller.call(lambda **options: client.embeddings.create(input=[f"query {i}"], model="fake", **options))
+            ok = True
+        except Exception:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as workers:
+            # Warm-up calls give the caller its first latency percentiles; they are not measured
+            list(workers.map(embed, range(args.warmup)))
+            before = server.requests
+            results = list(workers.map(embed, range(args.calls)))
+            requests = server.requests - before
+    finally:
+        server.shutdown()
+        server.server_close()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    lat = np.asarray([r[0] for r in results]) * 1000
+    timeout, hedge_after = caller.timeouts()
+    return {
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "max_ms": float(lat.max()),
+        "failed": sum(1 for r in results if not r[1]),
+        "requests_per_call": requests / len(results),
+        "timeout_ms": timeout * 1000 if resilient else None,
+        "hedge_after_ms": hedge_after * 1000 if resilient and hedge_after else None,
+    }
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Resilient call layer benchmark.")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--fast-ms", type=float, default=20.0, help="typical latency (uniform in [fast, 2 x fast])")
+    parser.add_argument("--slow-ms", type=float, default=300.0)
+    parser.add_argument("--slow-share", type=float, default=0.04)
+    parser.add_argument("--stall-ms", type=float, default=2000.0)
+    parser.add_argument("--stall-share", type=float, default=0.01)
+    parser.add_argument("--error-share", type=float, default=0.01, help="share of requests answered with a 503")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    report = {
+        "direct": run_case(args, resilient=False, error_share=args.error_share),
+        "resilient": run_case(args, resilient=True, error_share=args.error_share),
+        "outage": run_case(args, resilient=True, error_share=1.0),
+    }
+    print(f"{args.calls} embedding calls, concurrency {args.concurrency}; server latency {args.fast_ms:g}-"
+          f"{2 * args.fast_ms:g} ms, {args.slow_share:.0%} at {args.slow_ms:g} ms, {args.stall_share:.0%} at "
+          f"{args.stall_ms:g} ms, {args.error_share:.0%} 503s")
+    for name, row in report.items():
+        adaptive = ""
+        if row["timeout_ms"] is not None:
+            hedge = f"{row['hedge_after_ms']:.0f}ms" if row["hedge_after_ms"] else "-"
+            adaptive = f"  timeout={row['timeout_ms']:.0f}ms hedge after={hedge}"
+        print(f"{name:<10} p50={row['p50_ms']:.0f}ms p95={row['p95_ms']:.0f}ms p99={row['p99_ms']:.0f}ms "
+              f"max={row['max_ms']:.0f}ms failed={row['failed']:<4} requests/call={row['requests_per_call']:.2f}{adaptive}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
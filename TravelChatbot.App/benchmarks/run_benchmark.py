@@ -0,0 +1,197 @@
+"""Offline end-to-end benchmark for ControllerAgent.
+
+Replays the test.py conversations and/or a synthetic workload against the offline stand-ins
+(scripted chat model, fake embeddings, moto DynamoDB/S3, local vector index) and reports turn
+latency percentiles, throughput and backend call counts.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.run_benchmark --scenario all --turns 200 --concurrency 8 --catalog-size 2000
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.environment import REGISTERED_PHONE, offline_environment
+
+# Same conversations as test.py
+REPLAY_PROMPTS = [
+    "Can you help me find tours in Hoi An?",
+    f"Give me registered tours for phone number {REGISTERED_PHONE}",
+    "I want to know heritage guide in Ha Noi about HOAN KIEM LAKE A “SHOWCASE” OF SUMMER CUISINE IN HANOI",
+]
+
+HERITAGE_TOPICS = ["history", "street food", "festivals", "architecture", "opening hours", "local crafts"]
+
+
+def synthetic_prompts(env, count: int, rng: random.Random) -> List[str]:
+    """Mixed workload: listings, price searches, heritage questions, multi-place trips, group
+    recommendations, lookups and registrations."""
+    prompts = []
+    for _ in range(count):
+        roll = rng.random()
+        place = rng.choice(env.places)
+        if roll < 0.30:
+            prompts.append(f"Can you help me find tours in {place}?")
+        elif roll < 0.45:
+            prompts.append(f"Show me tours in {place} under {rng.randrange(5, 30) * 100000} VND")
+        elif roll < 0.65:
+            prompts.append(f"I want to know heritage guide in {place} about {rng.choice(HERITAGE_TOPICS)}")
+        elif roll < 0.70:
+            places = rng.sample(env.places, 3)
+            prompts.append(f"Plan a trip to {places[0]}, {places[1]} and {places[2]} about {rng.choice(HERITAGE_TOPICS)}")
+        elif roll < 0.75:
+            names = rng.sample(["An", "Binh", "Chi", "Dung", "Hoa", "Minh"], rng.randrange(2, 5))
+            likes = [f"{name} likes {rng.choice(HERITAGE_TOPICS)}" for name in names]
+            likes[0] += f" under {rng.randrange(10, 30) * 100000} VND"
+            prompts.append(f"Recommend tours for our group in {place}: {'; '.join(likes)}")
+        elif roll < 0.85:
+            prompts.append(f"Give me registered tours for phone number {rng.choice(env.phones)}")
+        else:
+            tour = rng.choice(env.tours)
+            prompts.append(f"Please register tour {tour['tourId']} for phone number {rng.choice(env.phones)}")
+    return prompts
+
+
+class SpanStats:
+    """Span listener that aggregates call counts, time and tokens by span name."""
+
+    def __init__(self):
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.kinds: Dict[str, str] = {}
+        self.tokens: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def __call__(self, span) -> None:
+        with self._lock:
+            self.calls[span.name] += 1
+            self.seconds[span.name] += span.duration
+            self.kinds[span.name] = span.kind
+            self.tokens[span.name] += span.prompt_tokens + span.completion_tokens
+
+    def by_kind(self, kind: str) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "calls": self.calls[name],
+                "mean_ms": 1000 * self.seconds[name] / self.calls[name],
+                "tokens": self.tokens[name],
+            }
+            for name in sorted(self.calls) if self.kinds[name] == kind
+        }
+
+
+def run_turns(agent, prompts: List[str], concurrency: int) -> Dict[str, Any]:
+    from langchain_core.messages import HumanMessage
+    from agents.prompts import system_message
+
+    latencies: List[float] = [0.0] * len(prompts)
+    errors = [False] * len(prompts)
+
+    def run(i: int) -> None:
+        state = {"messages": [system_message, HumanMessage(content=prompts[i])]}
+        started = time.perf_counter()
+        final_state = agent.invoke(state)
+        latencies[i] = time.perf_counter() - started
+        content = str(final_state["messages"][-1].content)
+        errors[i] = content.startswith("I encountered an issue")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run, range(len(prompts))))
+    wall = time.perf_counter() - started
+
+    lat = np.asarray(latencies) * 1000
+    return {
+        "turns": len(prompts),
+        "errors": int(sum(errors)),
+        "concurrency": concurrency,
+        "wall_seconds": wall,
+        "throughput_tps": len(prompts) / wall if wall else 0.0,
+        "latency_ms": {
+            "p50": float(np.percentile(lat, 50)),
+            "p95": float(np.percentile(lat, 95)),
+            "p99": float(np.percentile(lat, 99)),
+            "max": float(lat.max()),
+            "mean": float(lat.mean()),
+        },
+    }
+
+
+def print_report(name: str, result: Dict[str, Any]) -> None:
+    lat = result["latency_ms"]
+    print(f"\n=== {name} ===")
+    print(f"turns={result['turns']} errors={result['errors']} concurrency={result['concurrency']} "
+          f"wall={result['wall_seconds']:.2f}s throughput={result['throughput_tps']:.1f} turns/s")
+    print(f"turn latency ms: p50={lat['p50']:.1f} p95={lat['p95']:.1f} p99={lat['p99']:.1f} "
+          f"max={lat['max']:.1f} mean={lat['mean']:.1f}")
+    for kind in ("graph_node", "tool", "backend"):
+        rows = result["spans"].get(kind, {})
+        if not rows:
+            continue
+        print(f"  {kind}:")
+        for span_name, row in rows.items():
+            tokens = f" tokens={row['tokens']}" if row["tokens"] else ""
+            print(f"    {span_name:<32} calls={row['calls']:<6} mean={row['mean_ms']:.2f}ms{tokens}")
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark for the travel chatbot.")
+    parser.add_argument("--scenario", choices=["replay", "synthetic", "all"], default="all")
+    parser.add_argument("--turns", type=int, default=100, help="synthetic turns (replay repeats test.py prompts to this count)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--catalog-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="simulated chat model latency per call")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0, help="simulated embeddings latency per call")
+    parser.add_argument("--vector-latency-ms", type=float, default=0.0, help="simulated vector index latency per call")
+    parser.add_argument("--aws-latency-ms", type=float, default=0.0, help="simulated DynamoDB/S3 latency per call")
+    parser.add_argument("--json", dest="json_path", help="write the full report to this file")
+    args = parser.parse_args(argv)
+
+    report: Dict[str, Any] = {"config": vars(args), "results": {}}
+    with offline_environment(
+        catalog_size=args.catalog_size,
+        seed=args.seed,
+        embedding_latency=args.embedding_latency_ms / 1000 or None,
+        vector_latency=args.vector_latency_ms / 1000 or None,
+        aws_latency=args.aws_latency_ms / 1000 or None,
+    ) as env:
+        from agents.controller_agent import ControllerAgent
+        from benchmarks.fakes import ScriptedChatModel
+        from utilities.telemetry import add_span_listener, remove_span_listener
+
+        agent = ControllerAgent(llm=ScriptedChatModel(latency=args.llm_latency_ms / 1000))
+        rng = random.Random(args.seed)
+
+        workloads = []
+        if args.scenario in ("replay", "all"):
+            workloads.append(("replay", [REPLAY_PROMPTS[i % len(REPLAY_PROMPTS)] for i in range(max(args.turns, len(REPLAY_PROMPTS)))]))
+        if args.scenario in ("synthetic", "all"):
+            workloads.append(("synthetic", synthetic_prompts(env, args.turns, rng)))
+
+        for name, prompts in workloads:
+            stats = SpanStats()
+            add_span_listener(stats)
+            try:
+                result = run_turns(agent, prompts, args.concurrency)
+            finally:
+                remove_span_listener(stats)
+            result["spans"] = {kind: stats.by_kind(kind) for kind in ("turn", "graph_node", "tool", "backend")}
+            report["results"][name] = result
+            print_report(name, result)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
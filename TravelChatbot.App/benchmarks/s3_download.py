@@ -0,0 +1,89 @@
+"""Heritage guide download: one get_object().read() vs the download manager.
+
+Downloads one object from a local S3 stand-in:
+- single: one GET, body read into memory (the old download_s3_object)
+- cold:   download manager, empty cache (parallel ranged GETs into the cache)
+- warm:   download manager, cached copy still current (conditional GET answers 304)
+- stale:  download manager after the object was overwritten (cached copy replaced)
+- spool:  download manager with the cache disabled (parts spooled to a temp file)
+
+Each GET pays a round trip, then streams its body at a per-connection bandwidth, as S3 does.
+Peak Python heap is measured with tracemalloc.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.s3_download --size-mb 64 --part-mb 8 --bandwidth-mbps 400 --rtt-ms 20
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+from benchmarks.fakes import LocalObjectStore
+
+
+def _measure(fn: Callable[[], int]) -> Dict[str, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": elapsed * 1000, "peak_mb": peak / 2**20}
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="S3 download manager benchmark.")
+    parser.add_argument("--size-mb", type=float, default=64)
+    parser.add_argument("--part-mb", type=float, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--bandwidth-mbps", type=float, default=400.0, help="simulated bandwidth per connection")
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    args = parser.parse_args(argv)
+
+    from utilities.s3_download import S3DownloadManager
+
+    bucket, key = "heritage-guides", "heritage/large-guide.pdf"
+    with tempfile.TemporaryDirectory(prefix="travelbot-s3-") as scratch:
+        s3 = LocalObjectStore(os.path.join(scratch, "s3"), latency=args.rtt_ms / 1000,
+                              bytes_per_second=args.bandwidth_mbps * 1e6 / 8)
+        payload = os.urandom(int(args.size_mb * 2**20))
+        s3.put_object(Bucket=bucket, Key=key, Body=payload)
+
+        def manager(cache_bytes: int) -> S3DownloadManager:
+            return S3DownloadManager(
+                cache_dir=os.path.join(scratch, "cache"),
+                max_cache_bytes=cache_bytes,
+                part_bytes=int(args.part_mb * 2**20),
+                max_concurrency=args.concurrency,
+            )
+
+        cached, uncached = manager(4 * len(payload)), manager(0)
+
+        def single() -> None:
+            s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+
+        def managed(m: S3DownloadManager) -> Callable[[], None]:
+            def run() -> None:
+                with m.open(bucket, key, s3) as f:
+                    f.seek(0, os.SEEK_END)
+            return run
+
+        report = {"single": _measure(single), "cold": _measure(managed(cached)), "warm": _measure(managed(cached))}
+        s3.put_object(Bucket=bucket, Key=key, Body=payload[::-1])
+        report["stale"] = _measure(managed(cached))
+        report["spool"] = _measure(managed(uncached))
+        for m in (cached, uncached):
+            with m.open(bucket, key, s3) as f:
+                assert f.read() == payload[::-1]
+
+    print(f"{args.size_mb:g} MiB object, {args.part_mb:g} MiB parts x {args.concurrency}, "
+          f"{args.bandwidth_mbps:g} Mbit/s per connection, {args.rtt_ms:g} ms RTT")
+    for name, row in report.items():
+        print(f"{name:<7} {row['ms']:8.0f} ms   peak heap {row['peak_mb']:7.1f} MiB")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Concurrent identical heritage questions with and without request coalescing.
+
+Part 1 runs against the offline stand-ins. For each place, a burst of sessions asks the same
+heritage question at the same moment, before the place's guide is ingested. It counts the
+backend calls each burst makes and times the slowest session. The run is repeated in a fresh
+environment with coalescing disabled.
+
+Part 2 checks coalescing across worker processes. Several processes, each with several
+threads, call the same key of a SingleFlight group sharing one lock directory. The work
+takes --work-ms, and the part counts how many times it actually ran.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.single_flight --burst 8 --embedding-latency-ms 60 --vector-latency-ms 30 --aws-latency-ms 20
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from unittest import mock
+
+import numpy as np
+
+from benchmarks.environment import PLACES, offline_environment
+
+
+def run(args, coalesce: bool) -> Dict[str, Any]:
+    with offline_environment(
+        catalog_size=200,
+        seed=args.seed,
+        registrations=0,
+        embedding_latency=args.embedding_latency_ms / 1000 or None,
+        vector_latency=args.vector_latency_ms / 1000 or None,
+        aws_latency=args.aws_latency_ms / 1000 or None,
+    ):
+        from tools.tour_tools import get_heritage_guide
+        from utilities.prefetch import get_prefetcher
+        from utilities.single_flight import SingleFlight
+        from utilities.telemetry import add_span_listener, remove_span_listener
+
+        # Only the burst's own work is measured
+        get_prefetcher().enabled = False
+        calls: Counter = Counter()
+        lock = threading.Lock()
+
+        def count(span) -> None:
+            if span.kind == "backend":
+                with lock:
+                    calls[span.name] += 1
+
+        def ask(place: str, barrier: threading.Barrier) -> float:
+            barrier.wait()
+            started = time.perf_counter()
+            get_heritage_guide.invoke({"place": place, "search_query": "heritage sites"})
+            return time.perf_counter() - started
+
+        patch = mock.patch.object(SingleFlight, "do", lambda self, key, fn: fn()) if not coalesce else mock.MagicMock()
+        slowest: List[float] = []
+        add_span_listener(count)
+        try:
+            with patch, ThreadPoolExecutor(max_workers=args.burst) as pool:
+                for place in PLACES:
+                    barrier = threading.Barrier(args.burst)
+                    slowest.append(max(pool.map(lambda _: ask(place, barrier), range(args.burst))))
+        finally:
+            remove_span_listener(count)
+
+    return {
+        "slowest_p50_ms": float(np.percentile(np.asarray(slowest) * 1000, 50)),
+        "calls_per_burst": {name: n / len(PLACES) for name, n in sorted(calls.items())},
+    }
+
+
+def _worker(lock_dir: str, log_path: str, threads: int, work_ms: float, barrier) -> None:
+    from utilities.single_flight import SingleFlight
+
+    group = SingleFlight("bench", lock_dir=lock_dir)
+
+    def work() -> int:
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(f"{os.getpid()}\n")
+        time.sleep(work_ms / 1000)
+        return 42
+
+    barrier.wait()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        assert all(r == 42 for r in pool.map(lambda _: group.do("key", work), range(threads)))
+
+
+def run_processes(args) -> Dict[str, int]:
+    with tempfile.TemporaryDirectory(prefix="travelbot-single-flight-") as scratch:
+        log_path = os.path.join(scratch, "runs.log")
+        barrier = multiprocessing.Barrier(args.processes)
+        workers = [
+            multiprocessing.Process(target=_worker, args=(scratch, log_path, args.threads, args.work_ms, barrier))
+            for _ in range(args.processes)
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        with open(log_path, encoding="utf-8") as f:
+            runs = len(f.read().split())
+    return {"callers": args.processes * args.threads, "runs": runs,
+            "failed_workers": sum(1 for w in workers if w.exitcode != 0)}
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Request coalescing benchmark.")
+    parser.add_argument("--burst", type=int, default=8, help="sessions asking about a place at once")
+    parser.add_argument("--embedding-latency-ms", type=float, default=60.0)
+    parser.add_argument("--vector-latency-ms", type=float, default=30.0)
+    parser.add_argument("--aws-latency-ms", type=float, default=20.0)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4, help="threads per process")
+    parser.add_argument("--work-ms", type=float, default=200.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    report: Dict[str, Any] = {"off": run(args, coalesce=False), "on": run(args, coalesce=True)}
+    print(f"{len(PLACES)} places, {args.burst} concurrent sessions per place, cold guides")
+    for name in ("off", "on"):
+        row = report[name]
+        print(f"coalescing {name:<3} slowest session p50={row['slowest_p50_ms']:.0f}ms  "
+              f"backend calls per burst {row['calls_per_burst']}")
+
+    report["processes"] = run_processes(args)
+    row = report["processes"]
+    print(f"{args.processes} processes x {args.threads} threads on one key: {row['callers']} callers, "
+          f"work ran {row['runs']} time(s), failed workers {row['failed_workers']}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
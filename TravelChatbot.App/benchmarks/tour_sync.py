@@ -0,0 +1,73 @@
+"""Embedding cost of the tours index sync against the offline stand-ins.
+
+Runs these steps against the offline DynamoDB table and vector index:
+1. Sync once with nothing to do.
+2. Change, add and remove a fraction of the Tours table, then sync again.
+3. Sync a third time.
+
+After each sync it checks the index against the table and prints the embedding calls and
+inputs it spent. The offline environment already ran the initial full sync when seeding.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.tour_sync --catalog-size 5000 --churn 0.02
+"""
+import argparse
+import random
+import sys
+from collections import Counter
+
+from benchmarks.environment import offline_environment
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Incremental tours index sync benchmark.")
+    parser.add_argument("--catalog-size", type=int, default=5000)
+    parser.add_argument("--churn", type=float, default=0.02, help="fraction of tours changed, added and removed")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    with offline_environment(catalog_size=args.catalog_size, seed=args.seed, registrations=0) as env:
+        from models.tour import Tour
+        from tools.tour_sync import sync_tours_index
+        from utilities.aws_clients import get_client
+        from utilities.telemetry import add_span_listener, remove_span_listener
+
+        spent: Counter = Counter()
+
+        def count(span) -> None:
+            if span.name == "openai.embeddings":
+                spent["calls"] += 1
+                spent["inputs"] += span.attributes.get("inputs", 0)
+
+        def run(label: str) -> bool:
+            spent.clear()
+            stats = sync_tours_index()
+            in_sync = len(env.tour_index) == stats["tours"] and sync_tours_index(dry_run=True)["unchanged"] == stats["tours"]
+            print(f"{label:<28} {stats}  embeddings: {spent['calls']} calls / {spent['inputs']} inputs  "
+                  f"-> {'OK' if in_sync else 'OUT OF SYNC'}")
+            return in_sync
+
+        add_span_listener(count)
+        try:
+            ok = run("no changes")
+
+            n = max(1, int(len(env.tours) * args.churn))
+            picked = rng.sample(env.tours, 2 * n)
+            dynamodb = get_client("dynamodb")
+            for tour in picked[:n]:
+                dynamodb.put_item(TableName="Tours", Item=Tour(**{**tour, "price": tour["price"] + 50000}).to_dynamodb())
+            for tour in picked[n:]:
+                dynamodb.delete_item(TableName="Tours", Key={"place": {"S": tour["place"]}, "tourId": {"S": tour["tourId"]}})
+            for i in range(n):
+                dynamodb.put_item(TableName="Tours", Item=Tour(**{**picked[i], "tourId": f"new-{i:06d}"}).to_dynamodb())
+
+            ok = run(f"{n} changed/{n} removed/{n} new") and ok
+            ok = run("again") and ok
+        finally:
+            remove_span_listener(count)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
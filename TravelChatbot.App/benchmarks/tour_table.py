@@ -0,0 +1,92 @@
+"""Memory and filter speed of the catalog representations.
+
+Compares a list of tour dicts, a list of Tour objects, and the columnar TourTable. The check
+parses N synthetic DynamoDB items and runs the same filter-and-sort query on each
+representation: place, price ceiling, start-date window, sorted by price.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.tour_table --size 50000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.environment import generate_catalog
+from models.tour import Tour
+from models.tour_table import TourTable
+
+
+def _measure(build: Callable[[], Any]) -> Tuple[Any, int, float]:
+    """Build once under tracemalloc for the retained size, then time untraced builds."""
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    _, seconds = _time(build, 3)
+    return value, size, seconds
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> Tuple[Any, float]:
+    result = fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return result, (time.perf_counter() - started) / repeat
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="TourTable memory and filter benchmark.")
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    items = [Tour(**t).to_dynamodb() for t in generate_catalog(args.size, rng)]
+    place, max_price = "Hoi An", 1500000
+    start_from = min(int(i["startDate"]["N"]) for i in items)
+    start_to = start_from + 60 * 86400
+
+    dicts, dict_bytes, dict_parse = _measure(lambda: [Tour.from_dynamodb(i).to_dict() for i in items])
+    tours, tour_bytes, tour_parse = _measure(lambda: [Tour.from_dynamodb(i) for i in items])
+    table, table_bytes, table_parse = _measure(lambda: TourTable.from_dynamodb(items))
+
+    def query_dicts() -> List[str]:
+        hits = [t for t in dicts if t["place"] == place and t["price"] <= max_price and start_from <= t["startDate"] <= start_to]
+        return [t["tourId"] for t in sorted(hits, key=lambda t: t["price"])]
+
+    def query_tours() -> List[str]:
+        hits = [t for t in tours if t.place == place and t.price <= max_price and start_from <= t.startDate <= start_to]
+        return [t.tourId for t in sorted(hits, key=lambda t: t.price)]
+
+    def query_table() -> List[str]:
+        rows = table.rows(table.select(place=place, max_price=max_price, start_from=start_from, start_to=start_to, sort_by="price"))
+        return [r.tourId for r in rows]
+
+    expected, dict_query = _time(query_dicts, args.repeat)
+    tour_hits, tour_query = _time(query_tours, args.repeat)
+    table_hits, table_query = _time(query_table, args.repeat)
+    assert [tour.price for tour in map(table.row, table_hits)] == sorted(tour.price for tour in map(table.row, expected))
+    assert set(expected) == set(tour_hits) == set(table_hits)
+
+    report = {
+        "size": args.size,
+        "matches": len(expected),
+        "dicts": {"bytes": dict_bytes, "parse_ms": dict_parse * 1000, "query_ms": dict_query * 1000},
+        "tours": {"bytes": tour_bytes, "parse_ms": tour_parse * 1000, "query_ms": tour_query * 1000},
+        "table": {"bytes": table_bytes, "parse_ms": table_parse * 1000, "query_ms": table_query * 1000},
+    }
+    print(f"{args.size} tours, query matches {len(expected)}")
+    print(f"{'representation':<16}{'memory MB':>12}{'parse ms':>12}{'query ms':>12}")
+    for name in ("dicts", "tours", "table"):
+        row = report[name]
+        print(f"{name:<16}{row['bytes'] / 2**20:>12.1f}{row['parse_ms']:>12.1f}{row['query_ms']:>12.3f}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Turn step and time budgets against a looping model and a slow vector index.
+
+Runs the synthetic workload of run_benchmark against the offline stand-ins, in these cases:
+- loop_unbounded: a model that calls a tool again after every result, run through the bare
+                  graph without a turn budget. The recursion limit is set to 25 here; LangGraph's
+                  own default (10007) would let the turn run for thousands of rounds.
+- loop_budget:    the same model through ControllerAgent.invoke, with --max-steps
+- slow_unbounded: a normal model with a slow vector index and no practical deadline
+- slow_deadline:  the same, with a --deadline-s turn deadline and --reserve-s kept for the answer
+- loop_deadline:  the looping model with no practical step limit and the --deadline-s deadline
+
+For each case it reports turn latency, failed turns, llm_node steps per turn and budget exhaustions,
+then checks the budgets held: no turn over --max-steps (loop_budget) or the deadline (loop_deadline,
+slow_deadline), every looping turn ended by a final answer the model gave without tools, and each
+such turn counted in travelbot_turn_budget_exhausted_total. Exits 1 when a check fails.
+
+Usage (from TravelChatbot.App):
+    python -m benchmarks.turn_budget --turns 40 --concurrency 8 --llm-latency-ms 200 --vector-latency-ms 3000
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.environment import offline_environment
+from benchmarks.run_benchmark import synthetic_prompts
+
+# Canned replies of ControllerAgent when even the final answer fails
+CANNED_PREFIXES = ("I ran out of time", "I couldn't finish")
+# Scheduling headroom over the turn deadline before a turn counts as overrunning it
+DEADLINE_SLACK_S = 0.25
+
+
+def run_case(agent, prompts: List[str], concurrency: int, bare_graph: bool) -> Dict[str, Any]:
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+    from agents.controller_agent import TURN_BUDGET_EXHAUSTED
+    from agents.prompts import system_message
+    from utilities.telemetry import add_span_listener, remove_span_listener
+
+    steps: Counter = Counter()
+    lock = threading.Lock()
+
+    def count(span) -> None:
+        if span.name == "llm_node":
+            with lock:
+                steps["llm_node"] += 1
+
+    def turn(prompt: str):
+        state = {"messages": [system_message, HumanMessage(content=prompt)]}
+        started = time.perf_counter()
+        try:
+            if bare_graph:
+                final = agent.graph.invoke(state, {"recursion_limit": 25})
+            else:
+                final = agent.invoke(state)
+        except Exception:
+            return time.perf_counter() - started, True, None, False, False
+        elapsed = time.perf_counter() - started
+        added = final["messages"][len(state["messages"]):]
+        last = final["messages"][-1]
+        failed = str(last.content).startswith("I encountered an issue")
+        used_tools = any(isinstance(m, ToolMessage) for m in added)
+        # The looping model only answers without tools bound: after tool results, that is the forced final answer
+        answered = isinstance(last, AIMessage) and not last.tool_calls and not failed and \
+            not str(last.content).startswith(CANNED_PREFIXES)
+        return elapsed, failed, sum(isinstance(m, AIMessage) for m in added), used_tools, used_tools and answered
+
+    reasons = [(r, a) for r in ("steps", "deadline") for a in ("true", "false")]
+    before = {k: TURN_BUDGET_EXHAUSTED.value(reason=k[0], answered=k[1]) for k in reasons}
+    add_span_listener(count)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(turn, prompts))
+    finally:
+        remove_span_listener(count)
+
+    lat = np.asarray([r[0] for r in results]) * 1000
+    counted = [r[2] for r in results if r[2] is not None]
+    exhausted = {f"{r}{'' if a == 'true' else ' (canned)'}": int(TURN_BUDGET_EXHAUSTED.value(reason=r, answered=a) - before[(r, a)])
+                 for r, a in reasons}
+    return {
+        "p50_ms": float(np.percentile(lat, 50)),
+        "max_ms": float(lat.max()),
+        "failed": sum(1 for r in results if r[1]),
+        "steps_per_turn": steps["llm_node"] / len(prompts),
+        "max_steps": max(counted, default=0),
+        "tool_turns": sum(1 for r in results if r[3]),
+        "answered": sum(1 for r in results if r[4]),
+        "exhausted": {k: v for k, v in exhausted.items() if v},
+    }
+
+
+def check(report: Dict[str, Any], max_steps: int, deadline_s: float) -> List[str]:
+    """The budget guarantees each case must keep; one line per violation."""
+    problems = []
+    limit_ms = (deadline_s + DEADLINE_SLACK_S) * 1000
+    loop = report["loop_budget"]
+    if loop["max_steps"] > max_steps:
+        problems.append(f"loop_budget: a turn took {loop['max_steps']} llm steps, limit {max_steps}")
+    for name, reason in (("loop_budget", "steps"), ("loop_deadline", "deadline")):
+        row = report[name]
+        if row["failed"]:
+            problems.append(f"{name}: {row['failed']} failed turn(s)")
+        if row["answered"] != row["tool_turns"]:
+            problems.append(f"{name}: {row['answered']} of {row['tool_turns']} looping turns ended in a final answer without tools")
+        if row["exhausted"].get(reason, 0) != row["answered"]:
+            problems.append(f"{name}: budget exhausted ({reason}) counted {row['exhausted'].get(reason, 0)} times "
+                            f"for {row['answered']} forced answers")
+    for name in ("loop_deadline", "slow_deadline"):
+        row = report[name]
+        if row["max_ms"] > limit_ms:
+            problems.append(f"{name}: a turn took {row['max_ms']:.0f}ms, deadline {deadline_s:g}s")
+    if report["slow_deadline"]["failed"]:
+        problems.append(f"slow_deadline: {report['slow_deadline']['failed']} failed turn(s)")
+    return problems
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Turn budget benchmark.")
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--vector-latency-ms", type=float, default=3000.0, help="vector index latency in the slow cases")
+    parser.add_argument("--max-steps", type=int, default=6)
+    parser.add_argument("--deadline-s", type=float, default=3.0)
+    parser.add_argument("--reserve-s", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    report: Dict[str, Any] = {}
+    with offline_environment(catalog_size=500, seed=args.seed) as env:
+        from agents.controller_agent import ControllerAgent
+        from benchmarks.fakes import ScriptedChatModel
+        from utilities.prefetch import get_prefetcher
+
+        get_prefetcher().enabled = False
+        prompts = synthetic_prompts(env, args.turns, random.Random(args.seed))
+        latency = args.llm_latency_ms / 1000
+
+        looping = ControllerAgent(llm=ScriptedChatModel(latency=latency, repeat_tools=True))
+        looping.max_steps = args.max_steps
+        report["loop_unbounded"] = run_case(looping, prompts, args.concurrency, bare_graph=True)
+        report["loop_budget"] = run_case(looping, prompts, args.concurrency, bare_graph=False)
+
+        env.tour_index.latency = env.heritage_index.latency = args.vector_latency_ms / 1000
+        agent = ControllerAgent(llm=ScriptedChatModel(latency=latency))
+        agent.turn_deadline = 3600.0
+        report["slow_unbounded"] = run_case(agent, prompts, args.concurrency, bare_graph=False)
+        agent.turn_deadline, agent.final_answer_reserve = args.deadline_s, args.reserve_s
+        report["slow_deadline"] = run_case(agent, prompts, args.concurrency, bare_graph=False)
+
+        env.tour_index.latency = env.heritage_index.latency = None
+        looping.max_steps = 10_000
+        looping.turn_deadline, looping.final_answer_reserve = args.deadline_s, args.reserve_s
+        report["loop_deadline"] = run_case(looping, prompts, args.concurrency, bare_graph=False)
+
+    print(f"{args.turns} synthetic turns, concurrency {args.concurrency}, model {args.llm_latency_ms:g} ms, "
+          f"max steps {args.max_steps}, deadline {args.deadline_s:g} s (reserve {args.reserve_s:g} s), "
+          f"slow vector index {args.vector_latency_ms:g} ms")
+    for name, row in report.items():
+        print(f"{name:<15} p50={row['p50_ms']:.0f}ms max={row['max_ms']:.0f}ms failed={row['failed']:<3} "
+              f"llm steps/turn={row['steps_per_turn']:.1f} (max {row['max_steps']}) "
+              f"answered after tools={row['answered']}/{row['tool_turns']} budget exhausted={row['exhausted']}")
+
+    problems = check(report, args.max_steps, args.deadline_s)
+    for problem in problems:
+        print(f"FAIL {problem}")
+    print("budgets held -> OK" if not problems else f"{len(problems)} check(s) failed")
+    report["problems"] = problems
+    return report
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main()["problems"] else 0)
@@ -8,8 +8,12 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_ENDPOINT = os.getenv("OPENAI_ENDPOINT")
 OPENAI_DEPLOYMENT_NAME = os.getenv("OPENAI_DEPLOYMENT_NAME")
+# Optional small deployment for cheap steps (agents/model_router.py); unset = one tier
+OPENAI_FAST_DEPLOYMENT_NAME = os.getenv("OPENAI_FAST_DEPLOYMENT_NAME")
 OPENAI_TEXT_EMBEDED_API_KEY = os.getenv("OPENAI_TEXT_EMBEDED_API_KEY")
 OPENAI_TEXT_EMBEDED_DEPLOYMENT_NAME = os.getenv("OPENAI_TEXT_EMBEDED_DEPLOYMENT_NAME")
+# Vector size of the embeddings deployment (Pinecone indexes and the local embedding store)
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "1536"))
 
 # Pinecone Configuration
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
@@ -21,6 +25,144 @@ AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_REGION = os.getenv("AWS_REGION")
 HERITAGE_GUIDE_S3_BUCKET = os.getenv("HERITAGE_GUIDE_S3_BUCKET")
 
+# Tour catalog snapshot (tools/tour_catalog.py): change feed is "auto" (DynamoDB Stream when the
+# Tours table has one, else scan polling), "streams" or "scan". Refresh every REFRESH seconds
+# (0 disables the background refresher); a snapshot older than MAX_STALENESS is never served.
+TOUR_CATALOG_CHANGE_FEED = os.getenv("TOUR_CATALOG_CHANGE_FEED", "auto")
+TOUR_CATALOG_REFRESH_SECONDS = float(os.getenv("TOUR_CATALOG_REFRESH_SECONDS", "30"))
+TOUR_CATALOG_MAX_STALENESS_SECONDS = float(os.getenv("TOUR_CATALOG_MAX_STALENESS_SECONDS", "300"))
+
+# Local SQLite file holding heritage guide chunk text (utilities/chunk_store.py)
+CHUNK_STORE_PATH = os.getenv("CHUNK_STORE_PATH", "heritage_chunks.sqlite3")
+
+# S3 downloads (utilities/s3_download.py): objects larger than one part are fetched with parallel
+# ranged GETs; objects up to the cache size are kept in CACHE_DIR (LRU, revalidated by ETag),
+# others are spooled to a temp file that stays in memory up to SPOOL_BYTES. 0 disables the cache.
+S3_CACHE_DIR = os.getenv("S3_CACHE_DIR", "s3_cache")
+S3_CACHE_MAX_BYTES = int(os.getenv("S3_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+S3_DOWNLOAD_PART_BYTES = int(os.getenv("S3_DOWNLOAD_PART_BYTES", str(8 * 1024 * 1024)))
+S3_DOWNLOAD_MAX_CONCURRENCY = int(os.getenv("S3_DOWNLOAD_MAX_CONCURRENCY", "4"))
+S3_DOWNLOAD_SPOOL_BYTES = int(os.getenv("S3_DOWNLOAD_SPOOL_BYTES", str(16 * 1024 * 1024)))
+
+# Request coalescing (utilities/single_flight.py): concurrent heritage ingestion of a tour and
+# identical searches run once. LOCK_DIR (shared by the worker processes on a host, "" for
+# in-process only) extends this across processes; callers stop waiting after WAIT seconds.
+SINGLE_FLIGHT_LOCK_DIR = os.getenv("SINGLE_FLIGHT_LOCK_DIR", "single_flight")
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "60"))
+
+# Heritage guide context sent to the LLM: token budget, near-duplicate Jaccard threshold and
+# reranker ("lexical" blends BM25 with the vector score, "none" keeps vector order)
+HERITAGE_CONTEXT_TOKEN_BUDGET = int(os.getenv("HERITAGE_CONTEXT_TOKEN_BUDGET", "1500"))
+HERITAGE_DEDUP_THRESHOLD = float(os.getenv("HERITAGE_DEDUP_THRESHOLD", "0.8"))
+HERITAGE_RERANK = os.getenv("HERITAGE_RERANK", "lexical")
+
+# Local embedding store for the group recommender's tour vectors (utilities/embedding_store.py).
+# ENCODING is what a search scans: float32, float16, int8 or pq (PQ_SUBSPACES one-byte codes per
+# vector); the best RESCORE x k candidates are re-scored with full precision. Stores are
+# memory-mapped files under DIR, shared by the worker processes ("" keeps them in process memory).
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "embedding_store")
+EMBEDDING_STORE_ENCODING = os.getenv("EMBEDDING_STORE_ENCODING", "int8")
+EMBEDDING_STORE_PQ_SUBSPACES = int(os.getenv("EMBEDDING_STORE_PQ_SUBSPACES", "96"))
+EMBEDDING_STORE_RESCORE = int(os.getenv("EMBEDDING_STORE_RESCORE", "10"))
+
+# Concurrent vector queries per multi-place batch search (search_places)
+SEARCH_BATCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_BATCH_MAX_CONCURRENCY", "8"))
+
+# Background prefetch after tour listings (utilities/prefetch.py): warms the listed places' heritage
+# guides, query embeddings for the common heritage questions below and presigned URLs. Work only
+# runs when no turn has been active for IDLE seconds; queued work older than MAX_AGE is dropped.
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+PREFETCH_QUEUE_SIZE = int(os.getenv("PREFETCH_QUEUE_SIZE", "32"))
+PREFETCH_IDLE_SECONDS = float(os.getenv("PREFETCH_IDLE_SECONDS", "0.2"))
+PREFETCH_MAX_AGE_SECONDS = float(os.getenv("PREFETCH_MAX_AGE_SECONDS", "120"))
+PREFETCH_MAX_PLACES = int(os.getenv("PREFETCH_MAX_PLACES", "3"))
+PREFETCH_HERITAGE_QUERIES = [
+    q.strip() for q in os.getenv("PREFETCH_HERITAGE_QUERIES", "heritage sites,tourist information,places to visit").split(",")
+    if q.strip()
+]
+
+# Model tier routing (agents/model_router.py): answers from these tools, tool results longer than
+# RESULT_CHARS and questions longer than PROMPT_CHARS go to the large tier, everything else to the
+# fast one. A tier whose error rate or mean latency over the last WINDOW seconds exceeds the
+# limits below is tried after healthy tiers.
+MODEL_ROUTER_LARGE_TOOLS = [
+    t.strip() for t in os.getenv("MODEL_ROUTER_LARGE_TOOLS", "get_heritage_guide,search_places,recommend_group_tours").split(",")
+    if t.strip()
+]
+MODEL_ROUTER_LARGE_RESULT_CHARS = int(os.getenv("MODEL_ROUTER_LARGE_RESULT_CHARS", "6000"))
+MODEL_ROUTER_LARGE_PROMPT_CHARS = int(os.getenv("MODEL_ROUTER_LARGE_PROMPT_CHARS", "600"))
+MODEL_ROUTER_LATENCY_BUDGET_SECONDS = float(os.getenv("MODEL_ROUTER_LATENCY_BUDGET_SECONDS", "8"))
+MODEL_ROUTER_MAX_ERROR_RATE = float(os.getenv("MODEL_ROUTER_MAX_ERROR_RATE", "0.5"))
+MODEL_ROUTER_WINDOW_SECONDS = float(os.getenv("MODEL_ROUTER_WINDOW_SECONDS", "60"))
+
+# Turn budget (agents/controller_agent.py): a turn gets DEADLINE seconds and at most MAX_STEPS
+# llm_node steps. Tools and backends get the deadline minus FINAL_ANSWER_RESERVE; when the
+# budget runs out, the model answers from the results so far without tools.
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "90"))
+TURN_MAX_STEPS = int(os.getenv("TURN_MAX_STEPS", "6"))
+TURN_FINAL_ANSWER_RESERVE_SECONDS = float(os.getenv("TURN_FINAL_ANSWER_RESERVE_SECONDS", "10"))
+
+# Registered tours cache (tools/registrations.py): a phone number's hydrated registrations,
+# newest first, kept for TTL seconds and never past the point where a heritage guide URL in them
+# has less than half its lifetime left. SIZE phone numbers are kept; at most MAX_ITEMS
+# registrations per phone, older pages are read from DynamoDB.
+REGISTRATION_CACHE_TTL_SECONDS = float(os.getenv("REGISTRATION_CACHE_TTL_SECONDS", "300"))
+REGISTRATION_CACHE_SIZE = int(os.getenv("REGISTRATION_CACHE_SIZE", "10000"))
+REGISTRATION_CACHE_MAX_ITEMS = int(os.getenv("REGISTRATION_CACHE_MAX_ITEMS", "200"))
+
+# Tool execution engine
+TOOL_DEFAULT_TIMEOUT_SECONDS = float(os.getenv("TOOL_DEFAULT_TIMEOUT_SECONDS", "20"))
+TOOL_BACKEND_MAX_CONCURRENCY = int(os.getenv("TOOL_BACKEND_MAX_CONCURRENCY", "8"))
+TOOL_BREAKER_FAILURE_THRESHOLD = int(os.getenv("TOOL_BREAKER_FAILURE_THRESHOLD", "5"))
+TOOL_BREAKER_RESET_SECONDS = float(os.getenv("TOOL_BREAKER_RESET_SECONDS", "30"))
+
+# Resilient embedding and vector search calls (utilities/resilience.py). An attempt times out at
+# TIMEOUT_MULTIPLIER x the observed p99 latency, kept within MIN/MAX_TIMEOUT. A duplicate (hedged)
+# request goes out once an attempt runs past the p95. A transient failure is retried up to
+# MAX_RETRIES times with jittered backoff. Retries and hedges draw on one process-wide budget:
+# each call adds RETRY_BUDGET_RATIO of a token, and MIN_PER_SECOND tokens refill over time.
+RESILIENCE_ENABLED = os.getenv("RESILIENCE_ENABLED", "true").lower() == "true"
+RESILIENCE_MAX_RETRIES = int(os.getenv("RESILIENCE_MAX_RETRIES", "2"))
+RESILIENCE_MIN_TIMEOUT_SECONDS = float(os.getenv("RESILIENCE_MIN_TIMEOUT_SECONDS", "0.5"))
+RESILIENCE_MAX_TIMEOUT_SECONDS = float(os.getenv("RESILIENCE_MAX_TIMEOUT_SECONDS", "20"))
+RESILIENCE_TIMEOUT_MULTIPLIER = float(os.getenv("RESILIENCE_TIMEOUT_MULTIPLIER", "3"))
+RESILIENCE_BACKOFF_SECONDS = float(os.getenv("RESILIENCE_BACKOFF_SECONDS", "0.05"))
+RESILIENCE_HEDGE = os.getenv("RESILIENCE_HEDGE", "true").lower() == "true"
+RESILIENCE_RETRY_BUDGET_RATIO = float(os.getenv("RESILIENCE_RETRY_BUDGET_RATIO", "0.1"))
+RESILIENCE_RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("RESILIENCE_RETRY_BUDGET_MIN_PER_SECOND", "1"))
+RESILIENCE_MAX_CONCURRENCY = int(os.getenv("RESILIENCE_MAX_CONCURRENCY", "32"))
+
+# Telemetry (both optional): Prometheus /metrics port and JSON-lines span log path.
+# The chat API serves the port only with CHAT_API_WORKERS=1; metrics are per process, so with
+# several workers each serves its own on the API's /metrics instead
+TELEMETRY_METRICS_PORT = int(os.getenv("TELEMETRY_METRICS_PORT", "0"))
+TELEMETRY_SPAN_LOG = os.getenv("TELEMETRY_SPAN_LOG")
+# Tool arguments (at any depth) never copied into span attributes
+TELEMETRY_REDACTED_ARGS = [
+    a.strip() for a in os.getenv(
+        "TELEMETRY_REDACTED_ARGS", "phoneNumber,phoneNumbers,idempotencyKey,name,preferences"
+    ).split(",") if a.strip()
+]
+
+# Session recording (optional): append each turn's LLM calls, tool calls and backend calls to this
+# trace file (gzip-compressed when it ends in .gz) for replay with benchmarks/replay.py.
+# TRACE_RECORD_SAMPLE_RATE is the share of turns recorded. Traces hold message contents and tool
+# arguments and results verbatim (phone numbers, bookings); nothing is redacted unless a hook is
+# installed with utilities.recorder.set_redactor
+TRACE_RECORD_PATH = os.getenv("TRACE_RECORD_PATH")
+TRACE_RECORD_SAMPLE_RATE = float(os.getenv("TRACE_RECORD_SAMPLE_RATE", "1"))
+
+# Chat API (api/server.py) and the Streamlit client
+CHAT_API_URL = os.getenv("CHAT_API_URL", "http://localhost:8000")
+CHAT_API_HOST = os.getenv("CHAT_API_HOST", "0.0.0.0")
+CHAT_API_PORT = int(os.getenv("CHAT_API_PORT", "8000"))
+CHAT_API_WORKERS = int(os.getenv("CHAT_API_WORKERS", "1"))
+CHAT_API_MAX_CONCURRENT_TURNS = int(os.getenv("CHAT_API_MAX_CONCURRENT_TURNS", "16"))
+CHAT_API_QUEUE_TIMEOUT_SECONDS = float(os.getenv("CHAT_API_QUEUE_TIMEOUT_SECONDS", "5"))
+CHAT_API_SESSION_TTL_SECONDS = int(os.getenv("CHAT_API_SESSION_TTL_SECONDS", "3600"))
+# Shared SQLite file for session history; required when running more than one worker
+CHAT_API_SESSION_DB = os.getenv("CHAT_API_SESSION_DB")
+
 # Validate configuration
 def validate_config():
     """Validate that all required environment variables are set"""
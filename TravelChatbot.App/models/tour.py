@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Dict, Any, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class Tour:
     place: str
     tourId: str
@@ -0,0 +1,231 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from models.tour import Tour
+
+
+class _Codes:
+    """Interns repeated strings (place, category, status) as small integer codes."""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> int:
+        """Code of `value`, or -1 when no row has it."""
+        return self._codes.get(value, -1)
+
+
+class TourRow:
+    """A lightweight read-only view of one row of a TourTable."""
+
+    __slots__ = ("_table", "_i")
+
+    def __init__(self, table: "TourTable", i: int):
+        self._table = table
+        self._i = i
+
+    @property
+    def tourId(self) -> str:
+        return self._table.tourId[self._i]
+
+    @property
+    def place(self) -> str:
+        return self._table.places.values[self._table.place_code[self._i]]
+
+    @property
+    def title(self) -> str:
+        return self._table.title[self._i]
+
+    @property
+    def startDate(self) -> int:
+        return int(self._table.startDate[self._i])
+
+    @property
+    def endDate(self) -> int:
+        return int(self._table.endDate[self._i])
+
+    @property
+    def price(self) -> int:
+        return int(self._table.price[self._i])
+
+    @property
+    def status(self) -> str:
+        return self._table.statuses.values[self._table.status_code[self._i]]
+
+    @property
+    def category(self) -> str:
+        return self._table.categories.values[self._table.category_code[self._i]]
+
+    @property
+    def heritageGuide(self) -> str:
+        return self._table.heritageGuide[self._i]
+
+    def to_tour(self) -> Tour:
+        return Tour(**self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "place": self.place,
+            "tourId": self.tourId,
+            "title": self.title,
+            "startDate": self.startDate,
+            "endDate": self.endDate,
+            "price": self.price,
+            "status": self.status,
+            "category": self.category,
+            "heritageGuide": self.heritageGuide,
+        }
+
+    def __repr__(self) -> str:
+        return f"TourRow({self.tourId!r}, place={self.place!r}, price={self.price})"
+
+
+class TourRows(Sequence[TourRow]):
+    """Rows selected from a TourTable; views are created only for the rows actually accessed."""
+
+    __slots__ = ("_table", "_indices")
+
+    def __init__(self, table: "TourTable", indices: np.ndarray):
+        self._table = table
+        self._indices = indices
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[TourRow, List[TourRow]]:
+        if isinstance(key, slice):
+            return [TourRow(self._table, int(i)) for i in self._indices[key]]
+        return TourRow(self._table, int(self._indices[key]))
+
+
+class TourTable:
+    """Column-oriented, immutable tour catalog.
+
+    Numeric fields live in NumPy arrays and place/category/status are interned as int32 codes,
+    so filters and sorts run as vectorized array operations instead of Python loops over
+    Tour objects. Results are index arrays; `rows` turns them into TourRow views.
+    """
+
+    SORT_KEYS = ("price", "startDate", "endDate")
+
+    def __init__(self, size: int):
+        self.places = _Codes()
+        self.categories = _Codes()
+        self.statuses = _Codes()
+        self.tourId: List[str] = [""] * size
+        self.title: List[str] = [""] * size
+        self.heritageGuide: List[str] = [""] * size
+        self.place_code = np.zeros(size, dtype=np.int32)
+        self.category_code = np.zeros(size, dtype=np.int32)
+        self.status_code = np.zeros(size, dtype=np.int32)
+        self.price = np.zeros(size, dtype=np.int64)
+        self.startDate = np.zeros(size, dtype=np.int64)
+        self.endDate = np.zeros(size, dtype=np.int64)
+        self._row_by_id: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.tourId)
+
+    def _finish(self) -> "TourTable":
+        self._row_by_id = {tourId: i for i, tourId in enumerate(self.tourId)}
+        for column in (self.place_code, self.category_code, self.status_code, self.price, self.startDate, self.endDate):
+            column.flags.writeable = False
+        return self
+
+    @classmethod
+    def from_tours(cls, tours: Sequence[Tour]) -> "TourTable":
+        table = cls(len(tours))
+        for i, tour in enumerate(tours):
+            table.tourId[i] = tour.tourId
+            table.title[i] = tour.title
+            table.heritageGuide[i] = tour.heritageGuide or ""
+            table.place_code[i] = table.places.code(tour.place)
+            table.category_code[i] = table.categories.code(tour.category or "")
+            table.status_code[i] = table.statuses.code(tour.status or "")
+        table.price[:] = [t.price for t in tours]
+        table.startDate[:] = [t.startDate for t in tours]
+        table.endDate[:] = [t.endDate for t in tours]
+        return table._finish()
+
+    @classmethod
+    def from_dynamodb(cls, items: Sequence[Dict[str, Any]]) -> "TourTable":
+        """Bulk-parse DynamoDB items (as returned by boto3) straight into the columns."""
+        table = cls(len(items))
+        places, categories, statuses = table.places, table.categories, table.statuses
+        for i, item in enumerate(items):
+            table.tourId[i] = item["tourId"]["S"]
+            table.title[i] = item["title"]["S"]
+            table.heritageGuide[i] = item.get("heritageGuide", {}).get("S") or ""
+            table.place_code[i] = places.code(item["place"]["S"])
+            table.category_code[i] = categories.code(item.get("category", {}).get("S") or "")
+            table.status_code[i] = statuses.code(item.get("status", {}).get("S") or "")
+        # Numbers arrive as decimal strings; one vectorized conversion per column
+        table.price[:] = np.array([item["price"]["N"] for item in items], dtype=np.int64) if items else 0
+        table.startDate[:] = np.array([item["startDate"]["N"] for item in items], dtype=np.int64) if items else 0
+        table.endDate[:] = np.array([item["endDate"]["N"] for item in items], dtype=np.int64) if items else 0
+        return table._finish()
+
+    def row(self, tourId: str) -> Optional[TourRow]:
+        i = self._row_by_id.get(tourId)
+        return None if i is None else TourRow(self, i)
+
+    def rows(self, indices: Optional[Iterable[int]] = None) -> TourRows:
+        if indices is None:
+            indices = np.arange(len(self))
+        return TourRows(self, np.asarray(indices, dtype=np.int64))
+
+    def __iter__(self) -> Iterator[TourRow]:
+        return iter(self.rows())
+
+    def mask(
+        self,
+        place: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        start_from: Optional[int] = None,
+        start_to: Optional[int] = None,
+        end_to: Optional[int] = None,
+    ) -> np.ndarray:
+        """Boolean mask of the rows matching every given filter (dates are epoch seconds)."""
+        mask = np.ones(len(self), dtype=bool)
+        if place is not None:
+            mask &= self.place_code == self.places.lookup(place)
+        if category is not None:
+            mask &= self.category_code == self.categories.lookup(category)
+        if min_price is not None:
+            mask &= self.price >= min_price
+        if max_price is not None:
+            mask &= self.price <= max_price
+        if start_from is not None:
+            mask &= self.startDate >= start_from
+        if start_to is not None:
+            mask &= self.startDate <= start_to
+        if end_to is not None:
+            mask &= self.endDate <= end_to
+        return mask
+
+    def select(self, sort_by: Optional[str] = None, descending: bool = False, **filters) -> np.ndarray:
+        """Row indices matching `filters` (see `mask`), optionally sorted by a numeric column.
+
+        Without `sort_by`, rows keep table order. Sorting is stable, so ties keep table order too.
+        """
+        indices = np.flatnonzero(self.mask(**filters))
+        if sort_by is not None:
+            if sort_by not in self.SORT_KEYS:
+                raise ValueError(f"sort_by must be one of {', '.join(self.SORT_KEYS)}")
+            keys = getattr(self, sort_by)[indices]
+            order = np.argsort(-keys if descending else keys, kind="stable")
+            indices = indices[order]
+        return indices
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -9,6 +9,14 @@ class GetRegisteredToursArgs(BaseModel):
     phoneNumber: str = Field(
         description="The customer's phone number. Used to look up all tours registered under this number."
     )
+    pagination_token: Optional[str] = Field(
+        default=None,
+        description="Token for getting the next (older) page of registrations. Omit for the newest ones."
+    )
+    page_size: int = Field(
+        default=20,
+        description="Number of registrations to return per page. Default is 20."
+    )
 
 
 class GetToursArgs(BaseModel):
@@ -33,6 +41,30 @@ class GetToursArgs(BaseModel):
         default=None,
         description="Filter by document type."
     )
+    min_price: Optional[int] = Field(
+        default=None,
+        description="Only tours costing at least this much (VND)."
+    )
+    max_price: Optional[int] = Field(
+        default=None,
+        description="Only tours costing at most this much (VND). Example: 600000 for 'tours under 600000 VND'."
+    )
+    category: Optional[str] = Field(
+        default=None,
+        description="Only tours in this category."
+    )
+    start_from: Optional[int] = Field(
+        default=None,
+        description="Only tours starting at or after this time (Unix epoch seconds)."
+    )
+    start_to: Optional[int] = Field(
+        default=None,
+        description="Only tours starting at or before this time (Unix epoch seconds)."
+    )
+    sort_by: Optional[Literal["price", "startDate", "endDate"]] = Field(
+        default=None,
+        description="Sort the tours by this field (ascending)."
+    )
     pagination_token: Optional[str] = Field(
         default=None,
         description="Token for getting the next page of results. Omit for first page."
@@ -77,3 +109,112 @@ class RegisterTourArgs(BaseModel):
     phoneNumber: str = Field(
         description="The customer's phone number used for registration."
     )
+    idempotencyKey: Optional[str] = Field(
+        default=None,
+        description=(
+            "Optional client-generated key for this registration request. "
+            "Retrying with the same key returns the original registration instead of a duplicate error."
+        ),
+    )
+
+
+class RegisterGroupTourArgs(BaseModel):
+    """Arguments for register_group_tour tool."""
+    model_config = ConfigDict(extra="allow")
+    
+    tourId: str = Field(
+        description="The tour unique identifier."
+    )
+    phoneNumbers: List[str] = Field(
+        min_length=1,
+        description="Phone numbers of every traveler in the group to register for the tour."
+    )
+    idempotencyKey: Optional[str] = Field(
+        default=None,
+        description=(
+            "Optional client-generated key for this group registration request. "
+            "Retrying with the same key reports already-written members as registered, not duplicates."
+        ),
+    )
+
+
+class PlaceSearch(BaseModel):
+    """One place of a multi-place search."""
+    place: str = Field(description="The name of the place in Vietnam.")
+    search_query: Optional[str] = Field(
+        default=None,
+        description="Optional natural language query for this place, e.g. 'street food' or 'tours under 600000 VND'."
+    )
+
+
+class SearchPlacesArgs(BaseModel):
+    """Arguments for search_places tool."""
+    model_config = ConfigDict(extra="allow")
+
+    searches: List[PlaceSearch] = Field(
+        min_length=1,
+        max_length=10,
+        description="The places to search, each with an optional query. Use one entry per place of the itinerary."
+    )
+    page_size: int = Field(
+        default=5,
+        description="Number of tours and heritage passages to return per place. Default is 5."
+    )
+    include_heritage: bool = Field(
+        default=True,
+        description="Also search the heritage guides of each place."
+    )
+
+
+class GroupMemberPreference(BaseModel):
+    """One traveler's preferences and constraints for a group recommendation."""
+    name: Optional[str] = Field(default=None, description="The traveler's name, used to label their scores.")
+    preferences: str = Field(
+        description="What this traveler wants from the trip, in their own words. Example: 'street food and night markets'."
+    )
+    interests: Optional[List[str]] = Field(
+        default=None,
+        description="Optional short interest tags, e.g. ['history', 'beaches']."
+    )
+    max_price: Optional[int] = Field(
+        default=None,
+        description="The most this traveler will pay for a tour (VND)."
+    )
+    available_from: Optional[int] = Field(
+        default=None,
+        description="Earliest tour start this traveler can make (Unix epoch seconds)."
+    )
+    available_to: Optional[int] = Field(
+        default=None,
+        description="Latest tour end this traveler can make (Unix epoch seconds)."
+    )
+
+
+class RecommendGroupToursArgs(BaseModel):
+    """Arguments for recommend_group_tours tool."""
+    model_config = ConfigDict(extra="allow")
+
+    members: List[GroupMemberPreference] = Field(
+        min_length=1,
+        max_length=50,
+        description="Every traveler in the group with their own preferences, budget and availability."
+    )
+    place: Optional[str] = Field(
+        default=None,
+        description="Only recommend tours in this place."
+    )
+    category: Optional[str] = Field(
+        default=None,
+        description="Only recommend tours in this category."
+    )
+    strategy: Literal["mean", "least_misery", "fairness"] = Field(
+        default="fairness",
+        description=(
+            "How member scores are combined: 'mean' (best on average), 'least_misery' (best for the least "
+            "happy member) or 'fairness' (best on average while the group agrees). Default is 'fairness'."
+        ),
+    )
+    page_size: int = Field(
+        default=5,
+        description="Number of tours to recommend. Default is 5."
+    )
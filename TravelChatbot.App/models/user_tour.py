@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from typing import List, Dict, Any
 
-@dataclass
+@dataclass(slots=True)
 class UserTour:
     tourId: str
     phoneNumber: str
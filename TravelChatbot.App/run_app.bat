@@ -6,4 +6,5 @@ echo 1. Created a .env file with your Azure OpenAI credentials
 echo 2. Installed dependencies with: pip install -r requirements.txt
 echo.
 pause
+start "Travel Chatbot API" python -m api.server
 streamlit run app.py
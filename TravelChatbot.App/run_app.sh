@@ -8,4 +8,8 @@ echo "2. Installed dependencies with: pip install -r requirements.txt"
 echo ""
 read -p "Press Enter to continue..."
 
+python -m api.server &
+API_PID=$!
+trap "kill $API_PID" EXIT
+
 streamlit run app.py
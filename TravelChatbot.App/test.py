@@ -1,5 +1,6 @@
 from datetime import datetime
 from agents.controller_agent import ControllerAgent
+from agents.prompts import system_message
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from config import validate_config
 from dotenv import load_dotenv
@@ -10,27 +11,6 @@ import streamlit as st
 load_dotenv()
 validate_config()
 
-system_message = SystemMessage(content="""You are a travel assistant that can help users with:
-1. Searching for tours and their details
-2. Searching heritage guide information about specific places or cultural sites
-3. Checking their registered tours
-4. Registering for tours
- 
-For heritage guide searches:
-- Use the get_heritage_guide function when searching for cultural or historical information
-- Always include both 'place' and 'search_query' parameters when possible
-- If the user only gives a place (e.g. 'Get me tour heritage in Hue'), infer a relevant search_query automatically, such as 'heritage sites', 'tourist information', or 'places to visit'
- 
-For tour searches:
-- Use the get_tours function to find available tours
-- Results will show tour details including dates and prices
-
-For the tours information:
-- Convert time to UTC + 7 for the times in the tour data (yyyy-mm-dd hh:mm format)
-
-Based on the user's request, use the appropriate function and parameters.""")
-
-
 def get_initial_state(human_input: str):
     return {
         "messages": [system_message, HumanMessage(content=human_input)]
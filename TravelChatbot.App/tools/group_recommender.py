@@ -0,0 +1,261 @@
+"""Tour recommendations for a group, scored over the whole catalog at once.
+
+Every tour's embedding is held in one unit-normalized matrix, aligned row for row with the
+catalog snapshot's TourTable. A request embeds all members' preference texts in one
+embeddings call. One matrix product then gives every member's cosine similarity to every
+tour, and an aggregation strategy turns those into one group score per tour:
+
+- mean:         average similarity; best for the group as a whole
+- least_misery: the least happy member's similarity; nobody is left out
+- fairness:     average minus the spread between members; rewards tours the group agrees on
+
+Budgets and availability windows are hard constraints. They are applied as vectorized masks
+over the table columns, so no tour a member cannot afford or attend is ever ranked.
+
+The matrix is rebuilt when the catalog snapshot changes. Rows of unchanged tours (same content
+hash) are copied from the previous matrix; other tours take their vector from the tours index,
+and only tours whose indexed vector is missing or stale are embedded here.
+
+The matrix lives in an EmbeddingStore (utilities/embedding_store.py). Scoring scans its
+quantized codes (EMBEDDING_STORE_ENCODING), then re-scores the best EMBEDDING_STORE_RESCORE x
+page_size tours with full precision, so returned scores are exact. A store is saved under
+EMBEDDING_STORE_DIR, named by a digest of the catalog it was built for. Worker processes on the
+same catalog open the same memory-mapped files instead of each keeping a copy.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import EMBEDDING_STORE_DIR, EMBEDDING_STORE_ENCODING, EMBEDDING_STORE_PQ_SUBSPACES, EMBEDDING_STORE_RESCORE
+from models.tour_table import TourTable
+from tools.tour_catalog import catalog
+from tools.tour_search import embed_texts, fetch_tour_vectors, tour_content_hash, tour_search_text
+from utilities.embedding_store import EmbeddingStore
+from utilities.telemetry import REGISTRY, current_span, span
+
+STRATEGIES = ("mean", "least_misery", "fairness")
+# fairness = mean - FAIRNESS_PENALTY * standard deviation across members
+FAIRNESS_PENALTY = 1.0
+
+TOUR_VECTORS = REGISTRY.counter(
+    "travelbot_recommender_tour_vectors_total", "Tour vectors loaded into the recommender matrix, by source.", ("source",)
+)
+
+
+def member_text(member: Dict[str, Any]) -> str:
+    """The text embedded for one member's preferences."""
+    parts = [member.get("preferences") or ""]
+    if member.get("interests"):
+        parts.append("Interests: " + ", ".join(member["interests"]))
+    return ". ".join(p for p in parts if p) or "any tour"
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _store(ids: Sequence[str], hashes: Sequence[str], vectors: np.ndarray) -> EmbeddingStore:
+    """The saved store for these tours (built and saved on first use), or an in-memory one."""
+    if not _store_dir or not len(ids):
+        return EmbeddingStore.build(ids, vectors, encoding="float32" if not len(ids) else EMBEDDING_STORE_ENCODING,
+                                    pq_subspaces=EMBEDDING_STORE_PQ_SUBSPACES)
+    digest = hashlib.sha256(json.dumps(
+        [EMBEDDING_STORE_ENCODING, EMBEDDING_STORE_PQ_SUBSPACES, vectors.shape[1], list(ids), list(hashes)]
+    ).encode("utf-8")).hexdigest()[:16]
+    path = os.path.join(_store_dir, f"tours-{digest}")
+    try:
+        return EmbeddingStore.open(path)
+    except FileNotFoundError:
+        pass
+    EmbeddingStore.build(ids, vectors, encoding=EMBEDDING_STORE_ENCODING, pq_subspaces=EMBEDDING_STORE_PQ_SUBSPACES).save(path)
+    return EmbeddingStore.open(path)
+
+
+@dataclass(frozen=True)
+class TourEmbeddings:
+    """Unit-length tour vectors; row i belongs to row i of `table`."""
+
+    table: TourTable
+    store: EmbeddingStore  # len(table) rows
+    hashes: Tuple[str, ...]
+
+    @classmethod
+    def build(cls, table: TourTable, previous: Optional["TourEmbeddings"] = None) -> "TourEmbeddings":
+        rows = [row.to_dict() for row in table]
+        hashes = tuple(tour_content_hash(t) for t in rows)
+
+        # Rows whose tour is unchanged since the previous matrix are copied from it
+        reused_dst: List[int] = []
+        reused_src: List[int] = []
+        if previous is not None:
+            previous_rows = {tourId: i for i, tourId in enumerate(previous.table.tourId)}
+            for i, tourId in enumerate(table.tourId):
+                j = previous_rows.get(tourId)
+                if j is not None and previous.hashes[j] == hashes[i]:
+                    reused_dst.append(i)
+                    reused_src.append(j)
+        reused = set(reused_dst)
+        missing = [i for i in range(len(rows)) if i not in reused]
+
+        # Then the tours index, where the stored content hash still matches the tour
+        loaded: Dict[int, Sequence[float]] = {}
+        indexed = fetch_tour_vectors([table.tourId[i] for i in missing]) if missing else {}
+        for i in missing:
+            content_hash, values = indexed.get(table.tourId[i], (None, None))
+            if values and content_hash == hashes[i]:
+                loaded[i] = values
+        from_index = len(loaded)
+
+        # Embed whatever is left
+        stale = [i for i in missing if i not in loaded]
+        if stale:
+            loaded.update(zip(stale, embed_texts([tour_search_text(rows[i]) for i in stale], purpose="recommender_tour")))
+
+        if loaded:
+            dimension = len(next(iter(loaded.values())))
+        else:
+            dimension = previous.store.dimension if previous is not None else 0
+        vectors = np.zeros((len(rows), dimension), dtype=np.float32)
+        if reused_dst:
+            vectors[reused_dst] = previous.store.vectors(reused_src)
+        if loaded:
+            fresh = list(loaded)
+            vectors[fresh] = _normalize(np.asarray([loaded[i] for i in fresh], dtype=np.float32))
+        store = _store(table.tourId, hashes, vectors)
+
+        TOUR_VECTORS.inc(len(reused_dst), source="reused")
+        TOUR_VECTORS.inc(from_index, source="index")
+        TOUR_VECTORS.inc(len(stale), source="embedded")
+        if current_span() is not None:
+            current_span().set_attribute("reused", len(reused_dst))
+            current_span().set_attribute("from_index", from_index)
+            current_span().set_attribute("embedded", len(stale))
+        return cls(table=table, store=store, hashes=hashes)
+
+
+_embeddings: Optional[TourEmbeddings] = None
+_embeddings_lock = threading.Lock()
+_store_dir = EMBEDDING_STORE_DIR
+
+
+def tour_embeddings(table: TourTable) -> TourEmbeddings:
+    """The embedding matrix for `table`, rebuilt (incrementally) when the catalog has changed."""
+    global _embeddings
+    current = _embeddings
+    if current is not None and current.table is table:
+        return current
+    with _embeddings_lock:
+        if _embeddings is None or _embeddings.table is not table:
+            previous = _embeddings
+            with span("recommender.build", kind="job", tours=len(table)):
+                _embeddings = TourEmbeddings.build(table, previous=previous)
+            # This process no longer reads the old store; processes that still map it keep their mapping
+            if previous is not None and previous.store.path and previous.store.path != _embeddings.store.path:
+                shutil.rmtree(previous.store.path, ignore_errors=True)
+        return _embeddings
+
+
+def aggregate(scores: np.ndarray, strategy: str) -> np.ndarray:
+    """Group score per tour from a (tours, members) similarity matrix."""
+    if strategy == "mean":
+        return scores.mean(axis=1)
+    if strategy == "least_misery":
+        return scores.min(axis=1)
+    if strategy == "fairness":
+        return scores.mean(axis=1) - FAIRNESS_PENALTY * scores.std(axis=1)
+    raise ValueError(f"strategy must be one of {', '.join(STRATEGIES)}")
+
+
+def _group_constraints(members: List[Dict[str, Any]]) -> Dict[str, Optional[int]]:
+    """The tightest budget and availability window every member can accept."""
+    def tightest(key: str, pick):
+        values = [m[key] for m in members if m.get(key) is not None]
+        return pick(values) if values else None
+
+    return {
+        "max_price": tightest("max_price", min),
+        "start_from": tightest("available_from", max),
+        "end_to": tightest("available_to", min),
+    }
+
+
+def recommend_for_group(
+    members: List[Dict[str, Any]],
+    strategy: str = "fairness",
+    place: Optional[str] = None,
+    category: Optional[str] = None,
+    page_size: int = 5,
+) -> Dict[str, Any]:
+    """
+    Rank the catalog for a group.
+
+    Args:
+        members: list of {"name", "preferences", "interests", "max_price", "available_from",
+                 "available_to"}; everything but preferences is optional, dates are epoch seconds
+        strategy: one of STRATEGIES
+        place / category: optional filters for the whole group
+        page_size: number of tours to return
+
+    Returns {"results": [tour dict + "score" + "member_scores"], "candidates": int, "constraints": dict}.
+    """
+    if not members:
+        raise ValueError("at least one group member is required")
+    if strategy not in STRATEGIES:
+        raise ValueError(f"strategy must be one of {', '.join(STRATEGIES)}")
+
+    snapshot = catalog().snapshot()
+    embeddings = tour_embeddings(snapshot.table)
+    table = embeddings.table
+
+    constraints = _group_constraints(members)
+    mask = table.mask(place=place, category=category, **constraints)
+    candidates = int(mask.sum())
+    if candidates == 0 or not len(table):
+        return {"results": [], "candidates": 0, "constraints": constraints}
+
+    queries = _normalize(np.asarray(embed_texts([member_text(m) for m in members], purpose="recommender_group"),
+                                    dtype=np.float32))
+    store = embeddings.store
+    with span("recommender.score", kind="backend", tours=candidates, members=len(members), encoding=store.encoding):
+        # Scoring reads every row it scores, so only score the candidates unless most rows are
+        # (gathering them would copy nearly the whole matrix first)
+        if candidates * 2 < len(table):
+            rows = np.flatnonzero(mask)
+            group_score = aggregate(store.approximate_scores(queries, rows), strategy)  # (candidates,)
+        else:
+            rows = np.arange(len(table))
+            group_score = aggregate(store.approximate_scores(queries), strategy)  # (tours,)
+            group_score[~mask] = -np.inf
+
+        # Re-score a shortlist from the full-precision vectors
+        k = min(page_size, candidates)
+        n = min(candidates, max(k, k * EMBEDDING_STORE_RESCORE))
+        shortlist = rows[np.argpartition(-group_score, n - 1)[:n]]
+        similarity = store.exact_scores(queries, shortlist)  # (n, members)
+        group_score = aggregate(similarity, strategy)
+        top = np.argsort(-group_score, kind="stable")[:k]
+
+    names = [m.get("name") or f"member {i + 1}" for i, m in enumerate(members)]
+    results = []
+    for tour_row, i in zip(table.rows(shortlist[top]), top):
+        tour = tour_row.to_dict()
+        tour["score"] = round(float(group_score[i]), 4)
+        tour["member_scores"] = {name: round(float(s), 4) for name, s in zip(names, similarity[i])}
+        results.append(tour)
+    return {"results": results, "candidates": candidates, "constraints": constraints}
+
+
+def reset(store_dir: Optional[str] = None) -> None:
+    """Drop the cached matrix and use `store_dir` (default EMBEDDING_STORE_DIR) for stores (tests and benchmarks)."""
+    global _embeddings, _store_dir
+    with _embeddings_lock:
+        _embeddings = None
+        _store_dir = EMBEDDING_STORE_DIR if store_dir is None else store_dir
@@ -0,0 +1,251 @@
+"""Per-phone cache of hydrated tour registrations, with cursor pagination over createAt.
+
+get_registered_tours pages through a phone number's registrations newest first. A page used to
+cost a GSI query on phoneNumber-createAt-index plus, per registration, a catalog lookup and a
+presigned heritage guide URL. The cache keeps the newest REGISTRATION_CACHE_MAX_ITEMS
+registrations of a phone, already hydrated (`tourDetails`). Pages inside that prefix are served
+from memory; pages past it are read from DynamoDB and not cached.
+
+An entry lives for REGISTRATION_CACHE_TTL_SECONDS. It is dropped sooner when a heritage guide
+URL in it would have less than PRESIGN_REUSE_SECONDS left, the same validity a fresh URL from
+utilities/s3_utils.py guarantees. register_tour and register_group_tour write through: new
+registrations are hydrated and added to the phone's entry, so a user sees a booking right
+after making it. Other worker processes pick it up when their entry expires.
+
+The pagination token is "<createAt>:<tourId>" of the last registration on the previous page.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from config import (
+    HERITAGE_GUIDE_S3_BUCKET,
+    REGISTRATION_CACHE_MAX_ITEMS,
+    REGISTRATION_CACHE_SIZE,
+    REGISTRATION_CACHE_TTL_SECONDS,
+)
+from models.user_tour import UserTour
+from tools.tour_catalog import get_tour
+from utilities.aws_clients import get_client
+from utilities.s3_utils import PRESIGN_REUSE_SECONDS, presign_with_expiry
+from utilities.telemetry import REGISTRY, current_span, span
+
+logger = logging.getLogger(__name__)
+
+USER_TOURS_TABLE = "UserTours"
+PHONE_INDEX = "phoneNumber-createAt-index"
+
+REGISTRATION_CACHE_LOOKUPS = REGISTRY.counter(
+    "travelbot_registration_cache_total",
+    "Registered tours page lookups (hit, miss, expired; past: page beyond the cached prefix).",
+    ("result",),
+)
+
+# (createAt, tourId): position of a registration in newest-first order
+Position = Tuple[int, str]
+
+
+@dataclass
+class _Entry:
+    items: List[Dict[str, Any]]  # hydrated registrations, newest first
+    complete: bool  # False when the phone has older registrations than these
+    expires_at: float  # time.monotonic()
+
+
+def _position(item: Dict[str, Any]) -> Position:
+    return int(item["createAt"]), item["tourId"]
+
+
+def encode_token(item: Dict[str, Any]) -> str:
+    created_at, tour_id = _position(item)
+    return f"{created_at}:{tour_id}"
+
+
+def decode_token(token: str) -> Position:
+    created_at, sep, tour_id = token.partition(":")
+    if not sep or not created_at.isdigit() or not tour_id:
+        raise ValueError("invalid pagination token")
+    return int(created_at), tour_id
+
+
+def hydrate(user_tour: UserTour, s3_client) -> Tuple[Dict[str, Any], Optional[float]]:
+    """The registration with its `tourDetails`; and when its heritage guide URL expires (None: no URL).
+
+    A failed catalog lookup or presign gives `tourDetails` {"error": ...} for this registration only.
+    """
+    registration = user_tour.to_dict()
+    url_expires_at = None
+    # Full tour details come from the catalog snapshot
+    try:
+        tour = get_tour(user_tour.tourId)
+        if tour is not None:
+            tour_dict = tour.to_dict()
+            if tour_dict.get("heritageGuide"):
+                presigned = presign_with_expiry(HERITAGE_GUIDE_S3_BUCKET, tour_dict["heritageGuide"], s3_client)
+                if presigned:
+                    tour_dict["heritageGuide"], url_expires_at = presigned
+            registration["tourDetails"] = tour_dict
+    except ClientError as e:
+        registration["tourDetails"] = {"error": e.response["Error"]["Message"]}
+    return registration, url_expires_at
+
+
+def _failed(registration: Dict[str, Any]) -> bool:
+    return "error" in registration.get("tourDetails", {})
+
+
+def query_registrations(phoneNumber: str, limit: int, after: Optional[Position] = None) -> List[UserTour]:
+    """Up to `limit` registrations older than `after`, newest first."""
+    params: Dict[str, Any] = {
+        "TableName": USER_TOURS_TABLE,
+        "IndexName": PHONE_INDEX,
+        "KeyConditionExpression": "phoneNumber = :p",
+        "ExpressionAttributeValues": {":p": {"S": phoneNumber}},
+        "ScanIndexForward": False,
+    }
+    if after is not None:
+        params["ExclusiveStartKey"] = {
+            "tourId": {"S": after[1]},
+            "phoneNumber": {"S": phoneNumber},
+            "createAt": {"N": str(after[0])},
+        }
+    items: List[UserTour] = []
+    while len(items) < limit:
+        params["Limit"] = limit - len(items)
+        with span("dynamodb.query", kind="backend", table=USER_TOURS_TABLE, index=PHONE_INDEX):
+            response = get_client("dynamodb").query(**params)
+        items.extend(UserTour.from_dynamodb(i) for i in response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            break
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    return items
+
+
+class RegistrationCache:
+    def __init__(self, ttl: float = REGISTRATION_CACHE_TTL_SECONDS, size: int = REGISTRATION_CACHE_SIZE,
+                 max_items: int = REGISTRATION_CACHE_MAX_ITEMS):
+        self.ttl = ttl
+        self.size = size
+        self.max_items = max_items
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Time of the latest write per phone; a load that started before it is not stored
+        self._written: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def page(self, phoneNumber: str, pagination_token: Optional[str] = None, page_size: int = 20) -> Dict[str, Any]:
+        """{"results": hydrated registrations, newest first, "next_token": token of the next page or None}."""
+        after = decode_token(pagination_token) if pagination_token else None
+        page_size = max(1, page_size)
+        entry, result = self._entry(phoneNumber)
+        if entry is None:
+            entry = self._load(phoneNumber)
+
+        # The cached registrations older than the cursor
+        start = 0 if after is None else next(
+            (i for i, item in enumerate(entry.items) if _position(item) < after), len(entry.items))
+        results = entry.items[start:start + page_size]
+        more = start + page_size < len(entry.items) or not entry.complete
+        if len(results) < page_size and not entry.complete:
+            # Past the cached prefix: read the rest from DynamoDB, one extra to see if more follow
+            result = "past"
+            wanted = page_size - len(results)
+            older = query_registrations(phoneNumber, wanted + 1, _position(results[-1]) if results else after)
+            more = len(older) > wanted
+            s3_client = get_client("s3")
+            results = results + [hydrate(u, s3_client)[0] for u in older[:wanted]]
+
+        REGISTRATION_CACHE_LOOKUPS.inc(result=result)
+        s = current_span()
+        if s is not None:
+            s.set_attribute("registration_cache", result)
+        return {"results": results, "next_token": encode_token(results[-1]) if more and results else None}
+
+    def _entry(self, phoneNumber: str) -> Tuple[Optional[_Entry], str]:
+        with self._lock:
+            entry = self._entries.get(phoneNumber)
+            if entry is None:
+                return None, "miss"
+            if entry.expires_at <= time.monotonic():
+                del self._entries[phoneNumber]
+                return None, "expired"
+            self._entries.move_to_end(phoneNumber)
+            return entry, "hit"
+
+    def _load(self, phoneNumber: str) -> _Entry:
+        started = time.monotonic()
+        # One more than is kept, to learn whether the history is complete
+        user_tours = query_registrations(phoneNumber, self.max_items + 1)
+        s3_client = get_client("s3")
+        hydrated = [hydrate(user_tour, s3_client) for user_tour in user_tours[:self.max_items]]
+        entry = _Entry(
+            items=sorted((registration for registration, _ in hydrated), key=_position, reverse=True),
+            complete=len(user_tours) <= self.max_items,
+            expires_at=min([started + self.ttl] + [t - PRESIGN_REUSE_SECONDS for _, t in hydrated if t is not None]),
+        )
+        with self._lock:
+            # Registrations that could not be hydrated are retried on the next page, not cached
+            if self._written.get(phoneNumber, float("-inf")) < started and not any(
+                    _failed(registration) for registration in entry.items):
+                self._entries[phoneNumber] = entry
+                self._entries.move_to_end(phoneNumber)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def add(self, registrations: Iterable[Dict[str, Any]]) -> None:
+        """Write-through: new registrations (UserTour dicts) join their phone's cached entry.
+
+        Called after the registrations are committed, so it never raises: a registration that cannot
+        be hydrated drops its phone's entry instead, and the next page reads it from DynamoDB.
+        """
+        s3_client = get_client("s3")
+        for registration in registrations:
+            user_tour = UserTour(**{k: registration[k] for k in ("tourId", "phoneNumber", "createAt", "startDate")})
+            phone = user_tour.phoneNumber
+            try:
+                hydrated, url_expires_at = hydrate(user_tour, s3_client)
+            except Exception as e:
+                logger.warning("Could not hydrate registration of tour %s for the cache: %s", user_tour.tourId, e)
+                hydrated, url_expires_at = None, None
+            with self._lock:
+                now = self._written[phone] = time.monotonic()
+                if len(self._written) > self.size:
+                    # Loads finish long before a TTL has passed
+                    self._written = {p: t for p, t in self._written.items() if t > now - self.ttl}
+                entry = self._entries.get(phone)
+                if entry is None:
+                    continue
+                if hydrated is None or _failed(hydrated):
+                    del self._entries[phone]
+                    continue
+                # A new list, so pages being served from the old one do not change underneath
+                items = sorted([i for i in entry.items if _position(i) != _position(hydrated)] + [hydrated],
+                               key=_position, reverse=True)
+                expires_at = entry.expires_at
+                if url_expires_at is not None:
+                    expires_at = min(expires_at, url_expires_at - PRESIGN_REUSE_SECONDS)
+                self._entries[phone] = _Entry(items=items[:self.max_items],
+                                              complete=entry.complete and len(items) <= self.max_items,
+                                              expires_at=expires_at)
+
+_cache: Optional[RegistrationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_registration_cache() -> RegistrationCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RegistrationCache()
+        return _cache
+
+
+def reset() -> None:
+    """Drop the cache (a new one is created on next use)."""
+    global _cache
+    with _cache_lock:
+        _cache = None
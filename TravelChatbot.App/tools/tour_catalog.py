@@ -0,0 +1,344 @@
+"""Process-local snapshot of the Tours table.
+
+The catalog is small and rarely changes, so it is loaded once and kept in memory, indexed by
+tourId and by place. A background thread applies changes from a change feed:
+
+- StreamChangeFeed reads the table's DynamoDB Stream (used when the stream is enabled).
+- ScanChangeFeed re-scans the table and diffs it against what it saw last time. This is the
+  polling fallback for tables without a stream.
+
+Every refresh builds a new CatalogSnapshot and swaps it in with one assignment, so readers
+never see a half-applied update. A snapshot older than TOUR_CATALOG_MAX_STALENESS_SECONDS is
+never served. If the background refresh falls behind, the next reader refreshes inline.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from config import TOUR_CATALOG_CHANGE_FEED, TOUR_CATALOG_MAX_STALENESS_SECONDS, TOUR_CATALOG_REFRESH_SECONDS
+from models.tour import Tour
+from models.tour_table import TourRows, TourTable
+from utilities.aws_clients import get_client
+from utilities.telemetry import REGISTRY, span
+
+logger = logging.getLogger(__name__)
+
+TOURS_TABLE = "Tours"
+
+CATALOG_REFRESHES = REGISTRY.counter(
+    "travelbot_tour_catalog_refreshes_total", "Tour catalog snapshot refreshes.", ("feed", "kind", "result")
+)
+
+# A change is (tourId, tour) where tour is None when the tour was removed
+Change = Tuple[str, Optional[Tour]]
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """An immutable view of the catalog; a refresh replaces it rather than mutating it."""
+
+    by_id: Dict[str, Tour]
+    by_place: Dict[str, Tuple[Tour, ...]]
+    table: TourTable  # columnar copy for vectorized filters and sorts
+    synced_at: float  # time.monotonic() of the last successful sync with the change feed
+
+    @classmethod
+    def build(cls, tours: Iterable[Tour], synced_at: float) -> "CatalogSnapshot":
+        by_id = {t.tourId: t for t in tours}
+        # Same order as a DynamoDB query on the place partition (sorted by the tourId range key)
+        ordered = sorted(by_id.values(), key=lambda t: (t.place, t.tourId))
+        by_place: Dict[str, List[Tour]] = {}
+        for tour in ordered:
+            by_place.setdefault(tour.place, []).append(tour)
+        return cls(
+            by_id=by_id,
+            by_place={p: tuple(ts) for p, ts in by_place.items()},
+            table=TourTable.from_tours(ordered),
+            synced_at=synced_at,
+        )
+
+    def apply(self, changes: List[Change], synced_at: float) -> "CatalogSnapshot":
+        if not changes:
+            return replace(self, synced_at=synced_at)
+        by_id = dict(self.by_id)
+        for tourId, tour in changes:
+            if tour is None:
+                by_id.pop(tourId, None)
+            else:
+                by_id[tourId] = tour
+        return CatalogSnapshot.build(by_id.values(), synced_at)
+
+    def tours(self, place: Optional[str] = None) -> Tuple[Tour, ...]:
+        if place is not None:
+            return self.by_place.get(place, ())
+        return tuple(t for p in sorted(self.by_place) for t in self.by_place[p])
+
+    def find(self, sort_by: Optional[str] = None, descending: bool = False, **filters) -> TourRows:
+        return self.table.rows(self.table.select(sort_by=sort_by, descending=descending, **filters))
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.synced_at
+
+
+def scan_tours() -> List[Tour]:
+    tours = []
+    with span("dynamodb.scan", kind="backend", table=TOURS_TABLE) as s:
+        for page in get_client("dynamodb").get_paginator("scan").paginate(TableName=TOURS_TABLE):
+            tours.extend(Tour.from_dynamodb(item) for item in page.get("Items", []))
+        s.set_attribute("items", len(tours))
+    return tours
+
+
+class ScanChangeFeed:
+    """Polling fallback: a full scan, diffed against the previous scan."""
+
+    name = "scan"
+
+    def __init__(self):
+        self._seen: Dict[str, Tour] = {}
+
+    def load(self) -> List[Tour]:
+        tours = scan_tours()
+        self._seen = {t.tourId: t for t in tours}
+        return tours
+
+    def poll(self) -> List[Change]:
+        current = {t.tourId: t for t in scan_tours()}
+        changes: List[Change] = [(i, t) for i, t in current.items() if self._seen.get(i) != t]
+        changes.extend((i, None) for i in self._seen if i not in current)
+        self._seen = current
+        return changes
+
+
+class StreamChangeFeed:
+    """Incremental changes from the Tours table's DynamoDB Stream."""
+
+    name = "streams"
+
+    def __init__(self, stream_arn: str):
+        self.stream_arn = stream_arn
+        self._iterators: Dict[str, Optional[str]] = {}
+
+    def _shards(self) -> List[str]:
+        streams = get_client("dynamodbstreams")
+        shards, start = [], None
+        while True:
+            params = {"StreamArn": self.stream_arn}
+            if start:
+                params["ExclusiveStartShardId"] = start
+            desc = streams.describe_stream(**params)["StreamDescription"]
+            shards.extend(s["ShardId"] for s in desc.get("Shards", []))
+            start = desc.get("LastEvaluatedShardId")
+            if not start:
+                return shards
+
+    def _iterator(self, shard_id: str, iterator_type: str) -> str:
+        return get_client("dynamodbstreams").get_shard_iterator(
+            StreamArn=self.stream_arn, ShardId=shard_id, ShardIteratorType=iterator_type
+        )["ShardIterator"]
+
+    def load(self) -> List[Tour]:
+        # Position at the stream head before scanning: changes racing the scan are replayed
+        # by the next poll, and replaying a put or remove is harmless
+        self._iterators = {shard: self._iterator(shard, "LATEST") for shard in self._shards()}
+        return scan_tours()
+
+    def poll(self) -> List[Change]:
+        streams = get_client("dynamodbstreams")
+        # Shards roll over every few hours; read new ones from their start
+        for shard in self._shards():
+            if shard not in self._iterators:
+                self._iterators[shard] = self._iterator(shard, "TRIM_HORIZON")
+
+        changes: List[Change] = []
+        with span("dynamodbstreams.get_records", kind="backend", table=TOURS_TABLE) as s:
+            for shard, iterator in list(self._iterators.items()):
+                while iterator:
+                    resp = streams.get_records(ShardIterator=iterator)
+                    records = resp.get("Records", [])
+                    changes.extend(self._change(r) for r in records)
+                    iterator = resp.get("NextShardIterator")
+                    if not records:
+                        break
+                # None marks a closed shard that has been read to the end
+                self._iterators[shard] = iterator
+            s.set_attribute("records", len(changes))
+        return changes
+
+    @staticmethod
+    def _change(record) -> Change:
+        data = record["dynamodb"]
+        tourId = data["Keys"]["tourId"]["S"]
+        if record["eventName"] == "REMOVE":
+            return tourId, None
+        image = data.get("NewImage")
+        if image is None:
+            # KEYS_ONLY stream: read the current item
+            with span("dynamodb.get_item", kind="backend", table=TOURS_TABLE):
+                image = get_client("dynamodb").get_item(TableName=TOURS_TABLE, Key=data["Keys"]).get("Item")
+            if image is None:
+                return tourId, None
+        return tourId, Tour.from_dynamodb(image)
+
+
+def _create_feed(mode: str):
+    if mode == "scan":
+        return ScanChangeFeed()
+    table = get_client("dynamodb").describe_table(TableName=TOURS_TABLE)["Table"]
+    stream_enabled = table.get("StreamSpecification", {}).get("StreamEnabled")
+    if stream_enabled and table.get("LatestStreamArn"):
+        return StreamChangeFeed(table["LatestStreamArn"])
+    if mode == "streams":
+        raise ValueError(f"TOUR_CATALOG_CHANGE_FEED=streams but table {TOURS_TABLE} has no stream enabled")
+    return ScanChangeFeed()
+
+
+class TourCatalog:
+    """The current CatalogSnapshot plus the thread that keeps it fresh."""
+
+    def __init__(
+        self,
+        feed_mode: str = TOUR_CATALOG_CHANGE_FEED,
+        refresh_seconds: float = TOUR_CATALOG_REFRESH_SECONDS,
+        max_staleness: float = TOUR_CATALOG_MAX_STALENESS_SECONDS,
+    ):
+        self.feed_mode = feed_mode
+        self.refresh_seconds = refresh_seconds
+        self.max_staleness = max_staleness
+        self._feed = None
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Return a snapshot no older than the staleness bound, loading or refreshing if needed."""
+        snap = self._snapshot
+        if snap is None or snap.age > self.max_staleness:
+            snap = self.refresh(max_age=self.max_staleness)
+        self._ensure_refresher()
+        return snap
+
+    def refresh(self, full: bool = False, max_age: Optional[float] = None) -> CatalogSnapshot:
+        """Apply pending changes (or reload everything) and swap in the new snapshot.
+
+        With `max_age`, a snapshot refreshed by another thread in the meantime is reused.
+        """
+        with self._lock:
+            snap = self._snapshot
+            if max_age is not None and snap is not None and snap.age <= max_age:
+                return snap
+            kind = "full" if full or snap is None else "incremental"
+            try:
+                if kind == "full":
+                    self._feed = _create_feed(self.feed_mode)
+                    synced_at = time.monotonic()
+                    snap = CatalogSnapshot.build(self._feed.load(), synced_at)
+                else:
+                    synced_at = time.monotonic()
+                    snap = snap.apply(self._feed.poll(), synced_at)
+            except Exception:
+                CATALOG_REFRESHES.inc(feed=getattr(self._feed, "name", self.feed_mode), kind=kind, result="error")
+                raise
+            CATALOG_REFRESHES.inc(feed=self._feed.name, kind=kind, result="ok")
+            self._snapshot = snap
+            return snap
+
+    def get(self, tourId: str) -> Optional[Tour]:
+        tour = self.snapshot().by_id.get(tourId)
+        if tour is None:
+            # Possibly created after the last sync: read through and fold it into the snapshot
+            tour = self._read_through(tourId)
+        return tour
+
+    def _read_through(self, tourId: str) -> Optional[Tour]:
+        with span("dynamodb.query", kind="backend", table=TOURS_TABLE, index="tourId-index"):
+            resp = get_client("dynamodb").query(
+                TableName=TOURS_TABLE,
+                IndexName="tourId-index",
+                KeyConditionExpression="tourId = :t",
+                ExpressionAttributeValues={":t": {"S": tourId}},
+                Limit=1
+            )
+        items = resp.get("Items", [])
+        if not items:
+            return None
+        tour = Tour.from_dynamodb(items[0])
+        with self._lock:
+            if self._snapshot is not None:
+                self._snapshot = self._snapshot.apply([(tourId, tour)], self._snapshot.synced_at)
+        return tour
+
+    def _ensure_refresher(self) -> None:
+        if self._thread is not None or self.refresh_seconds <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tour-catalog-refresh", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("ExpiredIteratorException", "TrimmedDataAccessException"):
+                    # Fell too far behind the stream: start over from a full load
+                    self._try_full_refresh()
+                else:
+                    logger.warning("Tour catalog refresh failed: %s", e)
+            except Exception as e:
+                logger.warning("Tour catalog refresh failed: %s", e)
+
+    def _try_full_refresh(self) -> None:
+        try:
+            self.refresh(full=True)
+        except Exception as e:
+            logger.warning("Tour catalog reload failed: %s", e)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+_catalog: Optional[TourCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def catalog() -> TourCatalog:
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = TourCatalog()
+    return _catalog
+
+
+def get_tour(tourId: str) -> Optional[Tour]:
+    """Return the tour with this tourId from the catalog snapshot (None if it does not exist)."""
+    return catalog().get(tourId)
+
+
+def list_tours(place: Optional[str] = None) -> Tuple[Tour, ...]:
+    """All tours, or the tours of one place, ordered like a DynamoDB query on the place key."""
+    return catalog().snapshot().tours(place)
+
+
+def find_tours(sort_by: Optional[str] = None, descending: bool = False, **filters) -> TourRows:
+    """Vectorized catalog filter; see TourTable.mask for the filters and TourTable.SORT_KEYS for sort_by."""
+    return catalog().snapshot().find(sort_by=sort_by, descending=descending, **filters)
+
+
+def reset() -> None:
+    """Stop the refresher and drop the snapshot; the next read loads the catalog again."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is not None:
+            _catalog.stop()
+        _catalog = None
@@ -1,23 +1,42 @@
-from pinecone import Pinecone, ServerlessSpec
-from typing import List, Dict, Any, Optional
+import contextvars
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from pinecone import Pinecone, PineconeConnectionError, RetryConfig, ServerlessSpec
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from config import (
+    EMBEDDING_DIMENSION,
     OPENAI_ENDPOINT,
     OPENAI_TEXT_EMBEDED_API_KEY,
     OPENAI_TEXT_EMBEDED_DEPLOYMENT_NAME,
     PINECONE_API_KEY,
     PINECONE_ENVIRONMENT,
+    RESILIENCE_HEDGE,
+    SEARCH_BATCH_MAX_CONCURRENCY,
 )
+import hashlib
+import json
 import re
-from openai import OpenAI
+from openai import APIConnectionError, OpenAI
+from tools.tour_catalog import get_tour
+from utilities.chunk_store import get_chunk_store
+from utilities.resilience import ResilientCaller, get_caller
+from utilities.single_flight import get_group
+from utilities.telemetry import REGISTRY, span
 
-# Initialize OpenAI client for embeddings (Azure OpenAI wrapper)
+logger = logging.getLogger(__name__)
+
+# Initialize OpenAI client for embeddings (Azure OpenAI wrapper). Reads retry through
+# utilities/resilience.py, so the SDKs' own retries are off.
 openai_client = OpenAI(
     api_key=OPENAI_TEXT_EMBEDED_API_KEY,
     base_url=OPENAI_ENDPOINT,
+    max_retries=0,
 )
 
 # Initialize Pinecone client
-pc = Pinecone(api_key=PINECONE_API_KEY)
+pc = Pinecone(api_key=PINECONE_API_KEY, retry_config=RetryConfig(max_retries=0))
 
 # Get or create index for tours
 TOURS_INDEX = "tours"
@@ -27,7 +46,7 @@ indexes = [idx.name for idx in pc.list_indexes()]
 if TOURS_INDEX not in indexes:
     pc.create_index(
         name=TOURS_INDEX,
-        dimension=1536,  # OpenAI embedding dimension
+        dimension=EMBEDDING_DIMENSION,
         metric="cosine",
         spec=ServerlessSpec(
             cloud="aws",
@@ -38,7 +57,7 @@ if TOURS_INDEX not in indexes:
 if TOUR_HERITAGE_INDEX not in indexes:
     pc.create_index(
         name=TOUR_HERITAGE_INDEX,
-        dimension=1536,  # OpenAI embedding dimension
+        dimension=EMBEDDING_DIMENSION,
         metric="cosine",
         spec=ServerlessSpec(
             cloud="aws",
@@ -50,51 +69,188 @@ if TOUR_HERITAGE_INDEX not in indexes:
 tour_index = pc.Index(TOURS_INDEX)
 tour_heritage_index = pc.Index(TOUR_HERITAGE_INDEX)
 
-def embed_tours(tours: List[Dict[str, Any]]) -> None:
-    """
-    Embed tour information into Pinecone. Skip tours that already have vectors in the index.
+# Concurrent vector queries for batch searches
+_search_pool = ThreadPoolExecutor(max_workers=SEARCH_BATCH_MAX_CONCURRENCY, thread_name_prefix="search")
 
-    Args:
-        tours: list of tour dicts (each must include "tourId")
-    """
-    # Collect tour ids
-    tour_ids = [t["tourId"] for t in tours if t.get("tourId")]
-    if not tour_ids:
-        return
 
-    # Fetch existing vectors to avoid re-embedding
-    existing = tour_index.fetch(ids=tour_ids)
-    existing_ids = set(existing.vectors.keys())
+# Bulk embedding requests are retried but not hedged: a duplicate would double their token cost
+BULK_EMBEDDING_PURPOSES = ("tour", "recommender_tour", "heritage_chunk")
+_TRANSIENT_ERRORS = (APIConnectionError, PineconeConnectionError)
 
-    # Filter tours that need embedding
-    new_tours = [t for t in tours if t.get("tourId") and t["tourId"] not in existing_ids]
-    if not new_tours:
-        return
 
-    vectors_to_upsert: List[Dict[str, Any]] = []
-    for tour in new_tours:
-        # Ensure a type for filtering
-        tour["type"] = "tour_info"
-        search_text = f"Tour in {tour.get('place','')}: {tour.get('title','')}. Price: {tour.get('price','')} VND"
-
-        # Get embedding from Azure OpenAI
-        resp = openai_client.embeddings.create(
-            input=search_text,
-            model=OPENAI_TEXT_EMBEDED_DEPLOYMENT_NAME,
+def _resilient(op: str, hedge: bool = True) -> ResilientCaller:
+    """The resilient caller for one backend read (latency is tracked per op)."""
+    return get_caller(op, hedge=RESILIENCE_HEDGE and hedge, transient=_TRANSIENT_ERRORS)
+
+
+def _create_embeddings(inputs, purpose: str):
+    """Call the embeddings deployment inside a traced span (records token usage)."""
+    with span("openai.embeddings", kind="backend", purpose=purpose,
+              inputs=len(inputs) if isinstance(inputs, list) else 1) as s:
+        resp = _resilient(f"openai.embeddings.{purpose}", hedge=purpose not in BULK_EMBEDDING_PURPOSES).call(
+            lambda **options: openai_client.embeddings.create(
+                input=inputs,
+                model=OPENAI_TEXT_EMBEDED_DEPLOYMENT_NAME,
+                **options,
+            )
         )
-        embedding = resp.data[0].embedding
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            s.set_tokens(prompt_tokens=getattr(usage, "prompt_tokens", 0))
+        return resp
+
+# Recently embedded search queries (text -> embedding); prefetching warms it
+QUERY_EMBEDDING_CACHE_SIZE = 2048
+_query_embeddings: "OrderedDict[str, List[float]]" = OrderedDict()
+_query_embeddings_lock = threading.Lock()
+QUERY_EMBEDDING_LOOKUPS = REGISTRY.counter(
+    "travelbot_query_embedding_cache_total", "Search query embedding cache lookups.", ("result",)
+)
 
-        vectors_to_upsert.append({
-            "id": tour["tourId"],
-            "values": embedding,
-            "metadata": tour,
-        })
+# Tours index vectors keep only what search filters on, plus the content hash the sync diffs
+# against; full tour records are served from the catalog snapshot.
+TOUR_VECTOR_METADATA_FIELDS = ("place", "price", "startDate", "category")
+TOUR_EMBED_BATCH_SIZE = 100
+PINECONE_UPSERT_BATCH_SIZE = 100
+PINECONE_FETCH_BATCH_SIZE = 100
+PINECONE_DELETE_BATCH_SIZE = 1000
 
-    # Upsert in batches
-    batch_size = 100
-    for i in range(0, len(vectors_to_upsert), batch_size):
-        batch = vectors_to_upsert[i : i + batch_size]
-        tour_index.upsert(vectors=batch)
+
+def tour_search_text(tour: Dict[str, Any]) -> str:
+    """The text embedded for a tour."""
+    return f"Tour in {tour.get('place', '')}: {tour.get('title', '')}. Price: {tour.get('price', '')} VND"
+
+
+def tour_content_hash(tour: Dict[str, Any]) -> str:
+    """Hash of everything stored for a tour's vector; a changed hash means re-embed."""
+    payload = json.dumps(
+        [tour_search_text(tour)] + [tour.get(f) for f in TOUR_VECTOR_METADATA_FIELDS],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def tour_vector_metadata(tour: Dict[str, Any]) -> Dict[str, Any]:
+    metadata = {f: tour[f] for f in TOUR_VECTOR_METADATA_FIELDS if tour.get(f) not in (None, "")}
+    metadata["type"] = "tour_info"
+    metadata["content_hash"] = tour_content_hash(tour)
+    return metadata
+
+
+def embed_texts(texts: List[str], purpose: str, batch_size: int = TOUR_EMBED_BATCH_SIZE) -> List[List[float]]:
+    """Embeddings of `texts`, in order, in as few requests as the batch size allows."""
+    embeddings: List[List[float]] = []
+    for i in range(0, len(texts), batch_size):
+        resp = _create_embeddings(texts[i : i + batch_size], purpose=purpose)
+        # Results come back tagged with their input index
+        embeddings.extend(d.embedding for d in sorted(resp.data, key=lambda d: d.index))
+    return embeddings
+
+
+def embed_queries(texts: List[str], purpose: str) -> List[List[float]]:
+    """Embeddings of search query texts, in order; repeated queries are served from a small LRU cache.
+
+    Only the texts not in the cache are embedded, in one request.
+    """
+    found: Dict[str, List[float]] = {}
+    with _query_embeddings_lock:
+        for text in texts:
+            if text in _query_embeddings:
+                _query_embeddings.move_to_end(text)
+                found[text] = _query_embeddings[text]
+    QUERY_EMBEDDING_LOOKUPS.inc(len(found), result="hit")
+    missing = [t for t in dict.fromkeys(texts) if t not in found]
+    if missing:
+        QUERY_EMBEDDING_LOOKUPS.inc(len(missing), result="miss")
+        fresh = dict(zip(missing, embed_texts(missing, purpose=purpose)))
+        found.update(fresh)
+        with _query_embeddings_lock:
+            _query_embeddings.update(fresh)
+            while len(_query_embeddings) > QUERY_EMBEDDING_CACHE_SIZE:
+                _query_embeddings.popitem(last=False)
+    return [found[t] for t in texts]
+
+
+def fetch_tour_vectors(tour_ids: List[str]) -> Dict[str, Tuple[Optional[str], List[float]]]:
+    """(content_hash, values) of every listed tour that has a vector (hash None for vectors written without one)."""
+    found: Dict[str, Tuple[Optional[str], List[float]]] = {}
+    for i in range(0, len(tour_ids), PINECONE_FETCH_BATCH_SIZE):
+        batch = tour_ids[i : i + PINECONE_FETCH_BATCH_SIZE]
+        with span("pinecone.fetch", kind="backend", index=TOURS_INDEX, ids=len(batch)):
+            existing = _resilient(f"pinecone.fetch.{TOURS_INDEX}").call(
+                lambda **options: tour_index.fetch(ids=batch, **options)
+            )
+        for tour_id, vector in existing.vectors.items():
+            if isinstance(vector, dict):
+                metadata, values = vector.get("metadata"), vector.get("values")
+            else:
+                metadata, values = getattr(vector, "metadata", None), getattr(vector, "values", None)
+            found[tour_id] = ((metadata or {}).get("content_hash"), values)
+    return found
+
+
+def fetch_tour_hashes(tour_ids: List[str]) -> Dict[str, Optional[str]]:
+    """content_hash of every listed tour that has a vector (None for vectors written without one)."""
+    return {tour_id: content_hash for tour_id, (content_hash, _) in fetch_tour_vectors(tour_ids).items()}
+
+
+def embed_tours(tours: List[Dict[str, Any]], existing_hashes: Optional[Dict[str, Optional[str]]] = None) -> int:
+    """
+    Embed tours into Pinecone, skipping tours whose vector already has the same content hash.
+
+    Args:
+        tours: list of tour dicts (each must include "tourId"); they are not modified
+        existing_hashes: tourId -> content_hash already in the index; fetched when omitted
+
+    Returns the number of tours embedded.
+    """
+    tours = [t for t in tours if t.get("tourId")]
+    if not tours:
+        return 0
+    if existing_hashes is None:
+        existing_hashes = fetch_tour_hashes([t["tourId"] for t in tours])
+
+    changed = [t for t in tours if existing_hashes.get(t["tourId"]) != tour_content_hash(t)]
+    for i in range(0, len(changed), TOUR_EMBED_BATCH_SIZE):
+        batch = changed[i : i + TOUR_EMBED_BATCH_SIZE]
+        # One embeddings request per batch; results come back tagged with their input index
+        resp = _create_embeddings([tour_search_text(t) for t in batch], purpose="tour")
+        embeddings = [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+        vectors = [
+            {"id": t["tourId"], "values": e, "metadata": tour_vector_metadata(t)}
+            for t, e in zip(batch, embeddings)
+        ]
+        for j in range(0, len(vectors), PINECONE_UPSERT_BATCH_SIZE):
+            chunk = vectors[j : j + PINECONE_UPSERT_BATCH_SIZE]
+            with span("pinecone.upsert", kind="backend", index=TOURS_INDEX, vectors=len(chunk)):
+                tour_index.upsert(vectors=chunk)
+    return len(changed)
+
+
+def delete_tour_vectors(tour_ids: List[str]) -> None:
+    for i in range(0, len(tour_ids), PINECONE_DELETE_BATCH_SIZE):
+        batch = tour_ids[i : i + PINECONE_DELETE_BATCH_SIZE]
+        with span("pinecone.delete", kind="backend", index=TOURS_INDEX, ids=len(batch)):
+            tour_index.delete(ids=batch)
+
+
+def list_tour_vector_ids() -> List[str]:
+    """All vector ids in the tours index (serverless `Index.list` pagination)."""
+    ids: List[str] = []
+    with span("pinecone.list", kind="backend", index=TOURS_INDEX) as s:
+        for page in tour_index.list():
+            # ListResponse pages of ListItem
+            ids.extend(item.id for item in page.vectors)
+        s.set_attribute("ids", len(ids))
+    return ids
+
+
+def _tour_result(tour_id: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Full tour record for a tours-index match: from the catalog, else the stored metadata."""
+    tour = get_tour(tour_id)
+    if tour is None:
+        return {**metadata, "tourId": tour_id}
+    return {**tour.to_dict(), "type": metadata.get("type", "tour_info")}
 
 
 def search_tours(
@@ -117,16 +273,41 @@ def search_tours(
     Returns a dict with keys:
       - results: list of metadata dicts
       - next_token: pagination token or None
+
+    Identical concurrent searches (same normalized query and arguments) run once.
     """
+    key = _search_key(query, "tours", type, place, pagination_token, page_size)
+    return get_group("search").do(key, lambda: _search_tours(query, type, place, pagination_token, page_size))
+
+
+def _search_key(query: str, *args: Any) -> str:
+    """Coalescing key of a search: the query casefolded with whitespace collapsed, plus its other arguments."""
+    return json.dumps([" ".join(query.casefold().split()), *args])
+
+
+def _search_tours(query: str, type: Optional[str], place: Optional[str], pagination_token: Optional[str],
+                  page_size: int) -> Dict[str, Any]:
     # If query explicitly asks for a tourId, return that vector's metadata
     tour_id_match = re.search(r"(?:tour ?id|id)[:\s]+([a-zA-Z0-9-]+)", query, re.IGNORECASE)
     if tour_id_match:
         tour_id = tour_id_match.group(1)
-        fetched = tour_index.fetch(ids=[tour_id])
+        with span("pinecone.fetch", kind="backend", index=TOURS_INDEX, ids=1):
+            fetched = _resilient(f"pinecone.fetch.{TOURS_INDEX}").call(
+                lambda **options: tour_index.fetch(ids=[tour_id], **options)
+            )
         if fetched and fetched.get("vectors", {}).get(tour_id):
-            return {"results": [fetched["vectors"][tour_id]["metadata"]], "next_token": None}
+            return {"results": [_tour_result(tour_id, fetched["vectors"][tour_id]["metadata"])], "next_token": None}
         return {"results": [], "next_token": None}
 
+    filter_dict = _tour_filter(query, type, place)
+
+    # Get embedding for the query
+    query_embedding = embed_queries([query], purpose="tour_query")[0]
+
+    return _query_tours(query_embedding, filter_dict, page_size, pagination_token)
+
+
+def _tour_filter(query: str, type: Optional[str], place: Optional[str]) -> Optional[Dict[str, Any]]:
     # Build metadata filter
     filter_dict: Dict[str, Any] = {}
     if type:
@@ -142,27 +323,30 @@ def search_tours(
         price_str = price_match.group(1).replace(",", "")
         max_price = int(price_str)
         filter_dict["price"] = {"$lt": max_price}
+    return filter_dict or None
 
-    query_text = query
-
-    # Get embedding for the query
-    resp = openai_client.embeddings.create(
-        input=query_text,
-        model=OPENAI_TEXT_EMBEDED_DEPLOYMENT_NAME,
-    )
-    query_embedding = resp.data[0].embedding
 
+def _query_tours(vector: List[float], filter_dict: Optional[Dict[str, Any]], page_size: int,
+                 pagination_token: Optional[str] = None) -> Dict[str, Any]:
     # Query Pinecone (uses SDK response as dict)
-    results = tour_index.query(
-        vector=query_embedding,
-        filter=filter_dict if filter_dict else None,
-        top_k=page_size,
-        include_metadata=True,
-        pagination_token=pagination_token,
-    )
+    with span("pinecone.query", kind="backend", index=TOURS_INDEX, top_k=page_size) as s:
+        results = _resilient(f"pinecone.query.{TOURS_INDEX}").call(
+            lambda **options: tour_index.query(
+                vector=vector,
+                filter=filter_dict,
+                top_k=page_size,
+                include_metadata=True,
+                pagination_token=pagination_token,
+                **options,
+            )
+        )
+        s.set_attribute("matches", len(results.get("matches", [])))
 
     matches = results.get("matches", [])
-    return {"results": [m.get("metadata", {}) for m in matches], "next_token": results.get("pagination_token")}
+    return {
+        "results": [_tour_result(m["id"], m.get("metadata", {})) for m in matches],
+        "next_token": results.get("pagination_token"),
+    }
 
 def search_tour_heritage(
     query: str,
@@ -179,32 +363,126 @@ def search_tour_heritage(
         page_size: Number of results per page.
     Returns:
         Dict with 'results' (list of metadata dicts) and 'next_token'.
+
+    Identical concurrent searches (same normalized query and arguments) run once.
     """
 
     if not place:
         return {"results": [], "next_token": None}
 
-    # Build metadata filter for a single tourId
-    filter_dict = {"place": {"$eq": place}}
-
-    # Get embedding for the query
-    resp = openai_client.embeddings.create(
-        input=query,
-        model=OPENAI_TEXT_EMBEDED_DEPLOYMENT_NAME,
-    )
-    query_embedding = resp.data[0].embedding
-
-    # Query Pinecone heritage index
-    results = tour_heritage_index.query(
-        vector=query_embedding,
-        filter=filter_dict,
-        top_k=page_size,
-        include_metadata=True,
-        pagination_token=pagination_token,
-    )
+    def search() -> Dict[str, Any]:
+        # Get embedding for the query
+        query_embedding = embed_queries([query], purpose="heritage_query")[0]
+        return _query_heritage(query_embedding, place, page_size, pagination_token)
+
+    return get_group("search").do(_search_key(query, "heritage", place, pagination_token, page_size), search)
+
+
+def _query_heritage(vector: List[float], place: str, page_size: int,
+                    pagination_token: Optional[str] = None) -> Dict[str, Any]:
+    # Query Pinecone heritage index, filtered to the place
+    with span("pinecone.query", kind="backend", index=TOUR_HERITAGE_INDEX, top_k=page_size) as s:
+        results = _resilient(f"pinecone.query.{TOUR_HERITAGE_INDEX}").call(
+            lambda **options: tour_heritage_index.query(
+                vector=vector,
+                filter={"place": {"$eq": place}},
+                top_k=page_size,
+                include_metadata=True,
+                pagination_token=pagination_token,
+                **options,
+            )
+        )
+        s.set_attribute("matches", len(results.get("matches", [])))
 
     matches = results.get("matches", [])
-    return {"results": [m.get("metadata", {}) for m in matches], "next_token": results.get("pagination_token")}
+    # Vectors carry ids and filter fields only; the chunk text comes from the local store.
+    # Vectors ingested before the store existed still have raw_text in their metadata.
+    texts = get_chunk_store().get_many(m["id"] for m in matches)
+    return {
+        "results": [
+            {
+                **m.get("metadata", {}),
+                "raw_text": texts.get(m["id"], m.get("metadata", {}).get("raw_text")),
+                "score": m.get("score"),
+            }
+            for m in matches
+        ],
+        "next_token": results.get("pagination_token"),
+    }
+
+
+def run_concurrently(calls: List[Callable[[], Any]]) -> List[Any]:
+    """Run independent calls on the search pool and return their results in order.
+
+    Each call runs in a copy of the caller's context, so its spans nest under the caller's.
+    The first exception is re-raised after all calls finish.
+    """
+    if len(calls) <= 1:
+        return [call() for call in calls]
+    futures = [_search_pool.submit(contextvars.copy_context().run, call) for call in calls]
+    wait(futures)
+    return [f.result() for f in futures]
+
+
+def batch_search(
+    searches: List[Dict[str, Optional[str]]],
+    page_size: int = 5,
+    include_tours: bool = True,
+    include_heritage: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Search tours and heritage guides for several places at once.
+
+    Every query text is embedded in one embeddings request. The vector queries for all places
+    then run concurrently.
+
+    Args:
+        searches: list of {"place": str, "search_query": Optional[str]}
+        page_size: results per place and index
+        include_tours / include_heritage: which indexes to query
+
+    Returns one entry per search, in order: {"place", "search_query", "tours", "heritage"}
+    where "heritage" holds raw chunk hits (see search_tour_heritage).
+    """
+    texts: List[str] = []
+    plans = []
+    for search in searches:
+        place, search_query = search["place"], search.get("search_query")
+        tour_text = search_query or f"tours in {place}"
+        heritage_query = search_query or f"top {page_size} sites to visit in {place}"
+        heritage_text = f"{heritage_query} in {place}"
+        plans.append((place, search_query, tour_text, heritage_text))
+        texts.extend(t for t, wanted in ((tour_text, include_tours), (heritage_text, include_heritage)) if wanted)
+
+    unique_texts = list(dict.fromkeys(texts))
+    vectors = dict(zip(unique_texts, embed_queries(unique_texts, purpose="batch_query")))
+
+    calls: List[Callable[[], Any]] = []
+    for place, _, tour_text, heritage_text in plans:
+        if include_tours:
+            calls.append(lambda v=vectors[tour_text], f=_tour_filter(tour_text, "tour_info", place): _query_tours(v, f, page_size))
+        if include_heritage:
+            calls.append(lambda v=vectors[heritage_text], p=place: _query_heritage(v, p, page_size))
+    answers = iter(run_concurrently(calls))
+
+    grouped = []
+    for place, search_query, _, _ in plans:
+        grouped.append({
+            "place": place,
+            "search_query": search_query,
+            "tours": next(answers)["results"] if include_tours else [],
+            "heritage": next(answers)["results"] if include_heritage else [],
+        })
+    return grouped
+
+
+def heritage_chunk_id(tourId: str, index: int) -> str:
+    return f"{tourId}_heritageGuide_{index}"
+
+
+def store_chunk_texts(chunks: List[str], tourId: str) -> int:
+    """Put a guide's chunk text in the local store under the ids its vectors use."""
+    return get_chunk_store().put_many((heritage_chunk_id(tourId, i), chunk) for i, chunk in enumerate(chunks))
 
 
 def heritage_chunk_exists(chunk_id: str) -> bool:
@@ -216,46 +494,51 @@ def heritage_chunk_exists(chunk_id: str) -> bool:
         return False
     
     try:
-        fetched = tour_heritage_index.fetch(ids=[chunk_id])
+        with span("pinecone.fetch", kind="backend", index=TOUR_HERITAGE_INDEX, ids=1):
+            fetched = _resilient(f"pinecone.fetch.{TOUR_HERITAGE_INDEX}").call(
+                lambda **options: tour_heritage_index.fetch(ids=[chunk_id], **options)
+            )
         vectors = fetched.vectors
         return isinstance(vectors, dict) and chunk_id in vectors and vectors[chunk_id]
 
     except Exception as e:
-        print("Error checking heritage chunk existence: ", e)
+        logger.warning("Error checking heritage chunk existence: %s", e)
         return False
 
 
 def embed_pdf_chunks(chunks: List[str], base_metadata: Dict[str, Any]) -> None:
     """
     Embed PDF text chunks into Pinecone. Each chunk becomes a separate vector with id
-    "{tourId}_heritageGuide_{index}". Existing chunks are skipped.
+    "{tourId}_heritageGuide_{index}". Existing chunks are skipped; the rest are embedded in
+    batched, unhedged requests (`embed_texts`).
+
+    Chunk text goes to the local chunk store; the vectors keep only filter fields.
     """
     if not chunks:
         return
 
-    chunk_ids = [f"{base_metadata['tourId']}_heritageGuide_{i}" for i in range(len(chunks))]
-    existing = tour_heritage_index.fetch(ids=chunk_ids)
-    existing_ids = set(existing.vectors.keys())
+    tourId = base_metadata["tourId"]
+    store_chunk_texts(chunks, tourId)
 
-    vectors_to_upsert: List[Dict[str, Any]] = []
-    for i, chunk in enumerate(chunks):
-        chunk_id = f"{base_metadata['tourId']}_heritageGuide_{i}"
-        if chunk_id in existing_ids:
-            continue
-
-        resp = openai_client.embeddings.create(
-            input=chunk,
-            model=OPENAI_TEXT_EMBEDED_DEPLOYMENT_NAME,
+    chunk_ids = [heritage_chunk_id(tourId, i) for i in range(len(chunks))]
+    with span("pinecone.fetch", kind="backend", index=TOUR_HERITAGE_INDEX, ids=len(chunk_ids)):
+        existing = _resilient(f"pinecone.fetch.{TOUR_HERITAGE_INDEX}").call(
+            lambda **options: tour_heritage_index.fetch(ids=chunk_ids, **options)
         )
-        embedding = resp.data[0].embedding
+    existing_ids = set(existing.vectors.keys())
 
+    missing = [i for i, chunk_id in enumerate(chunk_ids) if chunk_id not in existing_ids]
+    embeddings = embed_texts([chunks[i] for i in missing], purpose="heritage_chunk")
+
+    vectors_to_upsert: List[Dict[str, Any]] = []
+    for i, embedding in zip(missing, embeddings):
+        chunk_id = chunk_ids[i]
         md = {
             "place": base_metadata.get("place"),
-            "tourId": base_metadata.get("tourId"),
+            "tourId": tourId,
             "heritageGuide": base_metadata.get("heritageGuide"),
             "chunk_index": i,
             "type": "heritage_guide",
-            "raw_text": chunk
         }
 
         vectors_to_upsert.append({"id": chunk_id, "values": embedding, "metadata": md})
@@ -266,4 +549,5 @@ def embed_pdf_chunks(chunks: List[str], base_metadata: Dict[str, Any]) -> None:
     batch_size = 100
     for i in range(0, len(vectors_to_upsert), batch_size):
         batch = vectors_to_upsert[i : i + batch_size]
-        tour_heritage_index.upsert(vectors=batch)
\ No newline at end of file
+        with span("pinecone.upsert", kind="backend", index=TOUR_HERITAGE_INDEX, vectors=len(batch)):
+            tour_heritage_index.upsert(vectors=batch)
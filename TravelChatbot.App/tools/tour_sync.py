@@ -0,0 +1,69 @@
+"""Keep the `tours` vector index in step with the `Tours` table.
+
+An incremental sync scans DynamoDB and lists the index. It compares each tour's content hash
+with the hash stored on its vector. Then it embeds only new or changed tours, in batches, and
+deletes the vectors of tours that no longer exist. `--full` re-embeds every tour.
+
+Usage (from TravelChatbot.App):
+    python -m tools.tour_sync            # incremental
+    python -m tools.tour_sync --full     # re-embed everything
+    python -m tools.tour_sync --dry-run  # report the delta without writing
+"""
+import argparse
+import logging
+from typing import Dict
+
+from tools.tour_catalog import scan_tours
+from tools.tour_search import (
+    delete_tour_vectors,
+    embed_tours,
+    fetch_tour_hashes,
+    list_tour_vector_ids,
+    tour_content_hash,
+)
+from utilities.telemetry import span
+
+logger = logging.getLogger(__name__)
+
+
+def sync_tours_index(full: bool = False, dry_run: bool = False) -> Dict[str, int]:
+    """Bring the tours index in line with the Tours table; returns what changed."""
+    with span("tour_sync", kind="job", full=full, dry_run=dry_run) as s:
+        tours = {t.tourId: t.to_dict() for t in scan_tours()}
+        indexed = set(list_tour_vector_ids())
+
+        existing_hashes = {} if full else fetch_tour_hashes([i for i in tours if i in indexed])
+        changed = [t for i, t in tours.items() if existing_hashes.get(i) != tour_content_hash(t)]
+        removed = sorted(indexed - tours.keys())
+
+        stats = {
+            "tours": len(tours),
+            "indexed": len(indexed),
+            "new": sum(1 for t in changed if t["tourId"] not in indexed),
+            "changed": sum(1 for t in changed if t["tourId"] in indexed),
+            "removed": len(removed),
+            "unchanged": len(tours) - len(changed),
+        }
+        if not dry_run:
+            embed_tours(changed, existing_hashes={})
+            delete_tour_vectors(removed)
+        for key, value in stats.items():
+            s.set_attribute(key, value)
+    logger.info("Tours index sync%s: %s", " (dry run)" if dry_run else "", stats)
+    return stats
+
+
+def main(argv=None) -> Dict[str, int]:
+    parser = argparse.ArgumentParser(description="Sync the tours vector index with the Tours table.")
+    parser.add_argument("--full", action="store_true", help="re-embed every tour, not just new or changed ones")
+    parser.add_argument("--dry-run", action="store_true", help="report the delta without embedding or deleting")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    stats = sync_tours_index(full=args.full, dry_run=args.dry_run)
+    print(", ".join(f"{key}={value}" for key, value in stats.items()))
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -1,88 +1,60 @@
+import logging
 import time
-import boto3
 from botocore.exceptions import ClientError
-from config import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION, HERITAGE_GUIDE_S3_BUCKET
-from models.tour import Tour
+from config import HERITAGE_GUIDE_S3_BUCKET, PREFETCH_HERITAGE_QUERIES, PREFETCH_MAX_PLACES
 from models.user_tour import UserTour
-from models.tour_tool_args import GetRegisteredToursArgs, GetToursArgs, GetHeritageGuideArgs, RegisterTourArgs
+from models.tour_tool_args import GetRegisteredToursArgs, GetToursArgs, GetHeritageGuideArgs, RegisterTourArgs, RegisterGroupTourArgs, SearchPlacesArgs, RecommendGroupToursArgs
 from typing import List, Dict, Any, Optional
 from langchain.tools import tool
-from tools.tour_search import embed_tours, search_tours, embed_pdf_chunks, search_tour_heritage, heritage_chunk_exists
-from utilities.pdf_reader import chunk_text, extract_text_from_pdf_bytes
-from utilities.s3_utils import download_s3_object, generate_presigned_url
+from tools.group_recommender import recommend_for_group
+from tools.registrations import get_registration_cache
+from tools.tour_catalog import find_tours, get_tour, list_tours
+from tools.tour_search import (
+    batch_search,
+    embed_pdf_chunks,
+    embed_queries,
+    heritage_chunk_exists,
+    heritage_chunk_id,
+    run_concurrently,
+    search_tour_heritage,
+    search_tours,
+    store_chunk_texts,
+)
+from utilities.pdf_reader import chunk_text, extract_text_from_pdf_file
+from utilities.aws_clients import get_client
+from utilities.chunk_store import get_chunk_store
+from utilities.heritage_context import build_heritage_context
+from utilities.prefetch import get_prefetcher
+from utilities.s3_download import get_download_manager
+from utilities.s3_utils import generate_presigned_url
+from utilities.single_flight import get_group
+from utilities.telemetry import span, current_span
+
+logger = logging.getLogger(__name__)
+
+# DynamoDB TransactWriteItems accepts at most 100 actions per request
+TRANSACT_WRITE_MAX_ITEMS = 100
+GROUP_REGISTRATION_MAX_ATTEMPTS = 3
 
 @tool(args_schema=GetRegisteredToursArgs)
-def get_registered_tours(phoneNumber: str) -> List[Dict[str, Any]]:
-    """Retrieve all registered tours for a given phone number with additional tour details."""
-    dynamodb = boto3.client(
-        "dynamodb",
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        region_name=AWS_REGION
-    )
-    
-    s3_client = boto3.client(
-        "s3",
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        region_name=AWS_REGION
-    )
-
-    try:
-        response = dynamodb.query(
-            TableName="UserTours",
-            IndexName="phoneNumber-createAt-index",
-            KeyConditionExpression="phoneNumber = :p",
-            ExpressionAttributeValues={":p": {"S": phoneNumber}},
-        )
-
-        items = response.get("Items", [])
-        registered_tours = []
-        
-        for item in items:
-            user_tour = UserTour.from_dynamodb(item)
-            user_tour_dict = user_tour.to_dict()
-            
-            # Fetch the full tour details from the Tours table
-            try:
-                tour_response = dynamodb.query(
-                    TableName="Tours",
-                    IndexName="tourId-index",
-                    KeyConditionExpression="tourId = :t",
-                    ExpressionAttributeValues={":t": {"S": user_tour.tourId}},
-                    Limit=1
-                )
-                tour_items = tour_response.get("Items", [])
-                if tour_items:
-                    tour = Tour.from_dynamodb(tour_items[0])
-                    tour_dict = tour.to_dict()
-                    
-                    # Generate presigned URL for heritageGuide if it exists
-                    if tour_dict.get("heritageGuide"):
-                        pre_signed_url = generate_presigned_url(
-                            s3_client=s3_client,
-                            bucket=HERITAGE_GUIDE_S3_BUCKET,
-                            key=tour_dict["heritageGuide"]
-                        )
-                        if pre_signed_url:
-                            tour_dict["heritageGuide"] = pre_signed_url
-
-                    user_tour_dict["tourDetails"] = tour_dict
-            except ClientError as e:
-                user_tour_dict["tourDetails"] = {"error": e.response["Error"]["Message"]}
-            
-            registered_tours.append(user_tour_dict)
-        
-        return registered_tours
+def get_registered_tours(phoneNumber: str, pagination_token: Optional[str] = None, page_size: int = 20) -> Dict[str, Any]:
+    """Retrieve the tours registered for a given phone number, newest first, with additional tour details.
 
-    except ClientError as e:
-        return [{"error": e.response["Error"]["Message"]}]
+    Pages are served from the per-phone registration cache (tools/registrations.py).
+    """
+    return get_registration_cache().page(phoneNumber, pagination_token, page_size)
 
 @tool(args_schema=GetToursArgs)
 def get_tours(
     place: Optional[str] = None,
     search_query: Optional[str] = None,
     type: Optional[str] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    category: Optional[str] = None,
+    start_from: Optional[int] = None,
+    start_to: Optional[int] = None,
+    sort_by: Optional[str] = None,
     pagination_token: Optional[str] = None,
     page_size: int = 10,
 ) -> Dict[str, Any]:
@@ -93,80 +65,84 @@ def get_tours(
     2. place parameter: queries tours for that specific location
     3. search_query parameter: performs semantic search based on the query
 
+    Price, category and start date filters and sort_by apply to modes 1 and 2.
+
     Returns paginated results with a next page token.
     """
     # If there's a search query, go directly to semantic search
     if search_query:
-        return search_tours(
+        found = search_tours(
             query=search_query,
             type="tour_info",
             place=place,  # Pass the place parameter for filtering
             pagination_token=pagination_token,
             page_size=page_size
         )
-
-    # For non-search queries, use DynamoDB pagination
-    dynamodb = boto3.client(
-        "dynamodb",
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        region_name=AWS_REGION
+        _prefetch_places([place] if place else [t.get("place") for t in found.get("results", [])])
+        return found
+
+    # For non-search queries, filter and page through the catalog snapshot; the token is the next offset
+    catalog_tours = find_tours(
+        place=place or None,
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        start_from=start_from,
+        start_to=start_to,
+        sort_by=sort_by,
     )
+    start = int(pagination_token) if pagination_token and pagination_token.isdigit() else 0
+    end = start + page_size
+    tours = _presign_heritage_guides([tour.to_dict() for tour in catalog_tours[start:end]])
+    _prefetch_places([place] if place else [t["place"] for t in tours])
+
+    return {
+        "results": tours,
+        "next_token": str(end) if end < len(catalog_tours) else None
+    }
+
+
+def _presign_heritage_guides(tours: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Replace each tour's heritageGuide S3 key with a presigned URL, in place."""
+    s3_client = get_client("s3")
+    for tour in tours:
+        if tour.get("heritageGuide"):
+            presigned_url = generate_presigned_url(
+                s3_client=s3_client,
+                bucket=HERITAGE_GUIDE_S3_BUCKET,
+                key=tour["heritageGuide"]
+            )
+            if presigned_url:
+                tour["heritageGuide"] = presigned_url
+    return tours
+
 
+@tool(args_schema=RecommendGroupToursArgs)
+def recommend_group_tours(
+    members: List[Any],
+    place: Optional[str] = None,
+    category: Optional[str] = None,
+    strategy: str = "fairness",
+    page_size: int = 5,
+) -> Dict[str, Any]:
+    """Recommend tours that suit a whole group of travelers.
+
+    Each member gives their own preferences, budget and availability. Only tours every member
+    can afford and attend are ranked; the strategy decides how member scores are combined.
+    """
+    members = [m.model_dump() if hasattr(m, "model_dump") else dict(m) for m in members]
     try:
-        # Build the base query parameters
-        query_params = {
-            "TableName": "Tours",
-            "Limit": page_size
-        }
-
-        # Add pagination token if provided
-        if pagination_token:
-            query_params["ExclusiveStartKey"] = {"S": pagination_token}
-
-        # Add place filter if provided
-        if place:
-            query_params.update({
-                "KeyConditionExpression": "place = :p",
-                "ExpressionAttributeValues": {":p": {"S": place}}
-            })
-            response = dynamodb.query(**query_params)
-        else:
-            response = dynamodb.scan(**query_params)
-
-        # Convert items to tour dictionaries
-        items = response.get("Items", [])
-        tours = [Tour.from_dynamodb(item).to_dict() for item in items]
-        
-        s3_client = boto3.client(
-            "s3",
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            region_name=AWS_REGION
+        recommended = recommend_for_group(
+            members, strategy=strategy, place=place or None, category=category, page_size=page_size
         )
+        _presign_heritage_guides(recommended["results"])
+        if current_span() is not None:
+            current_span().set_attribute("members", len(members))
+            current_span().set_attribute("candidates", recommended["candidates"])
+        return {**recommended, "strategy": strategy}
 
-        # Generate presigned URLs for heritageGuide if present
-        for tour in tours:
-            if tour.get("heritageGuide"):
-                presigned_url = generate_presigned_url(
-                    s3_client=s3_client,
-                    bucket=HERITAGE_GUIDE_S3_BUCKET,
-                    key=tour["heritageGuide"]
-                )
-                if presigned_url:
-                    tour["heritageGuide"] = presigned_url
-
-        return {
-            "results": tours,
-            "next_token": None
-        }
-
-    except ClientError as e:
-        return {
-            "results": [],
-            "next_token": None,
-            "error": e.response["Error"]["Message"]
-        }
+    except ValueError as e:
+        return {"results": [], "error": str(e)}
 
 
 @tool(args_schema=GetHeritageGuideArgs, response_format="content_and_artifact")
@@ -186,151 +162,322 @@ def get_heritage_guide(
         "next_token": None
     }
 
-    try:
-        search_query_final = search_query
-        if search_query_final is None:
-            search_query_final = f"top {page_size} sites to visit in {place}"
-        # 1) Use `search_tours` to find tour metadata for this place (prefer vector index)
-        tour_search_results = search_tours(query=search_query_final, place=place, type="tour_info", page_size=1)
-        tours_metadata = tour_search_results.get("results", [])
-
-        # If no tours found via vector search return not found heritage guides
-        if not tours_metadata:
-            return result, metadata
-
-        # 2) For each tour metadata, check whether the first chunk exists in the heritage index.
-        #    If any tour has existing chunk(s), we'll query the heritage index normally.
-        existingTour = None
-        for meta in tours_metadata:
-            if meta.get("place").casefold() == place.casefold():
-                existingTour = meta
-                break
-
-        if existingTour is None:
-            return result, metadata
-
-        tourId = existingTour["tourId"]
-        # 3) If we have existing chunks in Pinecone, query heritage index directly
-        if existingTour is not None and heritage_chunk_exists(chunk_id = f"{tourId}_heritageGuide_0"):
-            place_query = f"{search_query_final} in {place}" if search_query_final else place
-            search_results = search_tour_heritage(
-                query=place_query,
-                place=place,
-                pagination_token=pagination_token,
-                page_size=page_size,
-            )
+    search_query_final = search_query
+    if search_query_final is None:
+        search_query_final = f"top {page_size} sites to visit in {place}"
+    # 1) Use `search_tours` to find tour metadata for this place (prefer vector index)
+    tour_search_results = search_tours(query=search_query_final, place=place, type="tour_info", page_size=1)
+    tours_metadata = tour_search_results.get("results", [])
+
+    # If no tours found via vector search return not found heritage guides
+    if not tours_metadata:
+        return result, metadata
+
+    # 2) For each tour metadata, check whether the first chunk exists in the heritage index.
+    #    If any tour has existing chunk(s), we'll query the heritage index normally.
+    existingTour = None
+    for meta in tours_metadata:
+        if meta.get("place").casefold() == place.casefold():
+            existingTour = meta
+            break
+
+    if existingTour is None:
+        return result, metadata
+
+    # 3) Make sure the guide is ingested (text held locally), then query the heritage index
+    if not _ensure_heritage_ingested(existingTour):
+        return result, metadata
+    return _search_heritage(place, search_query_final, pagination_token, page_size), metadata
+    
+    
+@tool(args_schema=SearchPlacesArgs, response_format="content_and_artifact")
+def search_places(
+    searches: List[Any],
+    page_size: int = 5,
+    include_heritage: bool = True,
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Search tours and heritage guides for several places in one call.
 
-            # Filter (defensive) and return
-            results = [r for r in search_results.get("results", []) if r.get("place") == place]
-            next_token = search_results.get("next_token") if len(results) >= page_size else None
-            return {"results": results, "next_token": next_token}, metadata
-
-        heritageGuide = existingTour.get("heritageGuide")
-        print("Not existing embeded data, fetching heritage guide S3 key:", heritageGuide)
-        if not heritageGuide:
-            return result, metadata
-        
-        try:
-            s3_client = boto3.client("s3",
-                aws_access_key_id=AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-                region_name=AWS_REGION,
-            )
-            pdf = download_s3_object(HERITAGE_GUIDE_S3_BUCKET, heritageGuide, s3_client)
-            if pdf.get("body"):
-                text = extract_text_from_pdf_bytes(pdf["body"])
-                if text:
-                    chunks = chunk_text(text, chunk_size=2000, overlap=200)
-                    if chunks:
-                        try:
-                            embed_pdf_chunks(chunks, existingTour)
-                        except Exception as e:
-                            print(f"Error embedding chunks for tour {tourId}: {str(e)}")
-        except Exception as e:
-            print(f"Error fetching/embedding heritage guide for tour {tourId}: {str(e)}")
-
-        # After embedding, query the heritage index for this place
-        place_query = f"{search_query_final} in {place}" if search_query_final else place
-        search_results = search_tour_heritage(
-            query=place_query,
-            place=place,
-            pagination_token=pagination_token,
-            page_size=page_size,
-        )
+    Use it for itineraries covering more than one place. Returns one group per place with its
+    tours and heritage guide passages.
+    """
+    metadata = { "RAG_usage": include_heritage }
+    searches = [s.model_dump() if hasattr(s, "model_dump") else dict(s) for s in searches]
+
+    if include_heritage:
+        # Load guides that are not searchable yet, all places at once
+        pending = []
+        for search in searches:
+            guides = [t for t in list_tours(search["place"]) if t.heritageGuide]
+            if guides and not _guide_loaded(search["place"]):
+                pending.append(guides[0].to_dict())
+        run_concurrently([lambda t=t: _ensure_heritage_ingested(t) for t in pending])
+
+    groups = batch_search(searches, page_size=page_size, include_heritage=include_heritage)
+
+    saved = 0
+    for group in groups:
+        hits = [r for r in group["heritage"] if r.get("place") == group["place"]]
+        group["heritage"], stats = build_heritage_context(hits, query=group["search_query"])
+        saved += stats["tokens_saved"]
+    if current_span() is not None:
+        current_span().set_attribute("places", len(groups))
+        current_span().set_attribute("context_tokens_saved", saved)
+    return {"results": groups, "context_tokens_saved": saved}, metadata
+
+
+def _ensure_heritage_ingested(tour: Dict[str, Any]) -> bool:
+    """Make the tour's heritage guide searchable; False when the tour has no guide at all.
+
+    A guide whose text is already in the local chunk store needs nothing. Vectors may already
+    exist (ingested by another host); then only the local text is loaded. Otherwise the PDF is
+    downloaded, chunked and embedded.
+
+    Concurrent calls for the same tour (other sessions, the prefetcher, other worker processes)
+    wait for the ingestion already running instead of repeating it.
+    """
+    if _heritage_loaded(tour):
+        return True
+    return get_group("heritage_ingest").do(tour["tourId"], lambda: _ingest_heritage(tour))
+
+
+def _heritage_loaded(tour: Dict[str, Any]) -> bool:
+    heritageGuide = tour.get("heritageGuide")
+    return get_chunk_store().has(heritage_chunk_id(tour["tourId"], 0)) or bool(
+        heritageGuide and _guide_loaded(tour.get("place"), heritageGuide))
 
-        results = [r for r in search_results.get("results", []) if r.get("place") == place]
-        next_token = search_results.get("next_token") if len(results) >= page_size else None
-        return {"results": results, "next_token": next_token}, metadata
 
+def _ingest_heritage(tour: Dict[str, Any]) -> bool:
+    tourId = tour["tourId"]
+    first_chunk = heritage_chunk_id(tourId, 0)
+    heritageGuide = tour.get("heritageGuide")
+    # Another process may have loaded it while this one waited for the lock
+    if _heritage_loaded(tour):
+        return True
+
+    embedded = heritage_chunk_exists(chunk_id=first_chunk)
+    logger.info("No local heritage text for tour %s (vectors %s), loading S3 key %s",
+                tourId, "present" if embedded else "missing", heritageGuide)
+    if current_span() is not None:
+        current_span().set_attribute("ingested", bool(heritageGuide) and not embedded)
+    if not heritageGuide and not embedded:
+        return False
+
+    try:
+        chunks = _load_heritage_chunks(heritageGuide) if heritageGuide else []
+        if chunks:
+            if embedded:
+                store_chunk_texts(chunks, tourId)
+            else:
+                try:
+                    embed_pdf_chunks(chunks, tour)
+                except Exception as e:
+                    logger.exception("Error embedding chunks for tour %s: %s", tourId, e)
     except Exception as e:
-        print(f"Error in get_heritage_guide: {str(e)}" )
-        return {
-            "results": [],
-            "next_token": None,
-            "error": str(e)
-        }, metadata
-    
-    
-@tool(args_schema=RegisterTourArgs)
-def register_tour(tourId: str, phoneNumber: str) -> Dict[str, Any]:
-    """Register a tour for a phone number. Requires tourId and phoneNumber."""
-    
-    dynamodb = boto3.client(
-        "dynamodb",
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        region_name=AWS_REGION
+        logger.exception("Error fetching/embedding heritage guide for tour %s: %s", tourId, e)
+    return True
+
+
+def _guide_loaded(place: Optional[str], heritageGuide: Optional[str] = None) -> bool:
+    """True when a tour of the place (with this guide, if given) has its guide text in the chunk store.
+
+    Heritage searches filter by place, so a guide loaded under any of the place's tours serves them all.
+    """
+    store = get_chunk_store()
+    return any(
+        store.has(heritage_chunk_id(t.tourId, 0))
+        for t in list_tours(place)
+        if t.heritageGuide and (heritageGuide is None or t.heritageGuide == heritageGuide)
+    ) if place else False
+
+
+def _heritage_queries(place: str, page_size: int = 10) -> List[str]:
+    """Texts get_heritage_guide embeds for the common questions about a place (see its two searches)."""
+    texts = []
+    for query in PREFETCH_HERITAGE_QUERIES + [f"top {page_size} sites to visit in {place}"]:
+        texts += [query, f"{query} in {place}"]
+    return texts
+
+
+def _prefetch_places(places: List[Optional[str]]) -> None:
+    """After a listing, warm in the background what a heritage question about these places needs."""
+    prefetcher = get_prefetcher()
+    for place in list(dict.fromkeys(p for p in places if p))[:PREFETCH_MAX_PLACES]:
+        guides = [t for t in list_tours(place) if t.heritageGuide]
+        if not guides:
+            continue
+        prefetcher.submit(f"place:{place}", [
+            ("heritage_guide", lambda t=guides[0].to_dict(): _ensure_heritage_ingested(t)),
+            ("query_embeddings", lambda p=place: embed_queries(_heritage_queries(p), purpose="prefetch")),
+            ("presigned_urls", lambda ts=guides: _presign_heritage_guides([t.to_dict() for t in ts])),
+        ])
+
+
+def _search_heritage(place: str, search_query: Optional[str], pagination_token: Optional[str], page_size: int) -> Dict[str, Any]:
+    """Query the heritage index and turn the hits into merged, deduplicated, budgeted passages."""
+    place_query = f"{search_query} in {place}" if search_query else place
+    search_results = search_tour_heritage(
+        query=place_query,
+        place=place,
+        pagination_token=pagination_token,
+        page_size=page_size,
     )
 
+    # Filter (defensive), then post-process
+    hits = [r for r in search_results.get("results", []) if r.get("place") == place]
+    next_token = search_results.get("next_token") if len(hits) >= page_size else None
+    passages, stats = build_heritage_context(hits, query=search_query)
+    if current_span() is not None:
+        for key, value in stats.items():
+            current_span().set_attribute(f"context_{key}", value)
+    return {"results": passages, "next_token": next_token, "context_tokens_saved": stats["tokens_saved"]}
+
+
+def _load_heritage_chunks(heritageGuide: str) -> List[str]:
+    """Download a heritage guide PDF and split its text into the chunks that get embedded."""
     try:
-        # 1) Find the tour by tourId using the tourId-index
-        resp = dynamodb.query(
-            TableName="Tours",
-            IndexName="tourId-index",
-            KeyConditionExpression="tourId = :t",
-            ExpressionAttributeValues={":t": {"S": tourId}},
-            Limit=1
-        )
-        items = resp.get("Items", [])
-        if not items:
-            raise ValueError("tour not found")
-
-        tour_item = items[0]
-        tour = Tour.from_dynamodb(tour_item)
-        start_date = int(tour.startDate)
-
-        # 2) Check if the tour is already registered for this phoneNumber
-        resp_check = dynamodb.query(
-            TableName="UserTours",
-            KeyConditionExpression="tourId = :t AND phoneNumber = :p",
-            ExpressionAttributeValues={
-                ":t": {"S": tourId},
-                ":p": {"S": phoneNumber}
-            },
-            Limit=1
-        )
-        if resp_check.get("Items"):
-            raise ValueError("tour is registered")
-
-        # 3) Register the tour
-        created_at = int(time.time())
-        dynamodb.put_item(
-            TableName="UserTours",
-            Item={
-                "tourId": {"S": tourId},
-                "phoneNumber": {"S": phoneNumber},
-                "createAt": {"N": str(created_at)},
-                "startDate": {"N": str(start_date)}
-            }
-        )
+        # Parsed from the local file: cached, or spooled while downloading in ranged parts
+        with get_download_manager().open(HERITAGE_GUIDE_S3_BUCKET, heritageGuide) as pdf:
+            text = extract_text_from_pdf_file(pdf)
+    except ClientError as e:
+        logger.warning("Could not download heritage guide %s: %s", heritageGuide, e.response["Error"]["Message"])
+        return []
+    if not text:
+        return []
+    return chunk_text(text, chunk_size=2000, overlap=200)
 
-        return {
-            "tourId": tourId,
-            "phoneNumber": phoneNumber,
-            "createAt": created_at,
-            "startDate": start_date
-        }
 
+@tool(args_schema=RegisterTourArgs)
+def register_tour(tourId: str, phoneNumber: str, idempotencyKey: Optional[str] = None) -> Dict[str, Any]:
+    """Register a tour for a phone number. Requires tourId and phoneNumber."""
+
+    # 1) Resolve the tour startDate from the catalog snapshot (no round-trip when cached)
+    tour = get_tour(tourId)
+    if tour is None:
+        raise ValueError("tour not found")
+    start_date = int(tour.startDate)
+
+    # 2) Register with a conditional write: the (tourId, phoneNumber) key must not exist yet,
+    #    so concurrent registrations cannot both succeed
+    created_at = int(time.time())
+    item = _user_tour_item(tourId, phoneNumber, created_at, start_date, idempotencyKey)
+
+    try:
+        with span("dynamodb.put_item", kind="backend", table="UserTours", conditional=True):
+            get_client("dynamodb").put_item(
+                TableName="UserTours",
+                Item=item,
+                ConditionExpression="attribute_not_exists(tourId)",
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            )
     except ClientError as e:
-        return {"error": e.response["Error"]["Message"]}
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        existing = e.response.get("Item") or {}
+        # A retry of the same request: answer with the registration it created
+        if idempotencyKey and existing.get("idempotencyKey", {}).get("S") == idempotencyKey:
+            return UserTour.from_dynamodb(existing).to_dict()
+        raise ValueError("tour is registered")
+
+    registration = {
+        "tourId": tourId,
+        "phoneNumber": phoneNumber,
+        "createAt": created_at,
+        "startDate": start_date
+    }
+    get_registration_cache().add([registration])
+    return registration
+
 
+def _user_tour_item(tourId: str, phoneNumber: str, created_at: int, start_date: int, idempotencyKey: Optional[str]) -> Dict[str, Any]:
+    item = {
+        "tourId": {"S": tourId},
+        "phoneNumber": {"S": phoneNumber},
+        "createAt": {"N": str(created_at)},
+        "startDate": {"N": str(start_date)}
+    }
+    if idempotencyKey:
+        item["idempotencyKey"] = {"S": idempotencyKey}
+    return item
+
+
+@tool(args_schema=RegisterGroupTourArgs)
+def register_group_tour(tourId: str, phoneNumbers: List[str], idempotencyKey: Optional[str] = None) -> Dict[str, Any]:
+    """Register a whole group (several phone numbers) for one tour in a single call.
+
+    Returns which members were registered, which were already registered (duplicates) and
+    which could not be written.
+    """
+    tour = get_tour(tourId)
+    if tour is None:
+        raise ValueError("tour not found")
+    start_date = int(tour.startDate)
+    created_at = int(time.time())
+
+    # Keep the first occurrence of every phone number; repeats in the request are duplicates
+    members: List[str] = []
+    duplicates: List[str] = []
+    for phoneNumber in phoneNumbers:
+        (duplicates if phoneNumber in members else members).append(phoneNumber)
+
+    registered: List[Dict[str, Any]] = []
+    failed: List[Dict[str, str]] = []
+    dynamodb = get_client("dynamodb")
+
+    for start in range(0, len(members), TRANSACT_WRITE_MAX_ITEMS):
+        pending = members[start:start + TRANSACT_WRITE_MAX_ITEMS]
+        attempt = 0
+        while pending:
+            attempt += 1
+            items = {p: _user_tour_item(tourId, p, created_at, start_date, idempotencyKey) for p in pending}
+            try:
+                with span("dynamodb.transact_write_items", kind="backend", table="UserTours", items=len(pending)):
+                    dynamodb.transact_write_items(TransactItems=[
+                        {"Put": {
+                            "TableName": "UserTours",
+                            "Item": items[p],
+                            "ConditionExpression": "attribute_not_exists(tourId)",
+                            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+                        }}
+                        for p in pending
+                    ])
+            except ClientError as e:
+                code = e.response["Error"]["Code"]
+                reasons = e.response.get("CancellationReasons") or []
+                if code != "TransactionCanceledException" or len(reasons) != len(pending):
+                    if attempt >= GROUP_REGISTRATION_MAX_ATTEMPTS:
+                        failed.extend({"phoneNumber": p, "error": e.response["Error"]["Message"]} for p in pending)
+                        break
+                    time.sleep(0.05 * 2 ** attempt)
+                    continue
+
+                # The whole transaction was cancelled: sort members by reason and retry the rest
+                retry: List[str] = []
+                for phoneNumber, reason in zip(pending, reasons):
+                    if reason.get("Code") == "ConditionalCheckFailed":
+                        existing = reason.get("Item") or {}
+                        if idempotencyKey and existing.get("idempotencyKey", {}).get("S") == idempotencyKey:
+                            registered.append(UserTour.from_dynamodb(existing).to_dict())
+                        else:
+                            duplicates.append(phoneNumber)
+                    elif reason.get("Code") in ("None", None) or attempt < GROUP_REGISTRATION_MAX_ATTEMPTS:
+                        retry.append(phoneNumber)
+                    else:
+                        failed.append({"phoneNumber": phoneNumber, "error": reason.get("Message") or reason.get("Code")})
+                if len(retry) == len(pending) and attempt >= GROUP_REGISTRATION_MAX_ATTEMPTS:
+                    failed.extend({"phoneNumber": p, "error": e.response["Error"]["Message"]} for p in retry)
+                    break
+                pending = retry
+                continue
+
+            written = [UserTour.from_dynamodb(items[p]).to_dict() for p in pending]
+            get_registration_cache().add(written)
+            registered.extend(written)
+            pending = []
+
+    return {
+        "tourId": tourId,
+        "registered": registered,
+        "duplicates": duplicates,
+        "failed": failed,
+    }
@@ -0,0 +1,33 @@
+import threading
+import boto3
+from config import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION
+from utilities import deadline
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(service: str):
+    """Return a process-wide boto3 client for `service` (boto3 clients are thread-safe).
+
+    Creating a client loads the service model and builds a connection pool, which costs far
+    more than the request itself on hot paths, so clients are created once and reused.
+    Requests made after the turn deadline (utilities/deadline.py) fail with DeadlineExceeded.
+    """
+    client = _clients.get(service)
+    if client is None:
+        with _lock:
+            client = _clients.get(service)
+            if client is None:
+                client = _clients[service] = boto3.client(
+                    service,
+                    aws_access_key_id=AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+                    region_name=AWS_REGION,
+                )
+                client.meta.events.register("before-call", _check_deadline)
+    return client
+
+
+def _check_deadline(model, **kwargs) -> None:
+    deadline.check(f"{model.service_model.service_name}.{model.name}")
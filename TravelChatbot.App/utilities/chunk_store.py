@@ -0,0 +1,97 @@
+"""Local store for heritage guide chunk text, keyed by the chunk's vector id.
+
+Vectors in the heritage index carry only ids and filter fields. The text the answers need
+is kept here, in a SQLite file, compressed with zstd. If the `zstandard` package is
+missing, zlib is used instead. Each row records its codec, so a file written with either
+codec stays readable.
+"""
+import sqlite3
+import threading
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
+
+from config import CHUNK_STORE_PATH
+from utilities.telemetry import span
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+# SQLite limits bound parameters per statement; stay well under the default
+_SQL_BATCH = 500
+
+
+class ChunkStore:
+    """Compressed chunk text in a SQLite file shared by every worker on the host."""
+
+    def __init__(self, path: str = CHUNK_STORE_PATH):
+        self.path = path
+        self.codec = "zstd" if zstandard is not None else "zlib"
+        self._local = threading.local()
+        conn = self._connect()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, codec TEXT NOT NULL, body BLOB NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10)
+        return conn
+
+    def _compress(self, text: str) -> bytes:
+        data = text.encode("utf-8")
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=9).compress(data)
+        return zlib.compress(data, 9)
+
+    @staticmethod
+    def _decompress(codec: str, body: bytes) -> str:
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("chunk store contains zstd data but the zstandard package is not installed")
+            return zstandard.ZstdDecompressor().decompress(body).decode("utf-8")
+        return zlib.decompress(body).decode("utf-8")
+
+    def put_many(self, chunks: Iterable[Tuple[str, str]]) -> int:
+        """Store (chunk_id, text) pairs, replacing existing text. Returns the number written."""
+        rows = [(chunk_id, self.codec, self._compress(text)) for chunk_id, text in chunks]
+        if rows:
+            conn = self._connect()
+            with span("chunk_store.put", kind="backend", chunks=len(rows)):
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO chunks (id, codec, body) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def get_many(self, chunk_ids: Iterable[str]) -> Dict[str, str]:
+        """Text of every stored chunk among `chunk_ids`; unknown ids are left out."""
+        ids = list(dict.fromkeys(chunk_ids))
+        found: Dict[str, str] = {}
+        conn = self._connect()
+        with span("chunk_store.get", kind="backend", chunks=len(ids)) as s:
+            for start in range(0, len(ids), _SQL_BATCH):
+                batch = ids[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                for chunk_id, codec, body in conn.execute(
+                    f"SELECT id, codec, body FROM chunks WHERE id IN ({placeholders})", batch
+                ):
+                    found[chunk_id] = self._decompress(codec, body)
+            s.set_attribute("found", len(found))
+        return found
+
+    def has(self, chunk_id: str) -> bool:
+        return self._connect().execute("SELECT 1 FROM chunks WHERE id = ?", (chunk_id,)).fetchone() is not None
+
+
+_store: Optional[ChunkStore] = None
+_store_lock = threading.Lock()
+
+
+def get_chunk_store() -> ChunkStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ChunkStore()
+    return _store
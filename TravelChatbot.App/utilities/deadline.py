@@ -0,0 +1,71 @@
+"""Per-turn deadlines that follow the work into tools and backend clients.
+
+A turn opens `deadline(seconds)`. The deadline lives in a context variable, so it reaches every
+tool and search worker: those run in copies of the caller's context. Nested deadlines only
+narrow it. Code that waits on a remote service bounds the wait with `timeout(default)`, or
+passes `timeout_kwargs()` to clients that take a per-request `timeout`. boto3 clients
+(utilities/aws_clients.py) check `check()` before every request.
+
+Outside a turn there is no deadline, and all of these are no-ops.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from utilities.telemetry import REGISTRY
+
+DEADLINE_EXCEEDED = REGISTRY.counter(
+    "travelbot_deadline_exceeded_total", "Calls refused because the turn deadline had passed.", ("where",)
+)
+
+# Absolute time.monotonic() value, or None
+_deadline: ContextVar[Optional[float]] = ContextVar("travelbot_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The turn deadline passed before the call could start."""
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """Bound everything inside to `seconds` from now (or less, if an outer deadline is sooner)."""
+    current = _deadline.get()
+    if seconds is None:
+        yield current
+        return
+    at = time.monotonic() + seconds
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield _deadline.get()
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline (may be negative); None without one."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def timeout(default: Optional[float] = None) -> Optional[float]:
+    """`default` shortened to the time left; None only when there is neither."""
+    left = remaining()
+    if left is None:
+        return default
+    left = max(left, 0.0)
+    return left if default is None else min(default, left)
+
+
+def timeout_kwargs() -> Dict[str, Any]:
+    """{"timeout": seconds left} under a deadline, else {} (keeps the client's own default)."""
+    left = remaining()
+    return {} if left is None else {"timeout": max(left, 0.001)}
+
+
+def check(where: str) -> None:
+    """Raise DeadlineExceeded when the deadline has passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        DEADLINE_EXCEEDED.inc(where=where)
+        raise DeadlineExceeded(f"turn deadline passed before {where}")
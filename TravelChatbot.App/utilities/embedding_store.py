@@ -0,0 +1,198 @@
+"""Compact local embedding storage: quantized vectors for scanning, full precision for re-scoring.
+
+A store holds unit-length vectors under string ids in two forms:
+
+- full:  (n, dimension) float32, used to re-score candidates exactly
+- codes: the form a search scans, by encoding
+    float32  the full vectors themselves
+    float16  half precision (2 bytes per dimension)
+    int8     symmetric scalar quantization with one scale per vector (1 byte per dimension)
+    pq       product quantization: the vector is split into `pq_subspaces` sub-vectors, each
+             stored as the 8-bit id of its nearest centroid (1 byte per sub-vector)
+
+A search scores every (or every masked) row from the codes, keeps the best `rescore` candidates
+and re-scores those from the full vectors, so the final ranking and scores are exact whenever the
+true top k are among the candidates.
+
+`save` writes the arrays as .npy files into a new directory and renames it into place. `open`
+memory-maps them read-only, so worker processes that open the same store share one copy in the
+page cache. Only the codes are read on every search; the full vectors are touched one candidate
+row at a time and mostly stay on disk.
+"""
+import json
+import os
+import shutil
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+ENCODINGS = ("float32", "float16", "int8", "pq")
+# Rows scored per step; bounds the float32 temporaries made from float16/int8 codes
+BLOCK_ROWS = 8192
+# PQ codebook training: sampled rows and k-means iterations per sub-space
+PQ_TRAIN_SAMPLES = 20000
+PQ_ITERATIONS = 12
+
+_ARRAYS = ("full", "codes", "scales", "codebooks")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _train_pq(vectors: np.ndarray, subspaces: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(codebooks (subspaces, centroids, sub-dimension) float32, codes (n, subspaces) uint8)."""
+    n, dimension = vectors.shape
+    if subspaces <= 0 or dimension % subspaces:
+        raise ValueError(f"pq_subspaces must divide the dimension ({dimension})")
+    sub = dimension // subspaces
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(n, min(n, PQ_TRAIN_SAMPLES), replace=False)] if n else vectors
+    k = max(1, min(256, len(sample)))
+    codebooks = np.zeros((subspaces, k, sub), dtype=np.float32)
+    codes = np.zeros((n, subspaces), dtype=np.uint8)
+    for j in range(subspaces):
+        x = sample[:, j * sub:(j + 1) * sub]
+        centroids = x[rng.choice(len(x), k, replace=False)].copy()
+        for _ in range(PQ_ITERATIONS):
+            # Nearest centroid: argmax of x.c - |c|^2 / 2
+            assign = np.argmax(x @ centroids.T - 0.5 * (centroids ** 2).sum(axis=1), axis=1)
+            counts = np.bincount(assign, minlength=k)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, x)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+        codebooks[j] = centroids
+        half_norms = 0.5 * (centroids ** 2).sum(axis=1)
+        for start in range(0, n, BLOCK_ROWS):
+            block = vectors[start:start + BLOCK_ROWS, j * sub:(j + 1) * sub]
+            codes[start:start + BLOCK_ROWS, j] = np.argmax(block @ centroids.T - half_norms, axis=1)
+    return codebooks, codes
+
+
+class EmbeddingStore:
+    def __init__(self, ids: Sequence[str], encoding: str, arrays: Dict[str, np.ndarray], path: Optional[str] = None):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {', '.join(ENCODINGS)}")
+        self.ids = list(ids)
+        self.encoding = encoding
+        self.full = arrays["full"]
+        self.codes = arrays.get("codes")
+        self.scales = arrays.get("scales")
+        self.codebooks = arrays.get("codebooks")
+        self.path = path
+        self._rows = {id_: i for i, id_ in enumerate(self.ids)}
+
+    @classmethod
+    def build(cls, ids: Sequence[str], vectors: np.ndarray, encoding: str = "int8", pq_subspaces: int = 96,
+              seed: int = 0) -> "EmbeddingStore":
+        """An in-memory store of `vectors` (normalized here), row i under ids[i]."""
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {', '.join(ENCODINGS)}")
+        full = normalize(vectors)
+        if len(ids) != len(full):
+            raise ValueError("ids and vectors must have the same length")
+        arrays: Dict[str, np.ndarray] = {"full": full}
+        if encoding == "float16":
+            arrays["codes"] = full.astype(np.float16)
+        elif encoding == "int8":
+            scales = np.abs(full).max(axis=1) / 127 if len(full) else np.zeros(0, dtype=np.float32)
+            scales[scales == 0] = 1.0
+            arrays["scales"] = scales.astype(np.float32)
+            arrays["codes"] = np.round(full / scales[:, None]).astype(np.int8)
+        elif encoding == "pq":
+            arrays["codebooks"], arrays["codes"] = _train_pq(full, pq_subspaces, seed)
+        return cls(ids, encoding, arrays)
+
+    @classmethod
+    def open(cls, path: str) -> "EmbeddingStore":
+        """Memory-map a saved store (read-only). Raises FileNotFoundError when there is none."""
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in meta["arrays"]}
+        return cls(meta["ids"], meta["encoding"], arrays, path=path)
+
+    def save(self, path: str) -> None:
+        """Write the store to `path`. If another process saved it first, theirs is kept."""
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        tmp = os.path.join(parent, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+        os.makedirs(tmp)
+        try:
+            names = [name for name in _ARRAYS if getattr(self, name) is not None]
+            for name in names:
+                np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"encoding": self.encoding, "ids": self.ids, "arrays": names}, f)
+            try:
+                os.rename(tmp, path)
+            except OSError:
+                if not os.path.isdir(path):
+                    raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dimension(self) -> int:
+        return self.full.shape[1]
+
+    def row(self, id_: str) -> Optional[int]:
+        return self._rows.get(id_)
+
+    def vectors(self, rows: Sequence[int]) -> np.ndarray:
+        """Full-precision (unit-length) vectors of `rows`."""
+        return np.asarray(self.full[np.asarray(rows, dtype=np.int64)], dtype=np.float32)
+
+    def nbytes(self) -> Dict[str, int]:
+        """Bytes scanned by a search (codes and their side tables) and bytes of the full vectors."""
+        scanned = [self.full] if self.encoding == "float32" else [self.codes, self.scales, self.codebooks]
+        return {"scan": sum(a.nbytes for a in scanned if a is not None), "full": self.full.nbytes}
+
+    def approximate_scores(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """(rows, queries) inner products from the codes; `queries` are unit-length (q, dimension)."""
+        queries = np.asarray(queries, dtype=np.float32)
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        out = np.empty((len(rows), len(queries)), dtype=np.float32)
+        if self.encoding == "pq":
+            subspaces, k, sub = self.codebooks.shape
+            # Lookup table: every query sub-vector against every centroid, (subspaces, k, q)
+            lut = np.einsum("qmd,mkd->mkq", queries.reshape(len(queries), subspaces, sub), self.codebooks)
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block = rows[start:start + BLOCK_ROWS]
+            if self.encoding == "float32":
+                out[start:start + len(block)] = self.full[block] @ queries.T
+            elif self.encoding == "float16":
+                out[start:start + len(block)] = self.codes[block].astype(np.float32) @ queries.T
+            elif self.encoding == "int8":
+                out[start:start + len(block)] = (self.codes[block].astype(np.float32) @ queries.T) * self.scales[block, None]
+            else:
+                codes = self.codes[block]
+                scores = np.zeros((len(block), len(queries)), dtype=np.float32)
+                for j in range(subspaces):
+                    scores += lut[j][codes[:, j]]
+                out[start:start + len(block)] = scores
+        return out
+
+    def exact_scores(self, queries: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """(rows, queries) inner products from the full vectors."""
+        return self.vectors(rows) @ np.asarray(queries, dtype=np.float32).T
+
+    def search(self, query: np.ndarray, k: int, rescore: int = 10, rows: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """Top k (id, cosine similarity) for one query: scan the codes, re-score rescore x k exactly."""
+        query = normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        if not len(rows) or k <= 0:
+            return []
+        approx = self.approximate_scores(query, rows)[:, 0]
+        n = min(len(rows), max(k, k * rescore))
+        shortlist = rows[np.argpartition(-approx, n - 1)[:n]]
+        exact = self.exact_scores(query, shortlist)[:, 0]
+        top = np.argsort(-exact, kind="stable")[:k]
+        return [(self.ids[shortlist[i]], float(exact[i])) for i in top]
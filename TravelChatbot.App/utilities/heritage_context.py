@@ -0,0 +1,217 @@
+"""Post-retrieval processing for heritage guide chunks before they reach the LLM.
+
+Steps, in order:
+1. Merge hits with adjacent chunk_index values from the same guide into one passage, dropping
+   the text that chunk_text's overlap repeats at each seam.
+2. Drop passages that are near-duplicates of a better-scored one (word-shingle Jaccard).
+3. Optionally rerank: vector score blended with a lexical BM25 score against the query.
+4. Keep passages in rank order until the token budget is spent.
+
+`build_heritage_context` returns the passages and the context tokens before and after, so
+callers can report what was saved.
+"""
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import HERITAGE_CONTEXT_TOKEN_BUDGET, HERITAGE_DEDUP_THRESHOLD, HERITAGE_RERANK
+from utilities.telemetry import REGISTRY
+
+CONTEXT_TOKENS = REGISTRY.counter(
+    "travelbot_heritage_context_tokens_total", "Heritage context tokens before and after post-processing.", ("stage",)
+)
+
+# chunk_text overlaps neighbours by 200 characters; allow for separator differences at the seam
+MAX_OVERLAP_CHARS = 400
+SHINGLE_SIZE = 3
+RERANK_VECTOR_WEIGHT = 0.5
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    """Tokens under the OpenAI cl100k encoding; a 4-characters-per-token estimate if unavailable."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception:  # tiktoken missing, or its encoding file cannot be downloaded
+                    _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4) if text else 0
+
+
+@dataclass
+class Passage:
+    tourId: Optional[str]
+    heritageGuide: Optional[str]
+    place: Optional[str]
+    chunk_indexes: List[int]
+    text: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.metadata,
+            "place": self.place,
+            "tourId": self.tourId,
+            "heritageGuide": self.heritageGuide,
+            "chunk_indexes": self.chunk_indexes,
+            "raw_text": self.text,
+            "score": round(self.score, 4),
+        }
+
+
+def _seam_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is also a prefix of `right`."""
+    for k in range(min(len(left), len(right), MAX_OVERLAP_CHARS), 0, -1):
+        if left.endswith(right[:k]):
+            return k
+    return 0
+
+
+def merge_adjacent(results: List[Dict[str, Any]]) -> List[Passage]:
+    """Merge consecutive chunk_index hits of the same guide into continuous passages."""
+    groups: Dict[Tuple[Any, Any], List[Dict[str, Any]]] = {}
+    loose: List[Passage] = []
+    for r in results:
+        text = r.get("raw_text")
+        if not text:
+            continue
+        if r.get("chunk_index") is None:
+            loose.append(Passage(r.get("tourId"), r.get("heritageGuide"), r.get("place"), [], text, float(r.get("score") or 0.0)))
+            continue
+        groups.setdefault((r.get("tourId"), r.get("heritageGuide")), []).append(r)
+
+    passages: List[Passage] = []
+    for (tourId, guide), hits in groups.items():
+        hits = sorted({int(h["chunk_index"]): h for h in hits}.values(), key=lambda h: int(h["chunk_index"]))
+        current: Optional[Passage] = None
+        for h in hits:
+            index, text, score = int(h["chunk_index"]), h["raw_text"], float(h.get("score") or 0.0)
+            if current is not None and index == current.chunk_indexes[-1] + 1:
+                overlap = _seam_overlap(current.text, text)
+                current.text += text[overlap:] if overlap else "\n" + text
+                current.chunk_indexes.append(index)
+                current.score = max(current.score, score)
+                continue
+            metadata = {k: v for k, v in h.items() if k not in ("raw_text", "chunk_index", "score")}
+            current = Passage(tourId, guide, h.get("place"), [index], text, score, metadata)
+            passages.append(current)
+    return passages + loose
+
+
+def _shingles(text: str) -> set:
+    words = [w.lower() for w in _WORD.findall(text)]
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def drop_near_duplicates(passages: List[Passage], threshold: float = HERITAGE_DEDUP_THRESHOLD) -> List[Passage]:
+    """Keep the best-scored passage of every group whose shingle Jaccard similarity >= threshold."""
+    kept: List[Tuple[Passage, set]] = []
+    for p in sorted(passages, key=lambda p: -p.score):
+        shingles = _shingles(p.text)
+        duplicate = False
+        for _, other in kept:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append((p, shingles))
+    return [p for p, _ in kept]
+
+
+def lexical_rerank(passages: List[Passage], query: str, k1: float = 1.2, b: float = 0.75) -> List[Passage]:
+    """Order passages by the vector score blended with BM25 against the query (both min-max scaled)."""
+    terms = [t.lower() for t in _WORD.findall(query)]
+    if not passages or not terms:
+        return sorted(passages, key=lambda p: -p.score)
+
+    docs = [Counter(w.lower() for w in _WORD.findall(p.text)) for p in passages]
+    lengths = [sum(d.values()) for d in docs]
+    avg_len = (sum(lengths) / len(lengths)) or 1.0
+    n = len(docs)
+    bm25 = []
+    for doc, length in zip(docs, lengths):
+        score = 0.0
+        for term in set(terms):
+            tf = doc.get(term, 0)
+            if not tf:
+                continue
+            df = sum(1 for d in docs if term in d)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_len))
+        bm25.append(score)
+
+    def scaled(values: List[float]) -> List[float]:
+        low, high = min(values), max(values)
+        return [(v - low) / (high - low) if high > low else 0.0 for v in values]
+
+    blended = [
+        RERANK_VECTOR_WEIGHT * v + (1 - RERANK_VECTOR_WEIGHT) * l
+        for v, l in zip(scaled([p.score for p in passages]), scaled(bm25))
+    ]
+    order = sorted(range(n), key=lambda i: -blended[i])
+    return [passages[i] for i in order]
+
+
+def fit_budget(passages: List[Passage], token_budget: int) -> List[Passage]:
+    """Keep passages in order while they fit; trim the first one that does not if nothing fits yet."""
+    kept: List[Passage] = []
+    used = 0
+    for p in passages:
+        tokens = count_tokens(p.text)
+        if used + tokens <= token_budget:
+            kept.append(p)
+            used += tokens
+        elif not kept:
+            # Cut at a sentence boundary where possible
+            chars = max(1, len(p.text) * token_budget // max(tokens, 1))
+            cut = p.text[:chars]
+            end = max(cut.rfind(". "), cut.rfind("\n"))
+            p.text = cut[:end + 1] if end > chars // 2 else cut
+            kept.append(p)
+            break
+    return kept
+
+
+def build_heritage_context(
+    results: List[Dict[str, Any]],
+    query: Optional[str] = None,
+    token_budget: int = HERITAGE_CONTEXT_TOKEN_BUDGET,
+    rerank: str = HERITAGE_RERANK,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Merge, dedupe, rerank and budget raw heritage search results.
+
+    Returns (passages, stats) where stats has tokens_in, tokens_out, tokens_saved, chunks_in and passages_out.
+    """
+    tokens_in = sum(count_tokens(r.get("raw_text") or "") for r in results)
+    passages = drop_near_duplicates(merge_adjacent(results))
+    if rerank == "lexical" and query:
+        passages = lexical_rerank(passages, query)
+    passages = fit_budget(passages, token_budget)
+    tokens_out = sum(count_tokens(p.text) for p in passages)
+
+    CONTEXT_TOKENS.inc(tokens_in, stage="retrieved")
+    CONTEXT_TOKENS.inc(tokens_out, stage="sent")
+    stats = {
+        "chunks_in": len(results),
+        "passages_out": len(passages),
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "tokens_saved": tokens_in - tokens_out,
+    }
+    return [p.to_dict() for p in passages], stats
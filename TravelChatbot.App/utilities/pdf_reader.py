@@ -1,21 +1,29 @@
 
 import io
 from PyPDF2 import PdfReader
-from typing import List
+from typing import BinaryIO, List
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from utilities.telemetry import span
 
 def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
     """Extract text from PDF bytes using PyPDF2."""
-    try:
-        reader = PdfReader(io.BytesIO(pdf_bytes))
+    return extract_text_from_pdf_file(io.BytesIO(pdf_bytes))
+
+
+def extract_text_from_pdf_file(pdf_file: BinaryIO) -> str:
+    """Extract text from a seekable binary PDF file using PyPDF2 (pages are read as needed)."""
+    pdf_file.seek(0, io.SEEK_END)
+    size = pdf_file.tell()
+    pdf_file.seek(0)
+    with span("pdf.parse", kind="backend", bytes=size) as s:
+        reader = PdfReader(pdf_file)
         pages = []
         for page in reader.pages:
             text = page.extract_text()
             if text:
                 pages.append(text)
+        s.set_attribute("pages", len(reader.pages))
         return "\n".join(pages)
-    except Exception as e:
-        raise
 
 
 def chunk_text(text: str, chunk_size: int = 1500, overlap: int = 200) -> List[str]:
@@ -30,5 +38,8 @@ def chunk_text(text: str, chunk_size: int = 1500, overlap: int = 200) -> List[st
         is_separator_regex=False
     )
     
-    return text_splitter.split_text(text)
+    with span("pdf.chunk", kind="backend", chars=len(text), chunk_size=chunk_size) as s:
+        chunks = text_splitter.split_text(text)
+        s.set_attribute("chunks", len(chunks))
+        return chunks
 
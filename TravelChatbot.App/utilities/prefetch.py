@@ -0,0 +1,212 @@
+"""Speculative background work that never competes with foreground turns.
+
+Tools submit tasks for work the likely next question will need: a key plus a list of named
+steps. One daemon worker runs the steps one at a time, and only while no turn is in progress.
+Turns mark themselves with `foreground()`. Before each step the worker waits until no turn
+has been active for PREFETCH_IDLE_SECONDS.
+
+The queue is bounded, and tasks submitted while it is full are dropped. A key that is queued,
+running, or finished within PREFETCH_MAX_AGE_SECONDS is not queued again, and queued tasks
+older than that are discarded. `cancel(key)`, `cancel_all()` and `stop()` take effect
+between steps.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config import PREFETCH_ENABLED, PREFETCH_IDLE_SECONDS, PREFETCH_MAX_AGE_SECONDS, PREFETCH_QUEUE_SIZE
+from utilities.telemetry import REGISTRY, span
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_TASKS = REGISTRY.counter(
+    "travelbot_prefetch_tasks_total", "Prefetch tasks by outcome.", ("result",)
+)
+
+Step = Tuple[str, Callable[[], Any]]
+
+
+@dataclass
+class PrefetchTask:
+    key: str
+    steps: List[Step]
+    submitted_at: float
+    cancelled: threading.Event = field(default_factory=threading.Event)
+
+
+class Prefetcher:
+    def __init__(
+        self,
+        enabled: bool = PREFETCH_ENABLED,
+        max_queue: int = PREFETCH_QUEUE_SIZE,
+        idle_seconds: float = PREFETCH_IDLE_SECONDS,
+        max_age: float = PREFETCH_MAX_AGE_SECONDS,
+    ):
+        self.enabled = enabled
+        self.max_queue = max_queue
+        self.idle_seconds = idle_seconds
+        self.max_age = max_age
+        self._queue: Deque[PrefetchTask] = deque()
+        self._tasks: Dict[str, PrefetchTask] = {}  # queued or running, by key
+        self._finished: Dict[str, float] = {}  # key -> time.monotonic() it completed
+        self._cond = threading.Condition()
+        self._active_turns = 0
+        self._last_turn_ended = 0.0
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    @contextmanager
+    def foreground(self) -> Iterator[None]:
+        """Mark a turn in progress; queued prefetch steps wait until it is over."""
+        with self._cond:
+            self._active_turns += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active_turns -= 1
+                self._last_turn_ended = time.monotonic()
+                self._cond.notify_all()
+
+    def submit(self, key: str, steps: Sequence[Step]) -> bool:
+        """Queue a task; False when prefetching is off, the key is already covered or the queue is full."""
+        if not self.enabled or not steps:
+            return False
+        now = time.monotonic()
+        with self._cond:
+            if self._stopped:
+                return False
+            if key in self._tasks or now - self._finished.get(key, float("-inf")) < self.max_age:
+                result = "duplicate"
+            elif len(self._queue) >= self.max_queue:
+                result = "dropped"
+            else:
+                task = PrefetchTask(key, list(steps), now)
+                self._queue.append(task)
+                self._tasks[key] = task
+                self._ensure_worker()
+                self._cond.notify_all()
+                result = "queued"
+        PREFETCH_TASKS.inc(result=result)
+        return result == "queued"
+
+    def cancel(self, key: str) -> bool:
+        with self._cond:
+            task = self._tasks.get(key)
+            if task is None:
+                return False
+            task.cancelled.set()
+            self._cond.notify_all()
+            return True
+
+    def cancel_all(self) -> None:
+        with self._cond:
+            for task in self._tasks.values():
+                task.cancelled.set()
+            self._cond.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until no task is queued or running; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stopped = True
+            for task in self._tasks.values():
+                task.cancelled.set()
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            # A fresh context: prefetch spans must not nest under the submitting tool's span
+            self._thread = threading.Thread(
+                target=contextvars.Context().run, args=(self._run,), name="prefetch", daemon=True
+            )
+            self._thread.start()
+
+    def _wait_until_idle(self, task: PrefetchTask) -> bool:
+        with self._cond:
+            while True:
+                if self._stopped or task.cancelled.is_set():
+                    return False
+                if self._active_turns:
+                    self._cond.wait()
+                    continue
+                remaining = self._last_turn_ended + self.idle_seconds - time.monotonic()
+                if remaining <= 0:
+                    return True
+                self._cond.wait(remaining)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    self._queue.clear()
+                    self._tasks.clear()
+                    self._cond.notify_all()
+                    return
+                task = self._queue.popleft()
+
+            if time.monotonic() - task.submitted_at > self.max_age:
+                result = "expired"
+            else:
+                result = "done"
+                for name, step in task.steps:
+                    if not self._wait_until_idle(task):
+                        result = "cancelled"
+                        break
+                    try:
+                        with span("prefetch", kind="job", key=task.key, step=name):
+                            step()
+                    except Exception as e:
+                        logger.warning("Prefetch %s step %s failed: %s", task.key, name, e)
+                        result = "error"
+                        break
+
+            now = time.monotonic()
+            with self._cond:
+                self._tasks.pop(task.key, None)
+                if result == "done":
+                    self._finished[task.key] = now
+                    self._finished = {k: t for k, t in self._finished.items() if now - t < self.max_age}
+                self._cond.notify_all()
+            PREFETCH_TASKS.inc(result=result)
+
+
+_prefetcher: Optional[Prefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> Prefetcher:
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = Prefetcher()
+    return _prefetcher
+
+
+def reset() -> None:
+    """Stop the worker and drop queued work (shutdown, tests and benchmarks)."""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is not None:
+            _prefetcher.stop()
+        _prefetcher = None
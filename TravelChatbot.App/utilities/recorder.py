@@ -0,0 +1,288 @@
+"""Turn recording: LLM calls, tool calls and backend calls of real sessions, for offline replay.
+
+With TRACE_RECORD_PATH set, every turn (or a TRACE_RECORD_SAMPLE_RATE share of them) is appended
+to the trace file as one JSON line:
+
+    {"v": 1, "session": ..., "turn": n, "started": epoch, "ms": turn duration, "status": "ok"|"error",
+     "input": [messages], "output": message, "events": [...]}
+
+Events, each with "at" (ms since the turn started) and "ms" (duration):
+- llm:     tier, tools (bound or not), the request as "prefix" (messages already recorded: the
+           turn input or the previous request) plus the "new" messages after it, and the
+           "response" or the "error"
+- tool:    name, call_id, args, status and the result the model saw
+- backend: span name, status and scalar span attributes (DynamoDB, S3, Pinecone, embeddings, ...)
+
+Messages are stored compactly (role, content, tool calls, tool call id); a tool message in a
+request has no content when it is the result of a tool event of the same turn. A path ending
+in .gz gets one gzip member per turn; `read_trace` reads either form. Each turn is written with
+a single append, so several worker processes can share one file.
+
+Traces hold what users and tools said verbatim: messages, tool arguments and tool results,
+including phone numbers and bookings. Nothing is redacted by default; keep trace files under the
+same access rules as the session store, or install a hook with `set_redactor` that rewrites (or
+drops, by returning None) each turn before it is written.
+
+ControllerAgent opens the recording of a turn (`record_turn`); ChatService names the session
+(`session`). Recording follows the turn's context into tool, search and retry threads, which
+copy it. benchmarks/replay.py replays a trace against the recorded responses.
+"""
+import contextvars
+import gzip
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from config import TRACE_RECORD_PATH, TRACE_RECORD_SAMPLE_RATE
+from utilities.telemetry import Span, add_span_listener
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+_ROLES = {"system": SystemMessage, "human": HumanMessage, "ai": AIMessage, "tool": ToolMessage}
+
+
+def encode_message(message: BaseMessage) -> Dict[str, Any]:
+    role = "ai" if isinstance(message, AIMessage) else message.type
+    data: Dict[str, Any] = {"role": role, "content": message.content}
+    if isinstance(message, AIMessage):
+        if message.tool_calls:
+            data["tool_calls"] = [{"name": c["name"], "args": c["args"], "id": c["id"]} for c in message.tool_calls]
+        if message.usage_metadata:
+            data["usage"] = dict(message.usage_metadata)
+    elif isinstance(message, ToolMessage):
+        data.update(tool_call_id=message.tool_call_id, name=message.name, status=message.status)
+    return data
+
+
+def decode_message(data: Dict[str, Any]) -> BaseMessage:
+    role = data["role"]
+    if role not in _ROLES:
+        raise ValueError(f"unknown message role: {role}")
+    if role == "ai":
+        return AIMessage(
+            content=data["content"],
+            tool_calls=[{**c, "type": "tool_call"} for c in data.get("tool_calls", [])],
+            usage_metadata=data.get("usage"),
+        )
+    if role == "tool":
+        return ToolMessage(content=data["content"], tool_call_id=data["tool_call_id"], name=data.get("name"),
+                           status=data.get("status", "success"))
+    return _ROLES[role](content=data["content"])
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+class TurnRecording:
+    """Events of one turn; appended from the turn thread and the threads it hands work to."""
+
+    def __init__(self, session: Optional[str], messages: Sequence[BaseMessage]):
+        self.session = session
+        self.turn = sum(isinstance(m, HumanMessage) for m in messages) - 1
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.input = [encode_message(m) for m in messages]
+        self.output: Optional[Dict[str, Any]] = None
+        self.status = "ok"
+        self.events: List[Dict[str, Any]] = []
+        self._tools: Dict[str, Dict[str, Any]] = {}
+        # The last request sent to a model (the turn input before the first one)
+        self._sent: List[BaseMessage] = list(messages)
+        self._lock = threading.Lock()
+
+    def llm(self, tier: str, messages: Sequence[BaseMessage], tools: bool, started: float, duration: float,
+            response: Optional[BaseMessage] = None, error: Optional[BaseException] = None) -> None:
+        """A model call; `started` is a time.perf_counter() reading."""
+        with self._lock:
+            sent = self._sent
+            extends = len(messages) >= len(sent) and all(a is b or a == b for a, b in zip(messages, sent))
+            prefix = len(sent) if extends else 0
+            self._sent = list(messages)
+            event: Dict[str, Any] = {
+                "type": "llm", "tier": tier, "at": _ms(started - self._t0), "ms": _ms(duration), "tools": tools,
+                "prefix": prefix, "new": [self._encode_request_message(m) for m in messages[prefix:]],
+            }
+            if response is not None:
+                event["response"] = encode_message(response)
+            else:
+                event["error"] = f"{type(error).__name__}: {error}"
+            self.events.append(event)
+
+    def _encode_request_message(self, message: BaseMessage) -> Dict[str, Any]:
+        data = encode_message(message)
+        if isinstance(message, ToolMessage):
+            recorded = self._tools.get(message.tool_call_id)
+            if recorded is not None and recorded.get("result") == message.content:
+                # Already in the tool event
+                del data["content"]
+        return data
+
+    def _tool(self, call_id: str) -> Dict[str, Any]:
+        event = self._tools.get(call_id)
+        if event is None:
+            event = self._tools[call_id] = {"type": "tool", "call_id": call_id, "at": _ms(time.perf_counter() - self._t0), "ms": 0.0}
+            self.events.append(event)
+        return event
+
+    def tool_results(self, tool_calls: Sequence[Dict[str, Any]], messages: Sequence[ToolMessage]) -> None:
+        """The tool messages the model will see, one per call (some calls never ran: no span)."""
+        with self._lock:
+            for tool_call, message in zip(tool_calls, messages):
+                self._tool(tool_call["id"]).update(
+                    name=tool_call["name"], args=tool_call.get("args"), status=message.status, result=message.content)
+
+    def span(self, s: Span) -> None:
+        with self._lock:
+            at = _ms(s.start - self.started)
+            if s.kind == "tool":
+                self._tool(s.attributes["call_id"]).update(at=at, ms=_ms(s.duration))
+                return
+            event: Dict[str, Any] = {"type": "backend", "name": s.name, "at": at, "ms": _ms(s.duration), "status": s.status}
+            attributes = {k: v for k, v in s.attributes.items() if isinstance(v, (str, int, float, bool))}
+            if attributes:
+                event["attributes"] = attributes
+            self.events.append(event)
+
+    def finish(self, state: Dict[str, Any], failed: bool = False) -> None:
+        self.output = encode_message(state["messages"][-1])
+        self.status = "error" if failed else "ok"
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            # Copies: a tool that outlived its timeout may still update its event
+            events = sorted((dict(e) for e in self.events), key=lambda e: e["at"])
+        return {
+            "v": FORMAT_VERSION, "session": self.session, "turn": self.turn, "started": round(self.started, 3),
+            "ms": _ms(time.perf_counter() - self._t0), "status": self.status,
+            "input": self.input, "output": self.output, "events": events,
+        }
+
+
+class TraceRecorder:
+    def __init__(self, path: str, sample_rate: float = TRACE_RECORD_SAMPLE_RATE):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def write(self, recording: TurnRecording) -> None:
+        record = recording.to_dict()
+        if _redactor is not None:
+            record = _redactor(record)
+            if record is None:
+                return
+        line = json.dumps(record, ensure_ascii=False, default=str, separators=(",", ":")) + "\n"
+        data = line.encode("utf-8")
+        if self.path.endswith(".gz"):
+            data = gzip.compress(data)
+        with self._lock:
+            # One O_APPEND write per turn: turns from several processes never interleave
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+
+def read_trace(path: str) -> Iterator[Dict[str, Any]]:
+    """The turns of a trace file, in the order they were written."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+_recorder: Optional[TraceRecorder] = TraceRecorder(TRACE_RECORD_PATH) if TRACE_RECORD_PATH else None
+_recorder_lock = threading.Lock()
+_redactor: Optional[Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = None
+_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("travelbot_record_session", default=None)
+_recording: contextvars.ContextVar[Optional[TurnRecording]] = contextvars.ContextVar("travelbot_recording", default=None)
+
+
+def get_recorder() -> Optional[TraceRecorder]:
+    """The process recorder; None when recording is off."""
+    return _recorder
+
+
+def reset(path: Optional[str] = TRACE_RECORD_PATH, sample_rate: float = TRACE_RECORD_SAMPLE_RATE) -> None:
+    """Record to `path` from now on (None: stop recording)."""
+    global _recorder
+    with _recorder_lock:
+        _recorder = TraceRecorder(path, sample_rate) if path else None
+
+
+def set_redactor(redactor: Optional[Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> None:
+    """Pass every turn record through `redactor` before it is written; None from it skips the turn."""
+    global _redactor
+    _redactor = redactor
+
+
+def current_recording() -> Optional[TurnRecording]:
+    return _recording.get()
+
+
+@contextmanager
+def session(session_id: str) -> Iterator[None]:
+    """Turns started in this context belong to `session_id`."""
+    token = _session.set(session_id)
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+@contextmanager
+def record_turn(messages: Sequence[BaseMessage]) -> Iterator[Optional[TurnRecording]]:
+    """Record the turn run in this block; yields None when it is not recorded."""
+    recorder = get_recorder()
+    if recorder is None or not recorder.sampled():
+        yield None
+        return
+    recording = TurnRecording(_session.get(), messages)
+    token = _recording.set(recording)
+    try:
+        yield recording
+    finally:
+        _recording.reset(token)
+        try:
+            recorder.write(recording)
+        except Exception as e:
+            logger.warning("Could not write turn recording: %s", e)
+
+
+def record_llm(tier: str, messages: Sequence[BaseMessage], tools: bool, started: float, duration: float,
+               response: Optional[BaseMessage] = None, error: Optional[BaseException] = None) -> None:
+    recording = _recording.get()
+    if recording is not None:
+        recording.llm(tier, messages, tools, started, duration, response=response, error=error)
+
+
+def record_tool_results(tool_calls: Sequence[Dict[str, Any]], messages: Sequence[ToolMessage]) -> None:
+    recording = _recording.get()
+    if recording is not None:
+        recording.tool_results(tool_calls, messages)
+
+
+def _record_span(s: Span) -> None:
+    recording = _recording.get()
+    if recording is None:
+        return
+    # Model calls are recorded with their messages by record_llm
+    if (s.kind == "tool" and "call_id" in s.attributes) or (s.kind == "backend" and not s.name.startswith("llm.")):
+        recording.span(s)
+
+
+add_span_listener(_record_span)
@@ -0,0 +1,350 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, Tuple, Type
+
+from config import (
+    RESILIENCE_BACKOFF_SECONDS,
+    RESILIENCE_ENABLED,
+    RESILIENCE_HEDGE,
+    RESILIENCE_MAX_CONCURRENCY,
+    RESILIENCE_MAX_RETRIES,
+    RESILIENCE_MAX_TIMEOUT_SECONDS,
+    RESILIENCE_MIN_TIMEOUT_SECONDS,
+    RESILIENCE_RETRY_BUDGET_MIN_PER_SECOND,
+    RESILIENCE_RETRY_BUDGET_RATIO,
+    RESILIENCE_TIMEOUT_MULTIPLIER,
+)
+from utilities import deadline
+from utilities.telemetry import REGISTRY, current_span
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the backend circuit breaker is open."""
+
+
+class BulkheadFullError(Exception):
+    """Raised when a backend bulkhead has no free slot within the wait time."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    closed    -> calls pass through, failures are counted
+    open      -> calls are rejected until reset_timeout has elapsed
+    half_open -> a single trial call is let through; success closes, failure re-opens
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Return True when a call may proceed."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def release_trial(self) -> None:
+        """The call let through by `allow` ended without an outcome (it never reached the backend)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class Bulkhead:
+    """Caps the number of concurrent calls against one backend."""
+
+    def __init__(self, name: str, max_concurrent: int = 8):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        if not self._semaphore.acquire(timeout=timeout):
+            raise BulkheadFullError(f"backend '{self.name}' is at its concurrency limit ({self.max_concurrent})")
+
+    def release(self) -> None:
+        self._semaphore.release()
+
+
+# ---------------------------------------------------------------------------
+# Adaptive timeouts, jittered retries and hedged requests for idempotent backend reads
+# ---------------------------------------------------------------------------
+
+RESILIENT_CALLS = REGISTRY.counter(
+    "travelbot_resilient_calls_total",
+    "Resilient backend calls by outcome (ok, retried, hedged: won by a hedge, failed).",
+    ("op", "result"),
+)
+RESILIENT_ATTEMPTS = REGISTRY.counter(
+    "travelbot_resilient_attempts_total",
+    "Backend attempts by kind (first, retry, hedge; denied: refused by the retry budget).",
+    ("op", "kind"),
+)
+
+# HTTP statuses worth another attempt
+TRANSIENT_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+# Percentiles computed from fewer samples than this are not trusted
+MIN_LATENCY_SAMPLES = 20
+
+
+class LatencyTracker:
+    """Latencies of the last `size` successful (or timed out) attempts."""
+
+    def __init__(self, size: int = 512):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentiles(self, *qs: float) -> Optional[Tuple[float, ...]]:
+        """The requested percentiles (0-100), or None while there are too few samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return tuple(samples[min(len(samples) - 1, int(q / 100 * len(samples)))] for q in qs)
+
+
+class RetryBudget:
+    """Token bucket shared by every resilient call; each retry or hedge costs one token.
+
+    Each call deposits `ratio` tokens, and `min_per_second` tokens refill with time, so extra
+    attempts stay near `ratio` of the traffic when a backend degrades instead of multiplying it.
+    """
+
+    def __init__(self, ratio: float = RESILIENCE_RETRY_BUDGET_RATIO,
+                 min_per_second: float = RESILIENCE_RETRY_BUDGET_MIN_PER_SECOND, capacity: Optional[float] = None):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity if capacity is not None else max(10.0, 10 * min_per_second)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Take a token for a retry or hedge; False when the budget is spent."""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+def is_transient(error: BaseException, extra: Tuple[Type[BaseException], ...] = ()) -> bool:
+    """Timeouts, dropped connections and retryable HTTP statuses; never a passed turn deadline."""
+    if isinstance(error, deadline.DeadlineExceeded):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError) + tuple(extra)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return status in TRANSIENT_STATUS_CODES
+
+
+class ResilientCaller:
+    """Runs one kind of idempotent backend read with adaptive timeouts, retries and hedging.
+
+    `call(fn)` calls `fn(timeout=seconds)`. The timeout is TIMEOUT_MULTIPLIER x the p99 of
+    recent attempts, within [min_timeout, max_timeout] and the turn deadline. Once an attempt
+    runs past the p95 a hedge (the same request again) is sent, and the first success wins.
+    A transient failure is retried after a jittered exponential backoff. Retries and hedges
+    need a token from the shared RetryBudget.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        budget: RetryBudget,
+        pool: ThreadPoolExecutor,
+        hedge: bool = RESILIENCE_HEDGE,
+        max_retries: int = RESILIENCE_MAX_RETRIES,
+        min_timeout: float = RESILIENCE_MIN_TIMEOUT_SECONDS,
+        max_timeout: float = RESILIENCE_MAX_TIMEOUT_SECONDS,
+        timeout_multiplier: float = RESILIENCE_TIMEOUT_MULTIPLIER,
+        backoff: float = RESILIENCE_BACKOFF_SECONDS,
+        transient: Tuple[Type[BaseException], ...] = (),
+    ):
+        self.name = name
+        self.budget = budget
+        self.pool = pool
+        self.enabled = RESILIENCE_ENABLED
+        self.hedge = hedge
+        self.max_retries = max_retries
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.backoff = backoff
+        self.transient = transient
+        self.latency = LatencyTracker()
+
+    def timeouts(self) -> Tuple[float, Optional[float]]:
+        """(attempt timeout, hedge delay or None) from recent latency."""
+        observed = self.latency.percentiles(95, 99)
+        if observed is None:
+            return self.max_timeout, None
+        p95, p99 = observed
+        timeout = min(self.max_timeout, max(self.min_timeout, p99 * self.timeout_multiplier))
+        return timeout, (p95 if self.hedge else None)
+
+    def call(self, fn: Callable[..., Any]) -> Any:
+        if not self.enabled:
+            return fn(**deadline.timeout_kwargs())
+        self.budget.deposit()
+        retries = 0
+        while True:
+            deadline.check(self.name)
+            timeout, hedge_after = self.timeouts()
+            timeout = deadline.timeout(timeout)
+            try:
+                result, kind = self._round(fn, timeout, hedge_after, "retry" if retries else "first")
+            except Exception as e:
+                if not is_transient(e, self.transient) or retries >= self.max_retries:
+                    RESILIENT_CALLS.inc(op=self.name, result="failed")
+                    raise
+                if not self.budget.withdraw():
+                    RESILIENT_ATTEMPTS.inc(op=self.name, kind="denied")
+                    RESILIENT_CALLS.inc(op=self.name, result="failed")
+                    raise
+                retries += 1
+                logger.info("%s failed (%s); retry %d", self.name, e, retries)
+                # Full jitter: a random wait up to the exponential backoff, within the deadline
+                time.sleep(deadline.timeout(random.uniform(0, self.backoff * 2 ** retries)))
+                continue
+            result_label = "hedged" if kind == "hedge" else "retried" if retries else "ok"
+            RESILIENT_CALLS.inc(op=self.name, result=result_label)
+            s = current_span()
+            if s is not None:
+                s.set_attribute("retries", retries)
+                s.set_attribute("hedge_won", kind == "hedge")
+            return result
+
+    def _round(self, fn: Callable[..., Any], timeout: float, hedge_after: Optional[float], kind: str) -> Tuple[Any, str]:
+        """One attempt, plus a hedge if it runs past `hedge_after`; (result, kind of the winner)."""
+        started = time.monotonic()
+        ends = started + timeout
+        pending: Dict[Future, str] = {self._submit(fn, timeout, kind): kind}
+        error: Optional[BaseException] = None
+        while pending:
+            now = time.monotonic()
+            if now >= ends:
+                break
+            until = ends if hedge_after is None else min(ends, started + hedge_after)
+            done, _ = wait(pending, timeout=max(0.0, until - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                winner = pending.pop(future)
+                try:
+                    return future.result(), winner
+                except Exception as e:
+                    error = e
+            if error is not None and not pending:
+                raise error
+            if hedge_after is not None and not done and time.monotonic() >= started + hedge_after:
+                hedge_after = None
+                if self.budget.withdraw():
+                    pending[self._submit(fn, ends - time.monotonic(), "hedge")] = "hedge"
+                else:
+                    RESILIENT_ATTEMPTS.inc(op=self.name, kind="denied")
+        # Attempts still running are abandoned; their own client timeout ends them
+        raise TimeoutError(f"{self.name} timed out after {timeout:.3f}s")
+
+    def _submit(self, fn: Callable[..., Any], timeout: float, kind: str) -> Future:
+        RESILIENT_ATTEMPTS.inc(op=self.name, kind=kind)
+        return self.pool.submit(contextvars.copy_context().run, self._attempt, fn, max(timeout, 0.001))
+
+    def _attempt(self, fn: Callable[..., Any], timeout: float) -> Any:
+        started = time.perf_counter()
+        try:
+            result = fn(timeout=timeout)
+        except TimeoutError:
+            # A timeout is a latency of at least `timeout`; it pushes the percentiles up
+            self.latency.record(time.perf_counter() - started)
+            raise
+        self.latency.record(time.perf_counter() - started)
+        return result
+
+
+_budget: Optional[RetryBudget] = None
+_pool: Optional[ThreadPoolExecutor] = None
+_callers: Dict[str, ResilientCaller] = {}
+_callers_lock = threading.Lock()
+
+
+def get_caller(name: str, **options: Any) -> ResilientCaller:
+    """The process-wide caller for `name` (created with `options` on first use)."""
+    global _budget, _pool
+    with _callers_lock:
+        caller = _callers.get(name)
+        if caller is None:
+            if _budget is None:
+                _budget = RetryBudget()
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=RESILIENCE_MAX_CONCURRENCY, thread_name_prefix="resilient")
+            caller = _callers[name] = ResilientCaller(name, _budget, _pool, **options)
+        return caller
+
+
+def reset() -> None:
+    """Forget every caller's latency history and refill the retry budget."""
+    global _budget
+    with _callers_lock:
+        _callers.clear()
+        _budget = None
@@ -0,0 +1,247 @@
+"""S3 downloads with parallel ranged GETs and an ETag-validated local disk cache.
+
+The first GET asks for the first part of the object and tells us its size and ETag. The
+remaining parts are fetched concurrently, each with `If-Match: <etag>`, so a download never
+mixes two versions of an object. Parts are streamed into the target file in small blocks,
+which bounds memory to about S3_DOWNLOAD_MAX_CONCURRENCY x 1 MiB whatever the object size.
+
+Objects that fit the cache are written straight into the cache directory (temp file, then
+atomic rename), named after a hash of bucket/key, with a JSON sidecar holding the ETag. A
+cached object is revalidated on every use with `If-None-Match: <etag>`. A 304 means the local
+copy is current, and a changed object comes back in the same request. When the directory
+grows past S3_CACHE_MAX_BYTES, the least recently used objects are evicted.
+
+Objects too large to cache, or everything when the cache is disabled (S3_CACHE_MAX_BYTES=0),
+go to a SpooledTemporaryFile. It stays in memory up to S3_DOWNLOAD_SPOOL_BYTES and rolls
+over to disk beyond that.
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from config import (
+    S3_CACHE_DIR,
+    S3_CACHE_MAX_BYTES,
+    S3_DOWNLOAD_MAX_CONCURRENCY,
+    S3_DOWNLOAD_PART_BYTES,
+    S3_DOWNLOAD_SPOOL_BYTES,
+)
+from utilities.aws_clients import get_client
+from utilities.telemetry import REGISTRY, span
+
+logger = logging.getLogger(__name__)
+
+S3_CACHE = REGISTRY.counter(
+    "travelbot_s3_cache_total", "S3 download cache lookups (hit, stale, miss, bypass).", ("result",)
+)
+
+STREAM_BLOCK_BYTES = 1024 * 1024
+# An object that changes between the first and a later part is downloaded again this many times
+MAX_VERSION_RETRIES = 2
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+def _status(e: ClientError) -> int:
+    return e.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+
+
+class ObjectChanged(Exception):
+    """The object's ETag changed while its parts were being downloaded."""
+
+
+class S3DownloadManager:
+    def __init__(
+        self,
+        cache_dir: str = S3_CACHE_DIR,
+        max_cache_bytes: int = S3_CACHE_MAX_BYTES,
+        part_bytes: int = S3_DOWNLOAD_PART_BYTES,
+        max_concurrency: int = S3_DOWNLOAD_MAX_CONCURRENCY,
+        spool_bytes: int = S3_DOWNLOAD_SPOOL_BYTES,
+    ):
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.part_bytes = part_bytes
+        self.spool_bytes = spool_bytes
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-part")
+        self._cache_lock = threading.Lock()
+        if max_cache_bytes > 0:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # Cache layout
+
+    def _paths(self, bucket: str, key: str) -> Tuple[str, str]:
+        name = hashlib.sha256(f"{bucket}/{key}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, name + ".data"), os.path.join(self.cache_dir, name + ".json")
+
+    def _cached(self, bucket: str, key: str) -> Optional[Dict[str, Any]]:
+        data_path, meta_path = self._paths(bucket, key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if os.path.getsize(data_path) != meta["size"]:
+                return None
+        except (OSError, ValueError, KeyError):
+            return None
+        return meta
+
+    def _evict(self) -> None:
+        """Delete least recently used objects until the cache fits its size limit."""
+        with self._cache_lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".data"):
+                    path = os.path.join(self.cache_dir, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_cache_bytes:
+                    break
+                for victim in (path, path[: -len(".data")] + ".json"):
+                    try:
+                        os.remove(victim)
+                    except OSError:
+                        pass
+                total -= size
+
+    # Downloads
+
+    def open(self, bucket: str, key: str, s3_client=None) -> BinaryIO:
+        """A readable file with the object's current content, positioned at 0. The caller closes it."""
+        s3_client = s3_client or get_client("s3")
+        for attempt in range(MAX_VERSION_RETRIES + 1):
+            try:
+                return self._open(s3_client, bucket, key)
+            except ObjectChanged:
+                if attempt == MAX_VERSION_RETRIES:
+                    raise
+                logger.info("s3://%s/%s changed during download, retrying", bucket, key)
+
+    def read(self, bucket: str, key: str, s3_client=None) -> bytes:
+        with self.open(bucket, key, s3_client) as f:
+            return f.read()
+
+    def _open(self, s3_client, bucket: str, key: str, revalidate: bool = True) -> BinaryIO:
+        cached = self._cached(bucket, key) if self.max_cache_bytes > 0 and revalidate else None
+        data_path, meta_path = self._paths(bucket, key)
+
+        params: Dict[str, Any] = {"Bucket": bucket, "Key": key, "Range": f"bytes=0-{self.part_bytes - 1}"}
+        if cached:
+            params["IfNoneMatch"] = cached["etag"]
+        try:
+            with span("s3.get_object", kind="backend", bucket=bucket, key=key, part=0) as s:
+                first = s3_client.get_object(**params)
+                s.set_attribute("bytes", first.get("ContentLength", 0))
+        except ClientError as e:
+            if cached and _status(e) == 304:
+                try:
+                    # Opened first: an open file stays readable if it is evicted from here on
+                    cached_file = open(data_path, "rb")
+                except FileNotFoundError:
+                    # Evicted (by another thread or worker) since the lookup
+                    return self._open(s3_client, bucket, key, revalidate=False)
+                S3_CACHE.inc(result="hit")
+                try:
+                    os.utime(data_path)  # LRU recency
+                except FileNotFoundError:
+                    pass
+                return cached_file
+            if _status(e) != 416:  # 416: empty object, nothing to range over
+                raise
+            with span("s3.get_object", kind="backend", bucket=bucket, key=key, part=0):
+                first = s3_client.get_object(Bucket=bucket, Key=key)
+
+        match = _CONTENT_RANGE.match(first.get("ContentRange") or "")
+        size = int(match.group(3)) if match else int(first.get("ContentLength", 0))
+        etag = first["ETag"]
+        cacheable = 0 < self.max_cache_bytes and size <= self.max_cache_bytes
+        S3_CACHE.inc(result=("stale" if cached else "miss") if cacheable else "bypass")
+
+        if cacheable:
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+            target: BinaryIO = os.fdopen(fd, "w+b")
+        else:
+            target = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        try:
+            lock = threading.Lock()
+            ranges = [(start, min(start + self.part_bytes, size) - 1) for start in range(self.part_bytes, size, self.part_bytes)]
+            futures = [
+                self._pool.submit(contextvars.copy_context().run, self._get_part, s3_client, bucket, key, etag, r, target, lock)
+                for r in ranges
+            ]
+            # The first part streams in while the others download
+            self._write(target, lock, 0, first["Body"])
+            wait(futures)
+            for f in futures:
+                f.result()
+        except BaseException:
+            target.close()
+            if cacheable:
+                os.remove(temp_path)
+            raise
+
+        if not cacheable:
+            target.seek(0)
+            return target
+
+        target.close()
+        os.replace(temp_path, data_path)
+        # A unique temp name: concurrent downloads of the same object must not share one
+        fd, temp_meta = tempfile.mkstemp(dir=self.cache_dir, suffix=".json.part")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"bucket": bucket, "key": key, "etag": etag, "size": size}, f)
+        os.replace(temp_meta, meta_path)
+        downloaded = open(data_path, "rb")
+        self._evict()
+        return downloaded
+
+    def _get_part(self, s3_client, bucket: str, key: str, etag: str, byte_range: Tuple[int, int], target: BinaryIO,
+                  lock: threading.Lock) -> None:
+        start, end = byte_range
+        try:
+            with span("s3.get_object", kind="backend", bucket=bucket, key=key, part=start // self.part_bytes) as s:
+                resp = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}", IfMatch=etag)
+                s.set_attribute("bytes", resp.get("ContentLength", 0))
+                self._write(target, lock, start, resp["Body"])
+        except ClientError as e:
+            if _status(e) == 412:
+                raise ObjectChanged(f"s3://{bucket}/{key}") from e
+            raise
+
+    @staticmethod
+    def _write(target: BinaryIO, lock: threading.Lock, offset: int, body) -> None:
+        """Stream a response body into the target at `offset`, one block at a time."""
+        while True:
+            block = body.read(STREAM_BLOCK_BYTES)
+            if not block:
+                return
+            with lock:
+                target.seek(offset)
+                target.write(block)
+            offset += len(block)
+
+
+_manager: Optional[S3DownloadManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_download_manager() -> S3DownloadManager:
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = S3DownloadManager()
+    return _manager
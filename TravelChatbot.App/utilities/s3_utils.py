@@ -1,5 +1,10 @@
-from typing import Dict, Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
 from botocore.exceptions import ClientError
+from utilities.s3_download import get_download_manager
+from utilities.telemetry import span
 
 def fetch_s3_object(bucket: str, key: str, s3_client, max_inline_bytes: int = 5 * 1024 * 1024) -> Dict[str, Any]:
     """Fetch object metadata and content (if small) from S3.
@@ -12,7 +17,8 @@ def fetch_s3_object(bucket: str, key: str, s3_client, max_inline_bytes: int = 5
     result: Dict[str, Any] = {}
     try:
         # Get head to inspect size and content-type
-        head = s3_client.head_object(Bucket=bucket, Key=key)
+        with span("s3.head_object", kind="backend", bucket=bucket, key=key):
+            head = s3_client.head_object(Bucket=bucket, Key=key)
         content_length = int(head.get("ContentLength", 0))
         content_type = head.get("ContentType")
 
@@ -39,30 +45,60 @@ def fetch_s3_object(bucket: str, key: str, s3_client, max_inline_bytes: int = 5
 def download_s3_object(bucket: str, key: str, s3_client) -> Dict[str, Any]:
     """Download the full S3 object body (returns bytes in 'body' key).
 
+    Goes through the download manager: parallel ranged GETs and the local ETag-validated cache.
     Returns dict with either 'body' (bytes) or 'error'.
     """
     try:
-        resp = s3_client.get_object(Bucket=bucket, Key=key)
-        body = resp["Body"].read()
-        return {"body": body, "content_length": int(resp.get("ContentLength", len(body))), "content_type": resp.get("ContentType")}
+        body = get_download_manager().read(bucket, key, s3_client)
+        return {"body": body, "content_length": len(body)}
     except ClientError as e:
         return {"error": e.response.get("Error", {}).get("Message", str(e))}
     except Exception as e:
         return {"error": str(e)}
 
 
+PRESIGN_EXPIRES_SECONDS = 86400  # 1 day
+# A cached URL is handed out until half its lifetime is left
+PRESIGN_REUSE_SECONDS = PRESIGN_EXPIRES_SECONDS // 2
+PRESIGN_CACHE_SIZE = 4096
+
+# (bucket, key) -> (URL, handed out until, expires at); times are time.monotonic()
+_presigned: "OrderedDict[Tuple[str, str], Tuple[str, float, float]]" = OrderedDict()
+_presigned_lock = threading.Lock()
+
+
 def generate_presigned_url(bucket: str, key: str, s3_client) -> Optional[str]:
+    """A GET URL for the object, valid for at least PRESIGN_REUSE_SECONDS; recent URLs are reused."""
+    presigned = presign_with_expiry(bucket, key, s3_client)
+    return presigned[0] if presigned else None
+
+
+def presign_with_expiry(bucket: str, key: str, s3_client) -> Optional[Tuple[str, float]]:
+    """(URL, time.monotonic() at which it expires), like generate_presigned_url."""
+    now = time.monotonic()
+    with _presigned_lock:
+        cached = _presigned.get((bucket, key))
+        if cached is not None and cached[1] > now:
+            _presigned.move_to_end((bucket, key))
+            return cached[0], cached[2]
 
     try:
-        presigned_url = s3_client.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": bucket,
-                "Key": key
-            },
-            ExpiresIn=86400  # 1 day in seconds
-        )
-        return presigned_url
+        with span("s3.presign", kind="backend", bucket=bucket):
+            presigned_url = s3_client.generate_presigned_url(
+                "get_object",
+                Params={
+                    "Bucket": bucket,
+                    "Key": key
+                },
+                ExpiresIn=PRESIGN_EXPIRES_SECONDS
+            )
     except ClientError as e:
         print(f"Error generating presigned URL for {key}: {e.response['Error']['Message']}")
-        return None
\ No newline at end of file
+        return None
+
+    with _presigned_lock:
+        _presigned[(bucket, key)] = (presigned_url, now + PRESIGN_REUSE_SECONDS, now + PRESIGN_EXPIRES_SECONDS)
+        _presigned.move_to_end((bucket, key))
+        while len(_presigned) > PRESIGN_CACHE_SIZE:
+            _presigned.popitem(last=False)
+    return presigned_url, now + PRESIGN_EXPIRES_SECONDS
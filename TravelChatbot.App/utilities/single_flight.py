@@ -0,0 +1,185 @@
+"""Request coalescing: concurrent callers with the same key share one execution.
+
+Within a process, the first caller of a key (the leader) runs the work. Callers arriving while
+it runs wait for it and receive a copy of its result. Only results are shared: when the leader
+fails (its own turn deadline may have run out), the waiting callers run the work again, still
+coalesced among themselves. Nothing is cached: once the leader finishes, the next call with the
+same key runs again. Waits end at wait_seconds or at the caller's turn deadline, if sooner.
+
+Across worker processes on a host, the leader also holds an exclusive file lock in
+SINGLE_FLIGHT_LOCK_DIR for the key. The lock file also holds the leader's last result, as JSON.
+A process that finds the lock taken waits for it. If the result it then reads was written after
+it started waiting, it uses that result; otherwise (the other process failed, or the result was
+not JSON-serializable) it runs the work itself. Keys are hashed into LOCK_SLOTS files per group,
+so the directory stays bounded. Two keys that share a slot are only serialized against each
+other, never mixed up. Cross-process coalescing needs `fcntl` (POSIX) and a lock dir; without
+them, coalescing is per process only.
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import SINGLE_FLIGHT_LOCK_DIR, SINGLE_FLIGHT_WAIT_SECONDS
+from utilities import deadline
+from utilities.telemetry import REGISTRY, current_span
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT = REGISTRY.counter(
+    "travelbot_single_flight_total",
+    "Coalesced calls by group and outcome (leader, shared, remote, timeout, retry).",
+    ("group", "result"),
+)
+
+# Lock files per group; keys are hashed into these slots
+LOCK_SLOTS = 4096
+_POLL_SECONDS = 0.02
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    failed: bool = False
+
+
+class SingleFlight:
+    def __init__(self, name: str, lock_dir: str = SINGLE_FLIGHT_LOCK_DIR, wait_seconds: float = SINGLE_FLIGHT_WAIT_SECONDS):
+        self.name = name
+        self.lock_dir = lock_dir if fcntl is not None else ""
+        self.wait_seconds = wait_seconds
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run `fn` for `key`, or wait for the call already running for it and share its result.
+
+        A caller that waits longer than wait_seconds stops waiting and runs `fn` itself; one whose
+        turn deadline passes while waiting gets DeadlineExceeded.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(deadline.timeout(self.wait_seconds)):
+                if call.failed:
+                    self._record("retry")
+                    return self.do(key, fn)
+                self._record("shared")
+                return copy.deepcopy(call.result)
+            deadline.check(f"single flight {self.name}")
+            self._record("timeout")
+            return fn()
+
+        try:
+            result, outcome = self._run_exclusive(key, fn)
+            call.result = result
+            self._record(outcome)
+            return result
+        except BaseException:
+            call.failed = True
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _record(self, outcome: str) -> None:
+        SINGLE_FLIGHT.inc(group=self.name, result=outcome)
+        if current_span() is not None:
+            current_span().set_attribute(f"single_flight_{self.name}", outcome)
+
+    # Cross-process
+
+    def _run_exclusive(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, str]:
+        if not self.lock_dir:
+            return fn(), "leader"
+        slot = int(hashlib.sha256(key.encode("utf-8")).hexdigest(), 16) % LOCK_SLOTS
+        started = time.time()
+        with open(os.path.join(self.lock_dir, f"{self.name}-{slot}.lock"), "a+", encoding="utf-8") as f:
+            locked, contended = self._acquire(f)
+            if not locked:
+                deadline.check(f"single flight {self.name}")
+                return fn(), "timeout"
+            try:
+                if contended:
+                    record = self._read(f)
+                    if record is not None and record.get("key") == key and record.get("at", 0) >= started:
+                        return record["result"], "remote"
+                result = fn()
+                self._write(f, key, result)
+                return result, "leader"
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _acquire(self, f) -> Tuple[bool, bool]:
+        """(locked, contended): take the file lock, waiting up to wait_seconds (or the turn deadline) for another process."""
+        until = time.monotonic() + deadline.timeout(self.wait_seconds)
+        contended = False
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True, contended
+            except BlockingIOError:
+                contended = True
+                if time.monotonic() >= until:
+                    return False, True
+                time.sleep(_POLL_SECONDS)
+
+    @staticmethod
+    def _read(f) -> Optional[Dict[str, Any]]:
+        f.seek(0)
+        try:
+            return json.loads(f.read() or "null")
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _write(f, key: str, result: Any) -> None:
+        try:
+            payload = json.dumps({"key": key, "at": time.time(), "result": result})
+        except (TypeError, ValueError):
+            payload = ""  # not shareable; waiting processes run the work themselves
+        f.seek(0)
+        f.truncate()
+        f.write(payload)
+        f.flush()
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+_lock_dir = SINGLE_FLIGHT_LOCK_DIR
+
+
+def get_group(name: str) -> SingleFlight:
+    group = _groups.get(name)
+    if group is None:
+        with _groups_lock:
+            group = _groups.get(name)
+            if group is None:
+                group = _groups[name] = SingleFlight(name, lock_dir=_lock_dir)
+    return group
+
+
+def reset(lock_dir: Optional[str] = None) -> None:
+    """Drop all groups; new ones lock under `lock_dir` (default SINGLE_FLIGHT_LOCK_DIR) (tests and benchmarks)."""
+    global _lock_dir
+    with _groups_lock:
+        _groups.clear()
+        _lock_dir = SINGLE_FLIGHT_LOCK_DIR if lock_dir is None else lock_dir
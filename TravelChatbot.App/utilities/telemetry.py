@@ -0,0 +1,303 @@
+"""Lightweight in-process tracing and Prometheus-style metrics.
+
+Spans are opened with the `span` context manager (or the `traced` decorator). Each finished
+span is observed into the `travelbot_span_duration_seconds` histogram, its token counts into
+`travelbot_tokens_total`, and it is handed to the registered span listeners/exporters.
+
+Exporters:
+- `render_prometheus()` returns the text exposition format; `start_metrics_server(port)` serves
+  it on /metrics. Metrics are per process: the chat API starts it on TELEMETRY_METRICS_PORT when
+  it runs a single worker (with several, each worker serves its own on the API's /metrics).
+- `JsonlSpanExporter` appends one JSON line per span (enabled when TELEMETRY_SPAN_LOG is configured).
+  Tool arguments named in TELEMETRY_REDACTED_ARGS are redacted before they become span attributes.
+"""
+import contextvars
+import functools
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from config import TELEMETRY_REDACTED_ARGS, TELEMETRY_SPAN_LOG
+
+REDACTED = "[redacted]"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        return self._values.get(key, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self, **labels: Any) -> Dict[str, float]:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        series = self._series.get(key) or [0.0] * (len(self.buckets) + 2)
+        return {"sum": series[-2], "count": series[-1]}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for i, bound in enumerate(self.buckets):
+                    lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', f'{bound:g}'))} {series[i]:g}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', '+Inf'))} {series[-1]:g}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {series[-1]:g}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, label_names: Sequence[str] = ()) -> Counter:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, help, label_names)
+            return self._metrics[name]
+
+    def histogram(self, name: str, help: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help, label_names, buckets)
+            return self._metrics[name]
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+SPAN_DURATION = REGISTRY.histogram(
+    "travelbot_span_duration_seconds", "Duration of traced operations.", ("span", "kind", "status")
+)
+TOKENS = REGISTRY.counter(
+    "travelbot_tokens_total", "Tokens consumed by traced operations.", ("span", "type")
+)
+
+
+def redact(value: Any, keys: Sequence[str] = TELEMETRY_REDACTED_ARGS) -> Any:
+    """A copy of `value` with the values of `keys` replaced, at any depth of nested dicts and lists."""
+    if isinstance(value, dict):
+        return {k: REDACTED if k in keys else redact(v, keys) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v, keys) for v in value]
+    return value
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start: float = 0.0
+    duration: float = 0.0
+    status: str = "ok"
+    error: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_tokens(self, prompt_tokens: Optional[int] = 0, completion_tokens: Optional[int] = 0) -> None:
+        self.prompt_tokens += int(prompt_tokens or 0)
+        self.completion_tokens += int(completion_tokens or 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("travelbot_span", default=None)
+_listeners: List[Callable[[Span], None]] = []
+
+
+def add_span_listener(listener: Callable[[Span], None]) -> None:
+    """Register a callback invoked with every finished span."""
+    _listeners.append(listener)
+
+
+def remove_span_listener(listener: Callable[[Span], None]) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes: Any) -> Iterator[Span]:
+    parent = _current_span.get()
+    s = Span(
+        name=name,
+        kind=kind,
+        trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent.span_id if parent else None,
+        attributes=attributes,
+        start=time.time(),
+    )
+    token = _current_span.set(s)
+    started = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s.status = "error"
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.duration = time.perf_counter() - started
+        _current_span.reset(token)
+        _finish(s)
+
+
+def traced(name: str, kind: str = "internal"):
+    """Decorator form of `span`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _finish(s: Span) -> None:
+    SPAN_DURATION.observe(s.duration, span=s.name, kind=s.kind, status=s.status)
+    if s.prompt_tokens:
+        TOKENS.inc(s.prompt_tokens, span=s.name, type="prompt")
+    if s.completion_tokens:
+        TOKENS.inc(s.completion_tokens, span=s.name, type="completion")
+    for listener in list(_listeners):
+        try:
+            listener(s)
+        except Exception:
+            pass
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render_prometheus()
+
+
+class JsonlSpanExporter:
+    """Appends finished spans to a JSON-lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, s: Span) -> None:
+        line = json.dumps(s.to_dict(), ensure_ascii=False, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve /metrics in a daemon thread (idempotent per process)."""
+    global _metrics_server
+    if _metrics_server is None:
+        _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _metrics_server
+
+
+if TELEMETRY_SPAN_LOG:
+    add_span_listener(JsonlSpanExporter(TELEMETRY_SPAN_LOG))